@@ -0,0 +1,47 @@
+"""
+Archive script for moving finished help requests to cold storage.
+
+Run this as a daily cron job or scheduled task:
+    python scripts/archive_old_requests.py [--dry-run] [--days N]
+
+Every tenant is archived into its own directory.
+"""
+import sys
+sys.path.append('.')
+
+from src.services.tenant_registry import tenant_registry, all_tenant_ids
+from src.config.firebase_config import firebase_config
+from src.utils.tenant import tenant_scope
+from src.utils.logger import logger
+
+
+def archive_old_requests(retention_days: int = None, dry_run: bool = False) -> dict:
+    """Move resolved/timed-out requests past retention to the archive."""
+    logger.info("Starting archival of old help requests...")
+    
+    # Initialize Firebase
+    firebase_config.initialize()
+    
+    totals = {'archived': 0, 'deleted': 0}
+    for tenant_id in all_tenant_ids():
+        try:
+            with tenant_scope(tenant_id):
+                result = tenant_registry.get().archive.archive_old_requests(retention_days, dry_run)
+            totals['archived'] += result['archived']
+            totals['deleted'] += result['deleted']
+        except Exception as e:
+            logger.error(f"Archival failed for tenant {tenant_id}: {str(e)}")
+    return totals
+
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv
+    days = None
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+    
+    result = archive_old_requests(days, dry_run)
+    print(
+        f"Archival complete{' (dry run)' if dry_run else ''}. "
+        f"Archived {result['archived']} requests, removed {result['deleted']} from Firebase."
+    )
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Microbenchmark for help request and knowledge entry serialization.
+
+Compares the per-row path with the batch path used by the list
+endpoints. Runs offline on synthetic rows:
+    python scripts/benchmark_serialization.py [rows]
+"""
+import sys
+sys.path.append('.')
+
+import json
+import time
+from datetime import datetime, timedelta
+import orjson
+from src.models.help_request import HelpRequest
+from src.models.knowledge_base import KnowledgeEntry
+from src.utils.serialization import dump_models
+
+
+def make_rows(count: int) -> tuple:
+    """Synthetic rows shaped like what Firebase returns (plain JSON types)."""
+    now = datetime.utcnow()
+    requests, entries = [], []
+    for i in range(count):
+        created = now - timedelta(minutes=i)
+        requests.append(HelpRequest(
+            customer_phone=f"+1555{i:07d}",
+            customer_name=f"Customer {i}",
+            question=f"Do you offer service number {i}?",
+            created_at=created,
+            updated_at=created,
+            timeout_at=created + timedelta(minutes=30)
+        ).to_dict())
+        entries.append(KnowledgeEntry(
+            question=f"Do you offer service number {i}?",
+            answer="Yes, we do.",
+            keywords=["service", str(i)],
+            created_at=created,
+            updated_at=created,
+            last_used_at=created
+        ).to_dict())
+    return json.loads(json.dumps(requests)), json.loads(json.dumps(entries))
+
+
+def timed(label: str, func, repeat: int = 3) -> float:
+    """Best-of-N wall time for func()."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<40} {best * 1000:9.1f} ms")
+    return best
+
+
+def benchmark(model, rows: list):
+    print(f"{model.__name__} ({len(rows)} rows)")
+    
+    slow_load = timed("load: from_dict per row", lambda: [model.from_dict(r) for r in rows])
+    fast_load = timed("load: from_dict_batch", lambda: model.from_dict_batch(rows))
+    
+    items = model.from_dict_batch(rows)
+    slow_dump = timed(
+        "dump: model_dump + json.dumps",
+        lambda: json.dumps([i.model_dump(mode='json') for i in items])
+    )
+    fast_dump = timed(
+        "dump: dump_models + orjson",
+        lambda: orjson.dumps(dump_models(model, items))
+    )
+    
+    print(f"  load speedup {slow_load / fast_load:.1f}x, dump speedup {slow_dump / fast_dump:.1f}x\n")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    request_rows, entry_rows = make_rows(count)
+    benchmark(HelpRequest, request_rows)
+    benchmark(KnowledgeEntry, entry_rows)
\ No newline at end of file
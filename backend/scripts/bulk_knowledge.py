@@ -0,0 +1,74 @@
+"""
+Bulk import or export the knowledge base.
+
+    python scripts/bulk_knowledge.py import FILE [--dry-run] [--checkpoint PATH] [--tenant ID]
+    python scripts/bulk_knowledge.py export FILE [--tenant ID]
+
+FILE is .jsonl or .csv. Imports write in batches and, with --checkpoint,
+resume after the last committed chunk if interrupted.
+"""
+import sys
+sys.path.append('.')
+
+from src.services.knowledge_bulk import knowledge_importer, export_file
+from src.config.firebase_config import firebase_config
+from src.utils.tenant import set_tenant
+from src.utils.logger import logger
+
+
+def import_knowledge(path: str, dry_run: bool = False, checkpoint_path: str = None) -> dict:
+    """Import a JSONL or CSV file into the knowledge base."""
+    logger.info(f"Starting knowledge import from {path}...")
+    
+    # Initialize Firebase
+    firebase_config.initialize()
+    
+    try:
+        return knowledge_importer.import_file(
+            path,
+            dry_run=dry_run,
+            checkpoint_path=checkpoint_path
+        )
+    except Exception as e:
+        logger.error(f"Knowledge import failed: {str(e)}")
+        return {}
+
+
+def export_knowledge(path: str) -> int:
+    """Export the knowledge base to a JSONL or CSV file."""
+    # Initialize Firebase
+    firebase_config.initialize()
+    
+    try:
+        return export_file(path)
+    except Exception as e:
+        logger.error(f"Knowledge export failed: {str(e)}")
+        return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "export"):
+        print(__doc__)
+        sys.exit(1)
+    
+    command, path = sys.argv[1], sys.argv[2]
+    if "--tenant" in sys.argv:
+        set_tenant(sys.argv[sys.argv.index("--tenant") + 1])
+    
+    if command == "export":
+        print(f"Exported {export_knowledge(path)} entries to {path}")
+        sys.exit(0)
+    
+    dry_run = "--dry-run" in sys.argv
+    checkpoint_path = None
+    if "--checkpoint" in sys.argv:
+        checkpoint_path = sys.argv[sys.argv.index("--checkpoint") + 1]
+    
+    report = import_knowledge(path, dry_run, checkpoint_path)
+    for error in report.get('errors', []):
+        print(f"  line {error['line']}: {error['error']}")
+    print(
+        f"Import complete{' (dry run)' if dry_run else ''}. "
+        f"{report.get('created', 0)} created, {report.get('updated', 0)} updated, "
+        f"{report.get('invalid', 0)} invalid, {report.get('skipped', 0)} skipped."
+    )
\ No newline at end of file
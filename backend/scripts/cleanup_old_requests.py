@@ -1,13 +1,15 @@
 """
 Cleanup script for timing out old help requests.
 
-Run this as a cron job or scheduled task.
+Run this as a cron job or scheduled task. Every tenant is checked.
 """
 import sys
 sys.path.append('.')
 
 from src.services.help_request_service import help_request_service
+from src.services.tenant_registry import all_tenant_ids
 from src.config.firebase_config import firebase_config
+from src.utils.tenant import tenant_scope
 from src.utils.logger import logger
 
 
@@ -19,7 +21,10 @@ def cleanup_old_requests():
     firebase_config.initialize()
     
     try:
-        timed_out_count = help_request_service.check_and_timeout_old_requests()
+        timed_out_count = 0
+        for tenant_id in all_tenant_ids():
+            with tenant_scope(tenant_id):
+                timed_out_count += help_request_service.check_and_timeout_old_requests()
         
         if timed_out_count > 0:
             logger.info(f"✅ Timed out {timed_out_count} old requests")
@@ -27,7 +32,7 @@ def cleanup_old_requests():
             logger.info("No requests to timeout")
         
         return timed_out_count
-        
+    
     except Exception as e:
         logger.error(f"Cleanup failed: {str(e)}")
         return 0
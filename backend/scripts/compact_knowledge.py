@@ -0,0 +1,50 @@
+"""
+Merge near-duplicate knowledge base entries.
+
+Run this as a cron job or scheduled task:
+    python scripts/compact_knowledge.py [--dry-run] [--merge-similar]
+
+Only entries asking the same question are merged; similar questions are
+listed for review and merged with --merge-similar. Every tenant's
+knowledge base is compacted separately.
+"""
+import sys
+sys.path.append('.')
+
+from src.services.knowledge_compaction import knowledge_compactor
+from src.services.tenant_registry import all_tenant_ids
+from src.config.firebase_config import firebase_config
+from src.utils.tenant import tenant_scope
+from src.utils.logger import logger
+
+
+def compact_knowledge(dry_run: bool = False, merge_similar: bool = False) -> dict:
+    """Run one compaction pass over each tenant's knowledge base."""
+    logger.info("Starting knowledge base compaction...")
+    
+    # Initialize Firebase
+    firebase_config.initialize()
+    
+    reports = {}
+    for tenant_id in all_tenant_ids():
+        try:
+            with tenant_scope(tenant_id):
+                reports[tenant_id] = knowledge_compactor.compact(
+                    dry_run=dry_run, merge_similar=merge_similar
+                )
+        except Exception as e:
+            logger.error(f"Compaction failed for tenant {tenant_id}: {str(e)}")
+    return reports
+
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv
+    reports = compact_knowledge(dry_run, merge_similar="--merge-similar" in sys.argv)
+    
+    for tenant_id, report in reports.items():
+        for cluster in report['clusters']:
+            print(f"[{tenant_id}] {cluster['question']!r}: merged {len(cluster['merged_entry_ids'])} duplicates")
+        for cluster in report['review']:
+            print(f"[{tenant_id}] Review (not merged): {', '.join(repr(q) for q in cluster['questions'])}")
+        print(f"[{tenant_id}] {report['entries_before']} -> {report['entries_after']} entries.")
+    print(f"Compaction complete{' (dry run)' if dry_run else ''} for {len(reports)} tenants.")
\ No newline at end of file
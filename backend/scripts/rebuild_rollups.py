@@ -0,0 +1,53 @@
+"""
+Backfill the hourly/daily analytics rollups from existing help requests.
+
+Run once after deploying rollups (later transitions keep them current):
+    python scripts/rebuild_rollups.py [--days N]
+
+Only the last N days are rebuilt (default: the archive retention window,
+which is everything still in the hot store). Every tenant's rollups are
+rebuilt from its own requests.
+"""
+import sys
+sys.path.append('.')
+
+from datetime import datetime, timedelta
+from src.services.analytics_rollups import analytics_rollups
+from src.services.tenant_registry import all_tenant_ids
+from src.database.firebase_client import firebase_client
+from src.config.firebase_config import firebase_config
+from src.config.settings import settings
+from src.utils.tenant import tenant_scope
+from src.utils.logger import logger
+
+
+def rebuild_rollups(days: int = None) -> int:
+    """Recompute every tenant's rollup buckets for the last `days` days."""
+    logger.info("Starting analytics rollup rebuild...")
+    
+    # Initialize Firebase
+    firebase_config.initialize()
+    
+    days = days or settings.archive_retention_days
+    # Start of the first day so no daily bucket is rebuilt from part of its data
+    since = (datetime.utcnow() - timedelta(days=days)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    
+    written = 0
+    for tenant_id in all_tenant_ids():
+        try:
+            with tenant_scope(tenant_id):
+                written += analytics_rollups.rebuild(firebase_client.get_all_help_requests(), since)
+        except Exception as e:
+            logger.error(f"Rollup rebuild failed for tenant {tenant_id}: {str(e)}")
+    return written
+
+
+if __name__ == "__main__":
+    days = None
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+    
+    count = rebuild_rollups(days)
+    print(f"Rollup rebuild complete. Wrote {count} buckets.")
\ No newline at end of file
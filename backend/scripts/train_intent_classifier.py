@@ -0,0 +1,193 @@
+"""
+Train, evaluate and benchmark the local intent classifier.
+
+    python scripts/train_intent_classifier.py [--firebase] [--output PATH]
+
+Training data is the seed knowledge base plus the example utterances
+below. With --firebase, categorized knowledge entries and the help
+requests they were learned from are added too. A stratified holdout is
+scored first, then the model is retrained on everything and saved.
+"""
+import sys
+sys.path.append('.')
+
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from scripts.seed_knowledge import INITIAL_KNOWLEDGE
+from src.services.intent_classifier import IntentClassifier, OTHER_INTENT
+from src.config.settings import settings
+from src.utils.logger import logger
+
+EXAMPLES: Dict[str, List[str]] = {
+    "greeting": [
+        "hi", "hello", "hey", "hi there", "hello there", "good morning",
+        "good afternoon", "good evening", "hey how are you", "hiya",
+        "hello is this the salon", "hi is this glamour haven", "yo", "howdy",
+    ],
+    "thanks": [
+        "thanks", "thank you", "thank you so much", "thanks a lot", "great thanks",
+        "perfect thank you", "awesome thanks", "cheers", "thanks for the help",
+        "that's helpful thank you", "appreciate it", "many thanks",
+    ],
+    "goodbye": [
+        "bye", "goodbye", "bye bye", "see you", "see you later", "have a nice day",
+        "talk to you later", "that's all bye", "ok bye", "that's everything goodbye",
+        "have a good one", "take care",
+    ],
+    "small_talk": [
+        "how are you", "how's it going", "how are you doing today", "are you a robot",
+        "are you a real person", "what's your name", "who am i talking to",
+        "nice weather today", "are you human", "how is your day",
+    ],
+    "hours": [
+        "when are you open", "what time do you close", "are you open on sunday",
+        "what are your hours on saturday", "what time do you open tomorrow",
+        "are you open late on friday", "opening hours", "until what time are you open",
+        "are you open today", "what days are you closed", "are you open on holidays",
+        "how late are you open tonight", "do you open early on weekdays", "what are your hours",
+        "is the salon open now", "when do you close on sunday",
+    ],
+    "pricing": [
+        "how much is a haircut", "what do you charge for highlights",
+        "how much for a manicure", "what's the price of balayage",
+        "how much does a facial cost", "price list please", "how expensive is keratin",
+        "what does a pedicure cost", "how much is waxing",
+        "how much do highlights cost", "what are your prices", "is a men's cut expensive",
+        "how much would coloring be", "what's the cost of gel nails", "rates for a blowout",
+        "how much do you charge for a trim",
+    ],
+    "services": [
+        "do you do keratin treatments", "do you offer waxing", "can i get my nails done",
+        "do you do highlights", "do you cut men's hair", "do you offer gel nails",
+        "what services do you have", "do you do hair extensions", "can you dye my hair",
+        "do you do pedicures", "do you offer facials", "can i get a blowout",
+        "do you do kids haircuts", "do you do balayage", "do you style hair for events",
+    ],
+    "location": [
+        "what's your address", "where is the salon", "how do i get there",
+        "is there parking", "are you near the metro", "which street are you on",
+        "where can i park", "directions to the salon",
+        "where exactly are you", "what part of town are you in", "is there a parking lot",
+        "how far are you from the station", "are you downtown", "what's the nearest bus stop",
+    ],
+    "booking": [
+        "i'd like to book an appointment", "can i make a reservation",
+        "i want to schedule a haircut", "can i book for tomorrow", "do you have any openings",
+        "can i come in without an appointment", "book me in for friday",
+        "how can i reserve a slot", "i need an appointment",
+        "can i book online", "is there availability this weekend", "i want to book a manicure",
+        "what's the phone number to book", "can i get a slot next week", "do i need to book ahead",
+    ],
+    "policies": [
+        "can i cancel my appointment", "what if i'm late", "do you charge for cancellations",
+        "how much notice to reschedule", "what's the late policy", "can i change my booking",
+        "is there a cancellation fee", "what happens if i miss my appointment",
+        "how do i cancel", "can i move my appointment to another day", "do you need a deposit",
+        "what's your refund policy", "what if i need to reschedule", "is there a no show fee",
+    ],
+    OTHER_INTENT: [
+        "is sarah working on tuesday", "what brand of shampoo do you use",
+        "do you sell gift cards", "can i bring my dog", "do you have wheelchair access",
+        "is my stylist available next week", "do you use organic products",
+        "can you do bridal hair for a wedding party", "do you have a loyalty program",
+        "are you hiring", "do you do eyelash extensions", "can i pay with crypto",
+        "which stylist is best for curly hair", "can you match a color from a photo",
+        "is the owner there", "did i leave my scarf there yesterday", "my hair turned green after my visit",
+        "do you carry olaplex", "can my daughter come with me", "what products did you use on me last time",
+    ],
+}
+
+
+def build_examples(from_firebase: bool = False) -> List[Tuple[str, str]]:
+    """Labeled (utterance, intent) pairs."""
+    examples = [(text, intent) for intent, texts in EXAMPLES.items() for text in texts]
+    examples.extend((item["question"], item["category"]) for item in INITIAL_KNOWLEDGE)
+    
+    if from_firebase:
+        from src.config.firebase_config import firebase_config
+        from src.database.firebase_client import firebase_client
+        firebase_config.initialize()
+        
+        questions = {r['request_id']: r.get('question') for r in firebase_client.get_all_help_requests()}
+        for entry in firebase_client.get_all_knowledge():
+            category = entry.get('category')
+            if not category:
+                continue
+            examples.append((entry['question'], category))
+            for request_id in entry.get('source_request_ids') or []:
+                if questions.get(request_id):
+                    examples.append((questions[request_id], category))
+    
+    return examples
+
+
+def split(examples: List[Tuple[str, str]], holdout_every: int = 4) -> tuple:
+    """Stratified, deterministic train/holdout split."""
+    by_label = defaultdict(list)
+    for example in examples:
+        by_label[example[1]].append(example)
+    
+    train, holdout = [], []
+    for items in by_label.values():
+        random.Random(0).shuffle(items)
+        for i, example in enumerate(items):
+            (holdout if i % holdout_every == 0 else train).append(example)
+    return train, holdout
+
+
+def evaluate(model: IntentClassifier, holdout: List[Tuple[str, str]]):
+    """Print accuracy, per-intent recall and routed-turn precision."""
+    correct = defaultdict(int)
+    total = defaultdict(int)
+    routed = routed_correct = 0
+    for text, label in holdout:
+        intent, probability = model.predict(text)
+        total[label] += 1
+        correct[label] += intent == label
+        if intent != OTHER_INTENT and probability >= settings.intent_min_confidence:
+            routed += 1
+            routed_correct += intent == label
+    
+    accuracy = sum(correct.values()) / len(holdout)
+    print(f"Holdout accuracy: {accuracy:.1%} on {len(holdout)} utterances")
+    for label in sorted(total):
+        print(f"  {label:<12} {correct[label]}/{total[label]}")
+    if routed:
+        print(
+            f"Routed at confidence >= {settings.intent_min_confidence}: "
+            f"{routed}/{len(holdout)} turns, {routed_correct / routed:.1%} correct"
+        )
+
+
+def benchmark(model: IntentClassifier, texts: List[str], repeat: int = 200):
+    """Print per-utterance prediction latency."""
+    timings = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            model.predict(text)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"Prediction latency: mean {mean * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    output = settings.intent_model_path
+    if "--output" in sys.argv:
+        output = sys.argv[sys.argv.index("--output") + 1]
+    
+    examples = build_examples("--firebase" in sys.argv)
+    labels = sorted({label for _, label in examples})
+    
+    train, holdout = split(examples)
+    evaluate(IntentClassifier(labels).fit(train), holdout)
+    
+    model = IntentClassifier(labels).fit(examples)
+    benchmark(model, [text for text, _ in examples])
+    model.save(output)
+    logger.info(f"Intent model with {len(labels)} intents saved to {output}")
+    print(f"Saved model to {output}")
\ No newline at end of file
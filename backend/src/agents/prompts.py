@@ -2,7 +2,47 @@
 System prompts for the salon AI agent.
 """
 
-SALON_SYSTEM_PROMPT = """You are a friendly and professional AI assistant for "Glamour Haven Salon".
+# Salon details of the default tenant; other tenants store their own
+# profile at /tenants/{tenant_id}/profile with the same keys
+DEFAULT_SALON_PROFILE = {
+    "salon_name": "Glamour Haven Salon",
+    "hours": [
+        "Monday - Friday: 9:00 AM - 8:00 PM",
+        "Saturday: 9:00 AM - 6:00 PM",
+        "Sunday: 10:00 AM - 5:00 PM",
+        "Closed on major holidays",
+    ],
+    "services": [
+        "Haircut (Women): $45-75",
+        "Haircut (Men): $30-45",
+        "Hair Coloring: $80-150",
+        "Highlights: $100-180",
+        "Balayage: $150-250",
+        "Keratin Treatment: $200-300",
+        "Manicure: $25-35",
+        "Pedicure: $35-50",
+        "Gel Nails: $45-60",
+        "Facial: $60-100",
+        "Waxing: Starting at $15",
+    ],
+    "location": [
+        "123 Beauty Street, Downtown",
+        "Easy parking available",
+        "Near the central metro station",
+    ],
+    "booking": [
+        "Call us: (555) 123-4567",
+        "Book online: www.glamourhaven.com",
+        "Walk-ins welcome (subject to availability)",
+    ],
+    "policies": [
+        "24-hour cancellation notice required",
+        "Late arrivals may need to reschedule",
+        "Consultation available for major services",
+    ],
+}
+
+SALON_SYSTEM_PROMPT_TEMPLATE = """You are a friendly and professional AI assistant for "{salon_name}".
 
 YOUR ROLE:
 - Answer customer questions about our salon services, hours, and pricing
@@ -12,38 +52,19 @@ YOUR ROLE:
 SALON INFORMATION:
 
 Business Hours:
-- Monday - Friday: 9:00 AM - 8:00 PM
-- Saturday: 9:00 AM - 6:00 PM
-- Sunday: 10:00 AM - 5:00 PM
-- Closed on major holidays
+{hours}
 
 Services & Pricing:
-- Haircut (Women): $45-75
-- Haircut (Men): $30-45
-- Hair Coloring: $80-150
-- Highlights: $100-180
-- Balayage: $150-250
-- Keratin Treatment: $200-300
-- Manicure: $25-35
-- Pedicure: $35-50
-- Gel Nails: $45-60
-- Facial: $60-100
-- Waxing: Starting at $15
+{services}
 
 Location:
-- 123 Beauty Street, Downtown
-- Easy parking available
-- Near the central metro station
+{location}
 
 Booking:
-- Call us: (555) 123-4567
-- Book online: www.glamourhaven.com
-- Walk-ins welcome (subject to availability)
+{booking}
 
 Policies:
-- 24-hour cancellation notice required
-- Late arrivals may need to reschedule
-- Consultation available for major services
+{policies}
 
 SPECIAL INSTRUCTIONS:
 1. If asked about specific stylist availability, product brands, or anything not in your knowledge base, say:
@@ -57,9 +78,106 @@ SPECIAL INSTRUCTIONS:
 """
 
 
-def get_escalation_message() -> str:
-    """Message to customer when escalating to supervisor."""
-    return "Let me check with my supervisor and get back to you with the most accurate information. I'll text you the answer shortly. Can I confirm your phone number?"
+def build_system_prompt(profile: dict = None) -> str:
+    """
+    System prompt for a salon profile.
+    
+    Missing keys fall back to the default salon's values.
+    """
+    profile = {**DEFAULT_SALON_PROFILE, **(profile or {})}
+    sections = {
+        key: "\n".join(f"- {line}" for line in profile[key])
+        for key in ("hours", "services", "location", "booking", "policies")
+    }
+    return SALON_SYSTEM_PROMPT_TEMPLATE.format(salon_name=profile["salon_name"], **sections)
+
+
+SALON_SYSTEM_PROMPT = build_system_prompt(DEFAULT_SALON_PROFILE)
+
+
+SMALL_TALK_RESPONSES = {
+    "greeting": "Hello! Welcome to {salon_name}. How can I help you today?",
+    "thanks": "You're welcome! Is there anything else I can help you with?",
+    "goodbye": "Thanks for calling {salon_name}. Have a wonderful day!",
+    "small_talk": "I'm doing great, thanks for asking! What can I help you with today?",
+}
+
+
+def get_small_talk_response(intent: str, salon_name: str = None) -> str:
+    """Canned reply for greetings, thanks, goodbyes and small talk."""
+    template = SMALL_TALK_RESPONSES.get(intent, SMALL_TALK_RESPONSES["small_talk"])
+    return template.format(salon_name=salon_name or DEFAULT_SALON_PROFILE["salon_name"])
+
+
+def get_escalation_message(has_phone: bool = True) -> str:
+    """Message to customer when escalating to supervisor; asks for a number to text if there is none."""
+    if has_phone:
+        return "Let me check with my supervisor to get you the most accurate information. If you stay on the line, I'll tell you as soon as they get back to me; if it takes a while, I'll text you their answer."
+    return "Let me check with my supervisor to get you the most accurate information. If you stay on the line, I'll tell you as soon as they get back to me. In case it takes a while, what's the best number to text you at?"
+
+
+def get_live_answer_message(answer: str) -> str:
+    """Message to customer when the supervisor answers while they are still on the call."""
+    return f"Good news, my supervisor just got back to me. {answer}"
+
+
+def get_reassurance_message() -> str:
+    """Message to customer who is still waiting on the supervisor."""
+    return "I'm still waiting to hear back from my supervisor. Thanks for your patience, it shouldn't be much longer."
+
+
+def get_live_wait_over_message(has_phone: bool = True) -> str:
+    """Message to customer when the supervisor hasn't answered during the call."""
+    if has_phone:
+        return "My supervisor hasn't gotten back to me yet, so I'll text you their answer as soon as I have it."
+    return "My supervisor hasn't gotten back to me yet. If you tell me your phone number, I'll text you their answer as soon as I have it."
+
+
+def get_phone_noted_message() -> str:
+    """Message to customer who just gave a number to text the answer to."""
+    return "Thanks, I've got your number. I'll text you there if my supervisor's answer comes after you hang up."
+
+
+def get_busy_message() -> str:
+    """Message to customer when the system is too busy to take their question."""
+    return "We're getting a lot of calls right now and I couldn't pass your question on to my supervisor. Please call us back in a few minutes."
+
+
+def get_customer_history_prompt(history: list, max_chars: int = 800) -> str:
+    """
+    Summary of a returning caller's recent questions.
+    
+    Args:
+        history: Help request summaries, newest first
+        max_chars: Budget for the whole section; older items are dropped
+    
+    Returns:
+        Formatted context string ("" for first-time callers)
+    """
+    if not history:
+        return ""
+    
+    header = "RETURNING CUSTOMER - their recent questions (newest first):"
+    lines = []
+    used = len(header)
+    for item in history:
+        asked = (item.get('created_at') or '')[:10]
+        question = item.get('question', '')
+        answer = item.get('answer')
+        if answer:
+            line = f'- {asked}: "{question}" -> answered: "{answer}"'
+        elif item.get('status') == 'pending':
+            line = f'- {asked}: "{question}" -> still waiting for a supervisor answer'
+        else:
+            line = f'- {asked}: "{question}" -> not answered'
+        if used + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    
+    if not lines:
+        return ""
+    return "\n".join([header] + lines)
 
 
 def get_knowledge_context_prompt(knowledge_entries: list) -> str:
@@ -2,24 +2,83 @@
 LiveKit AI Agent for salon customer service.
 """
 import asyncio
+import json
+import re
+import time
+from typing import Optional
 from livekit import agents, rtc
 from livekit.agents import llm, WorkerOptions, cli
-from src.agents.prompts import SALON_SYSTEM_PROMPT, get_escalation_message
-from src.services.ai_service import ai_service
-from src.services.knowledge_service import knowledge_service
+from src.agents.prompts import (
+    get_escalation_message, get_busy_message, get_small_talk_response, get_customer_history_prompt,
+    get_live_answer_message, get_reassurance_message, get_live_wait_over_message,
+    get_phone_noted_message
+)
+from src.agents.turns import TurnRunner
+from src.agents.voice_pipeline import VoicePipeline, EnergyVAD, load_engine, voice_latency
+from src.services.answer_engine import answer_engine, AnswerTier
 from src.services.help_request_service import help_request_service
-from src.models.help_request import HelpRequestCreate
+from src.services.analytics_rollups import analytics_rollups
+from src.services.tenant_registry import tenant_registry
+from src.services.customer_service import customer_service
+from src.services.resolution_events import resolution_events, ResolutionSubscription
+from src.models.help_request import HelpRequestCreate, RequestStatus
 from src.config.settings import settings
+from src.utils.exceptions import AdmissionDeniedError
+from src.utils.tenant import set_tenant, tenant_from_room
+from src.utils.validators import normalize_phone_number
 from src.utils.logger import logger
 
+# A phone number typed or transcribed in a turn: ten or more digits,
+# optionally grouped by spaces, dots, dashes or parentheses
+PHONE_IN_TEXT = re.compile(r"\+?\(?\d[\d\s().-]{8,}\d")
+
+
+def phone_from_participant(participant: rtc.Participant) -> Optional[str]:
+    """
+    Caller's phone number, if the participant carries one.
+    
+    SIP callers expose it as the `sip.phoneNumber` attribute or in an
+    identity like "sip_+15551234567"; other clients may put a "phone"
+    field in their JSON metadata.
+    """
+    candidates = [(getattr(participant, 'attributes', None) or {}).get('sip.phoneNumber')]
+    try:
+        metadata = json.loads(participant.metadata or '{}')
+        if isinstance(metadata, dict):
+            candidates.append(metadata.get('phone'))
+    except ValueError:
+        pass
+    candidates.append((participant.identity or '').removeprefix('sip_'))
+    
+    for candidate in candidates:
+        phone = normalize_phone_number(candidate)
+        if phone:
+            return phone
+    return None
+
+
+def phone_in_message(text: str) -> Optional[str]:
+    """Phone number a caller gives in a turn, if any."""
+    for candidate in PHONE_IN_TEXT.findall(text):
+        phone = normalize_phone_number(candidate)
+        if phone and len(phone.lstrip('+')) >= 10:
+            return phone
+    return None
+
 
 class SalonAgent:
     """
     AI agent for handling salon customer calls with human escalation.
+    
+    With STT and TTS engines the caller is heard and answered by voice;
+    without them the agent exchanges text messages over the data channel.
     """
     
-    def __init__(self):
+    def __init__(self, stt_engine=None, tts_engine=None, vad_engine=None):
         self.session_data = {}
+        self.stt = stt_engine
+        self.tts = tts_engine
+        self.vad = vad_engine or EnergyVAD()
     
     async def entrypoint(self, ctx: agents.JobContext):
         """
@@ -27,14 +86,29 @@ class SalonAgent:
         
         This is called when a new call comes in.
         """
-        logger.info(f"Agent started for room: {ctx.room.name}")
+        # Everything this job does (including worker threads) is scoped
+        # to the salon the room belongs to
+        tenant_id = tenant_from_room(ctx.room.name)
+        set_tenant(tenant_id)
+        logger.info(f"Agent started for room: {ctx.room.name} (tenant {tenant_id})")
         
         # Initialize session data
         session_id = ctx.room.name
         self.session_data[session_id] = {
             'customer_phone': None,
             'customer_name': None,
-            'conversation_history': []
+            'customer_context': "",
+            'conversation_history': [],
+            'turns': TurnRunner(),
+            # Says something to the caller outside a turn; set by the conversation loop
+            'speak': None,
+            # Follow-ups on this call's escalations, waiting for the supervisor
+            'escalations': set(),
+            # (request_id, question) escalated while the caller's number
+            # is unknown; filled in if they give one
+            'awaiting_phone': [],
+            # Set once the caller is gone, so no new follow-ups start
+            'call_ended': False
         }
         
         # Connect to the room
@@ -44,8 +118,34 @@ class SalonAgent:
         participant = await ctx.wait_for_participant()
         logger.info(f"Participant joined: {participant.identity}")
         
+        def on_disconnected(left: rtc.Participant):
+            # Nobody is left to hear the answer being worked on
+            if left.identity == participant.identity:
+                asyncio.create_task(self.session_data[session_id]['turns'].aclose())
+                self._cancel_escalations(session_id)
+        
+        ctx.room.on("participant_disconnected", on_disconnected)
+        await asyncio.to_thread(analytics_rollups.record_call)
+        
+        # Load the caller's profile now so no turn waits on it; the call
+        # count is written behind
+        phone = phone_from_participant(participant)
+        if phone:
+            profile = await asyncio.to_thread(customer_service.prefetch, phone)
+            self.session_data[session_id]['customer_phone'] = phone
+            self.session_data[session_id]['customer_name'] = profile.name if profile else None
+            # Prefetched with the profile; fixed for the call, so no turn pays for it
+            self.session_data[session_id]['customer_context'] = get_customer_history_prompt(
+                customer_service.get_history(phone),
+                settings.customer_history_max_chars
+            )
+            await asyncio.to_thread(customer_service.record_call, phone)
+        
         # Start the conversation
-        await self._run_conversation(ctx, participant, session_id)
+        if self.stt and self.tts:
+            await self._run_voice_conversation(ctx, participant, session_id)
+        else:
+            await self._run_conversation(ctx, participant, session_id)
     
     async def _run_conversation(
         self, 
@@ -57,34 +157,126 @@ class SalonAgent:
         Main conversation loop.
         """
         # Initial greeting
-        greeting = "Hello! Welcome to Glamour Haven Salon. How can I help you today?"
+        greeting = get_small_talk_response("greeting", tenant_registry.get().salon_name)
         await ctx.room.local_participant.publish_data(
             greeting.encode(), 
             reliable=True
         )
         
-        # Listen for customer messages
-        async for event in rtc.RoomEvent.room_events(ctx.room):
-            if isinstance(event, rtc.DataReceived):
-                message = event.data.decode()
-                logger.info(f"Customer: {message}")
-                
-                # Add to conversation history
-                self.session_data[session_id]['conversation_history'].append({
-                    'role': 'user',
-                    'content': message
-                })
-                
-                # Process the message
-                response = await self._process_message(message, session_id)
-                
-                # Send response
-                await ctx.room.local_participant.publish_data(
-                    response.encode(),
-                    reliable=True
+        async def send(text: str):
+            await ctx.room.local_participant.publish_data(
+                text.encode(),
+                reliable=True
+            )
+            logger.info(f"Agent: {text}")
+        
+        async def reply(message: str):
+            await send(await self._respond(message, session_id))
+        
+        self.session_data[session_id]['speak'] = send
+        
+        # Listen for customer messages; each one supersedes a reply still
+        # being worked on
+        turns = self.session_data[session_id]['turns']
+        try:
+            async for event in rtc.RoomEvent.room_events(ctx.room):
+                if isinstance(event, rtc.DataReceived):
+                    message = event.data.decode()
+                    logger.info(f"Customer: {message}")
+                    turns.start(reply(message))
+        finally:
+            await turns.aclose()
+            self._cancel_escalations(session_id)
+    
+    async def _run_voice_conversation(
+        self,
+        ctx: agents.JobContext,
+        participant: rtc.Participant,
+        session_id: str
+    ):
+        """
+        Conversation by voice: the caller's audio track in, the agent's
+        voice track out, until the caller's audio ends (hang-up).
+        """
+        async def on_utterance(text: str):
+            logger.info(f"Customer: {text}")
+            response = await self._respond(text, session_id)
+            await pipeline.say(response)
+            logger.info(f"Agent: {response}")
+        
+        pipeline = VoicePipeline(
+            self.stt, self.vad, self.tts, on_utterance,
+            turns=self.session_data[session_id]['turns']
+        )
+        await pipeline.publish(ctx.room)
+        self.session_data[session_id]['speak'] = pipeline.say
+        track = await self._caller_audio_track(ctx.room, participant)
+        
+        await pipeline.say(get_small_talk_response("greeting", tenant_registry.get().salon_name))
+        try:
+            await pipeline.run(rtc.AudioStream(track))
+        finally:
+            await pipeline.aclose()
+            self._cancel_escalations(session_id)
+            logger.info(f"Voice latency so far: {voice_latency.get_stats()}")
+    
+    @staticmethod
+    async def _caller_audio_track(room: rtc.Room, participant: rtc.Participant) -> rtc.Track:
+        """The caller's audio track, waiting for it to be subscribed if needed."""
+        for publication in participant.track_publications.values():
+            if publication.track and publication.kind == rtc.TrackKind.KIND_AUDIO:
+                return publication.track
+        
+        subscribed = asyncio.get_running_loop().create_future()
+        
+        def on_track_subscribed(track, publication, track_participant):
+            if (
+                track_participant.identity == participant.identity
+                and track.kind == rtc.TrackKind.KIND_AUDIO
+                and not subscribed.done()
+            ):
+                subscribed.set_result(track)
+        
+        room.on("track_subscribed", on_track_subscribed)
+        try:
+            return await subscribed
+        finally:
+            room.off("track_subscribed", on_track_subscribed)
+    
+    async def _respond(self, message: str, session_id: str) -> str:
+        """Record the customer's turn and answer it."""
+        session = self.session_data[session_id]
+        session['conversation_history'].append({
+            'role': 'user',
+            'content': message
+        })
+        
+        if session['awaiting_phone'] and not session.get('customer_phone'):
+            phone = phone_in_message(message)
+            if phone:
+                # Shielded like escalation: the number must reach the requests
+                return await asyncio.shield(self._take_phone(phone, session_id))
+        return await self._process_message(message, session_id)
+    
+    async def _take_phone(self, phone: str, session_id: str) -> str:
+        """Remember the number a caller gave and add it to the requests they escalated."""
+        session = self.session_data[session_id]
+        session['customer_phone'] = phone
+        awaiting, session['awaiting_phone'] = session['awaiting_phone'], []
+        for request_id, question in awaiting:
+            try:
+                await asyncio.to_thread(
+                    help_request_service.add_customer_phone, request_id, phone, question
                 )
-                
-                logger.info(f"Agent: {response}")
+            except Exception as e:
+                logger.error(f"Failed to add customer phone to {request_id}: {str(e)}")
+        
+        message = get_phone_noted_message()
+        session['conversation_history'].append({
+            'role': 'assistant',
+            'content': message
+        })
+        return message
     
     async def _process_message(self, message: str, session_id: str) -> str:
         """
@@ -93,24 +285,22 @@ class SalonAgent:
         Returns:
             AI response or escalation message
         """
-        # Search knowledge base
-        relevant_knowledge = knowledge_service.search_knowledge(message)
-        
-        # Build context
-        knowledge_list = [entry.to_dict() for entry in relevant_knowledge]
-        
-        # Check if AI can answer
-        needs_help, answer = ai_service.check_if_needs_help(
-            message, 
-            knowledge_list
+        # Stored answer if trusted, otherwise the LLM with knowledge as context.
+        # Off the event loop, so concurrent sessions overlap and identical
+        # LLM calls are coalesced; cancelling the turn cancels the LLM request.
+        # While the LLM is shedding load the engine falls back to cached or
+        # stored answers, or escalates
+        result = await answer_engine.aanswer(
+            message,
+            self.session_data[session_id]['customer_context']
         )
         
-        if needs_help:
+        if result.tier == AnswerTier.ESCALATE:
             # Escalate to supervisor
             logger.info("Escalating to supervisor")
-            return await self._escalate_to_supervisor(message, session_id)
+            return await self._escalate_to_supervisor(message, session_id, result.intent)
         
-        # AI can answer
+        answer = result.answer
         self.session_data[session_id]['conversation_history'].append({
             'role': 'assistant',
             'content': answer
@@ -121,35 +311,121 @@ class SalonAgent:
     async def _escalate_to_supervisor(
         self, 
         question: str, 
-        session_id: str
+        session_id: str,
+        category: Optional[str] = None
     ) -> str:
         """
         Create help request and notify supervisor.
         
+        `category` (the predicted FAQ intent, if any) routes the request
+        to supervisors with that skill.
+        
         Returns:
             Message to customer about escalation
         """
         session = self.session_data.get(session_id, {})
         
-        # Get customer phone (you'd collect this earlier in real implementation)
-        customer_phone = session.get('customer_phone', 'unknown')
+        # Caller's number from their participant info, if they had one
+        customer_phone = session.get('customer_phone') or 'unknown'
         
         # Create help request
         request_data = HelpRequestCreate(
             customer_phone=customer_phone,
             customer_name=session.get('customer_name'),
             question=question,
-            context=str(session.get('conversation_history', []))
+            context=str(session.get('conversation_history', [])),
+            category=category
         )
         
+        # Shielded: a newer turn superseding this one must not stop the
+        # request from being created and followed up
+        return await asyncio.shield(self._open_escalation(request_data, session_id))
+    
+    async def _open_escalation(self, request_data: HelpRequestCreate, session_id: str) -> str:
+        """
+        Create the help request and start following it up.
+        
+        Returns:
+            Message to customer about escalation
+        """
         try:
-            help_request = help_request_service.create_request(request_data)
+            help_request = await asyncio.to_thread(help_request_service.create_request, request_data)
             logger.info(f"Help request created: {help_request.request_id}")
+        except AdmissionDeniedError:
+            logger.warning("Could not escalate: system overloaded")
+            return get_busy_message()
         except Exception as e:
             logger.error(f"Failed to create help request: {str(e)}")
             return "I'm having trouble connecting to my supervisor. Please call us back shortly."
         
-        return get_escalation_message()
+        session = self.session_data[session_id]
+        has_phone = normalize_phone_number(request_data.customer_phone) is not None
+        if session.get('call_ended'):
+            # The caller hung up meanwhile; they get the answer by text
+            return get_escalation_message(has_phone)
+        if not has_phone:
+            session['awaiting_phone'].append((help_request.request_id, request_data.question))
+        
+        # Follow up outside this turn, so the caller's next questions
+        # neither wait for the supervisor nor cancel the follow-up
+        subscription = resolution_events.subscribe(help_request.request_id)
+        escalations = session['escalations']
+        task = asyncio.create_task(self._await_supervisor(subscription, session_id))
+        escalations.add(task)
+        task.add_done_callback(escalations.discard)
+        
+        return get_escalation_message(has_phone)
+    
+    async def _await_supervisor(self, subscription: ResolutionSubscription, session_id: str):
+        """
+        Stay with the caller while the supervisor works on their request.
+        
+        Gives the supervisor's answer the moment it is published, and
+        reassures the caller at each `escalation_reassure_after` mark
+        (unless a turn is under way). After `escalation_live_wait`
+        seconds the answer is left to the text message.
+        """
+        session = self.session_data[session_id]
+        live_wait = settings.escalation_live_wait
+        marks = sorted(mark for mark in settings.escalation_reassure_after if mark < live_wait)
+        started = time.monotonic()
+        try:
+            resolution = None
+            for mark in marks + [live_wait]:
+                resolution = await subscription.wait(max(0.0, started + mark - time.monotonic()))
+                if resolution:
+                    break
+                if mark == live_wait:
+                    logger.info(f"No answer to {subscription.request_id} during the call")
+                    await session['speak'](
+                        get_live_wait_over_message(bool(session.get('customer_phone')))
+                    )
+                    return
+                if not session['turns'].busy:
+                    await session['speak'](get_reassurance_message())
+            
+            if resolution.status != RequestStatus.RESOLVED or not resolution.answer:
+                logger.info(f"Request {subscription.request_id} ended as {resolution.status.value}")
+                return
+            message = get_live_answer_message(resolution.answer)
+            session['conversation_history'].append({
+                'role': 'assistant',
+                'content': message
+            })
+            logger.info(f"Supervisor answered {subscription.request_id} during the call")
+            await session['speak'](message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Escalation follow-up failed: {str(e)}")
+        finally:
+            subscription.close()
+    
+    def _cancel_escalations(self, session_id: str):
+        """The caller left: stop following up (they get the answer by text)."""
+        self.session_data[session_id]['call_ended'] = True
+        for task in list(self.session_data[session_id]['escalations']):
+            task.cancel()
 
 
 def main():
@@ -159,7 +435,11 @@ def main():
     Usage:
         python -m src.agents.salon_agent
     """
-    agent = SalonAgent()
+    agent = SalonAgent(
+        stt_engine=load_engine('stt', settings.voice_stt),
+        tts_engine=load_engine('tts', settings.voice_tts),
+        vad_engine=load_engine('vad', settings.voice_vad)
+    )
     
     # Configure worker
     worker = WorkerOptions(
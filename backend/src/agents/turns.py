@@ -0,0 +1,54 @@
+"""
+Cancellable conversation turns.
+
+Each customer turn (a text message or a spoken utterance) runs as its
+own task. A newer turn supersedes the one still in flight: its knowledge
+search result is discarded, its LLM request is cancelled and its reply
+is never sent. Hanging up cancels whatever is left.
+"""
+import asyncio
+from typing import Awaitable, Optional
+from src.utils.logger import logger
+
+
+class TurnRunner:
+    """
+    Runs at most one turn of a call at a time, the latest one.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'started': 0, 'superseded': 0}
+    
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self, turn: Awaitable) -> asyncio.Task:
+        """Run `turn`, cancelling the previous turn if it is still running."""
+        if self.busy:
+            self.stats['superseded'] += 1
+            logger.info("Newer input: cancelling the turn in flight")
+            self._task.cancel()
+        self.stats['started'] += 1
+        self._task = asyncio.create_task(self._run(turn))
+        return self._task
+    
+    @staticmethod
+    async def _run(turn: Awaitable):
+        try:
+            await turn
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Turn failed: {str(e)}")
+    
+    async def aclose(self):
+        """Cancel the turn in flight (the call ended) and wait for it to stop."""
+        task, self._task = self._task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
\ No newline at end of file
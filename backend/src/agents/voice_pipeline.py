@@ -0,0 +1,381 @@
+"""
+Voice pipeline for phone calls.
+
+    caller audio -> VAD + streaming STT -> endpointed utterance
+                 -> answer (SalonAgent) -> sentence-by-sentence TTS -> playback
+
+Engines are livekit-agents STT, VAD and TTS implementations, so any
+livekit plugin, or an offline engine in tests, can be plugged in; see
+load_engine(). A turn is committed once the VAD has heard
+`voice_min_silence` seconds of silence and a further
+`voice_endpoint_delay` has passed without the caller speaking again,
+which leaves time for the STT's last final transcript to arrive.
+Replies are split into sentences: the first one is played as soon as
+its audio arrives while the next one is being synthesized.
+
+The caller can barge in: speech detected while the agent is talking
+stops playback at once, and a newly committed utterance cancels the turn
+still being answered (see TurnRunner).
+"""
+import asyncio
+import importlib
+import math
+import time
+from collections import deque
+from typing import AsyncIterable, Awaitable, Callable, List, Optional
+import numpy as np
+from livekit import rtc
+from livekit.agents import stt, tts, vad
+from livekit.agents.tokenize import basic
+from src.agents.turns import TurnRunner
+from src.config.settings import settings
+from src.utils.logger import logger
+
+# Latency stages of a turn, in pipeline order
+LATENCY_STAGES = ('endpointing', 'answer', 'first_audio', 'total')
+
+
+def frame_level_db(frame: rtc.AudioFrame) -> float:
+    """RMS level of a 16-bit frame in dBFS (-100 for silence)."""
+    samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+    if samples.size == 0:
+        return -100.0
+    rms = math.sqrt(float(np.mean(samples * samples)))
+    return 20 * math.log10(rms / 32768) if rms > 0 else -100.0
+
+
+class EnergyVAD(vad.VAD):
+    """
+    Offline voice activity detection by frame loudness.
+    
+    Good enough for phone audio with little background noise, and needs
+    no model; use a model-based VAD (e.g. silero) for noisy lines.
+    """
+    
+    def __init__(self, threshold_db: float = None, min_speech: float = None, min_silence: float = None):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=0.01))
+        self.threshold_db = threshold_db if threshold_db is not None else settings.voice_vad_threshold_db
+        self.min_speech = min_speech if min_speech is not None else settings.voice_min_speech
+        self.min_silence = min_silence if min_silence is not None else settings.voice_min_silence
+    
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self)
+
+
+class EnergyVADStream(vad.VADStream):
+    def __init__(self, detector: EnergyVAD):
+        self._detector = detector
+        super().__init__()
+    
+    async def _main_task(self):
+        detector = self._detector
+        speaking = False
+        frames: List[rtc.AudioFrame] = []
+        speech = silence = 0.0  # Seconds of loud / quiet audio in the current run
+        samples = 0
+        
+        async for frame in self._input_ch:
+            if isinstance(frame, self._FlushSentinel):
+                continue
+            duration = frame.samples_per_channel / frame.sample_rate
+            samples += frame.samples_per_channel
+            loud = frame_level_db(frame) >= detector.threshold_db
+            
+            if not speaking:
+                if not loud:
+                    speech, frames = 0.0, []
+                    continue
+                speech += duration
+                frames.append(frame)
+                if speech >= detector.min_speech:
+                    speaking, silence = True, 0.0
+                    self._event_ch.send_nowait(vad.VADEvent(
+                        type=vad.VADEventType.START_OF_SPEECH,
+                        samples_index=samples,
+                        speech_duration=speech,
+                        silence_duration=0.0,
+                        speaking=True
+                    ))
+                continue
+            
+            frames.append(frame)
+            if loud:
+                speech += duration
+                silence = 0.0
+                continue
+            silence += duration
+            if silence >= detector.min_silence:
+                self._event_ch.send_nowait(vad.VADEvent(
+                    type=vad.VADEventType.END_OF_SPEECH,
+                    samples_index=samples,
+                    speech_duration=speech,
+                    silence_duration=silence,
+                    frames=frames
+                ))
+                speaking, speech, frames = False, 0.0, []
+
+
+def load_engine(kind: str, name: str):
+    """
+    STT, VAD or TTS engine by name.
+    
+    "energy" is the built-in EnergyVAD; any other name is a livekit
+    plugin module (livekit-plugins-{name}) providing STT, VAD or TTS.
+    
+    Returns:
+        The engine, or None if `name` is empty or the plugin is missing
+    """
+    if not name:
+        return None
+    if kind == 'vad' and name == 'energy':
+        return EnergyVAD()
+    try:
+        module = importlib.import_module(f"livekit.plugins.{name}")
+    except ImportError:
+        logger.warning(f"Voice {kind} engine {name!r} not installed (pip install livekit-plugins-{name})")
+        return None
+    engine_cls = getattr(module, kind.upper())
+    # Model-backed VADs (e.g. silero) load their weights through load()
+    return engine_cls.load() if hasattr(engine_cls, 'load') else engine_cls()
+
+
+class TurnTiming:
+    """Timestamps (perf_counter) of one turn, from end of speech to first audio."""
+    
+    def __init__(self, speech_ended_at: float):
+        self.speech_ended_at = speech_ended_at
+        self.committed_at: Optional[float] = None
+        self.reply_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+    
+    def stages(self) -> dict:
+        return {
+            'endpointing': self.committed_at - self.speech_ended_at,
+            'answer': self.reply_at - self.committed_at,
+            'first_audio': self.first_audio_at - self.reply_at,
+            'total': self.first_audio_at - self.speech_ended_at,
+        }
+
+
+class VoiceLatencyStats:
+    """
+    End-to-end turn latency: end of the caller's speech to the first
+    audio of the reply, split into endpointing, answering and TTS.
+    """
+    
+    def __init__(self, window: int = None):
+        self._turns = deque(maxlen=window or settings.voice_latency_window)
+    
+    def record(self, timing: TurnTiming):
+        stages = timing.stages()
+        self._turns.append(stages)
+        logger.info(
+            f"Turn latency {stages['total'] * 1000:.0f}ms "
+            f"(endpointing {stages['endpointing'] * 1000:.0f}ms, "
+            f"answer {stages['answer'] * 1000:.0f}ms, "
+            f"first audio {stages['first_audio'] * 1000:.0f}ms)"
+        )
+    
+    def get_stats(self) -> dict:
+        """Turns measured, plus p50/p95 milliseconds per stage over recent turns."""
+        if not self._turns:
+            return {'turns': 0}
+        stats = {'turns': len(self._turns)}
+        for stage in LATENCY_STAGES:
+            values = np.array([turn[stage] for turn in self._turns]) * 1000
+            stats[stage] = {
+                'p50_ms': round(float(np.percentile(values, 50)), 1),
+                'p95_ms': round(float(np.percentile(values, 95)), 1),
+            }
+        return stats
+
+
+class VoicePipeline:
+    """
+    One call's audio in and speech out.
+    
+    Feed caller audio with run() (or push_frame()); each endpointed
+    utterance is passed to `on_utterance` as a new turn, superseding the
+    previous one, and replies are spoken with say().
+    """
+    
+    def __init__(
+        self,
+        stt_engine: stt.STT,
+        vad_engine: vad.VAD,
+        tts_engine: tts.TTS,
+        on_utterance: Callable[[str], Awaitable[None]],
+        playout=None,
+        endpoint_delay: float = None,
+        latency: Optional[VoiceLatencyStats] = None,
+        turns: Optional[TurnRunner] = None
+    ):
+        """
+        Args:
+            playout: Where reply audio goes (anything with an async
+                capture_frame(frame)); defaults to a new rtc.AudioSource,
+                published by publish()
+            turns: Runner for the call's turns, if shared with other input
+        """
+        self.tts = tts_engine
+        self.on_utterance = on_utterance
+        self.endpoint_delay = endpoint_delay if endpoint_delay is not None else settings.voice_endpoint_delay
+        self.latency = latency or voice_latency
+        self.playout = playout or rtc.AudioSource(tts_engine.sample_rate, tts_engine.num_channels)
+        self.interim = ""  # Latest interim transcript of the current utterance
+        
+        if not stt_engine.capabilities.streaming:
+            # Batch STT: recognize each VAD speech segment
+            stt_engine = stt.StreamAdapter(stt=stt_engine, vad=vad_engine)
+        self._stt_stream = stt_engine.stream()
+        self._vad_stream = vad_engine.stream()
+        self._sentences = basic.SentenceTokenizer()
+        
+        self._finals: List[str] = []
+        self._speaking = False
+        self._speech_ended_at: Optional[float] = None
+        self._endpoint_task: Optional[asyncio.Task] = None
+        self._endpoint_passed = False
+        self._pending_turn: Optional[TurnTiming] = None
+        self.turns = turns or TurnRunner()
+        self._playback: Optional[asyncio.Task] = None
+        self._interrupted: Optional[asyncio.Task] = None
+        self._speech = asyncio.Lock()
+        self.barge_ins = 0
+        self._tasks = [
+            asyncio.create_task(self._read_vad()),
+            asyncio.create_task(self._read_stt()),
+        ]
+    
+    async def publish(self, room: rtc.Room):
+        """Publish the agent's voice as a microphone track in `room`."""
+        track = rtc.LocalAudioTrack.create_audio_track("agent-voice", self.playout)
+        options = rtc.TrackPublishOptions(source=rtc.TrackSource.SOURCE_MICROPHONE)
+        await room.local_participant.publish_track(track, options)
+    
+    # Input
+    def push_frame(self, frame: rtc.AudioFrame):
+        self._vad_stream.push_frame(frame)
+        self._stt_stream.push_frame(frame)
+    
+    async def run(self, audio: AsyncIterable[rtc.AudioFrameEvent]):
+        """Feed caller audio (e.g. an rtc.AudioStream) until it ends."""
+        async for event in audio:
+            self.push_frame(event.frame)
+    
+    async def _read_vad(self):
+        async for event in self._vad_stream:
+            if event.type == vad.VADEventType.START_OF_SPEECH:
+                self._speaking = True
+                self.interrupt()
+                self._endpoint_passed = False
+                if self._endpoint_task:
+                    self._endpoint_task.cancel()
+            elif event.type == vad.VADEventType.END_OF_SPEECH:
+                self._speaking = False
+                self._speech_ended_at = time.perf_counter()
+                self._endpoint_task = asyncio.create_task(self._endpoint())
+    
+    async def _read_stt(self):
+        async for event in self._stt_stream:
+            if not event.alternatives:
+                continue
+            text = event.alternatives[0].text.strip()
+            if event.type == stt.SpeechEventType.INTERIM_TRANSCRIPT:
+                self.interim = text
+            elif event.type == stt.SpeechEventType.FINAL_TRANSCRIPT and text:
+                self._finals.append(text)
+                self.interim = ""
+                if self._endpoint_passed:
+                    # Transcript arrived after the endpoint delay
+                    self._commit()
+    
+    async def _endpoint(self):
+        await asyncio.sleep(self.endpoint_delay)
+        self._endpoint_passed = True
+        self._commit()
+    
+    def _commit(self):
+        """Hand the finished utterance on, if the caller is done and said something."""
+        if self._speaking or not self._finals:
+            return
+        text = " ".join(self._finals)
+        self._finals = []
+        self._endpoint_passed = False
+        timing = TurnTiming(self._speech_ended_at or time.perf_counter())
+        timing.committed_at = time.perf_counter()
+        self.turns.start(self._turn(text, timing))
+    
+    async def _turn(self, text: str, timing: TurnTiming):
+        self._pending_turn = timing
+        await self.on_utterance(text)
+    
+    # Output
+    async def say(self, text: str) -> bool:
+        """
+        Speak `text`, starting playback with the first sentence.
+        
+        The first say() after an utterance completes that turn's
+        latency measurement. Overlapping calls (a reply and an
+        announcement made outside any turn) take turns speaking.
+        
+        Returns:
+            False if the caller talked over the agent and playback stopped
+        """
+        timing, self._pending_turn = self._pending_turn, None
+        if timing:
+            timing.reply_at = time.perf_counter()
+        
+        async with self._speech:
+            playback = self._playback = asyncio.create_task(self._play(text, timing))
+            try:
+                await playback
+                return True
+            except asyncio.CancelledError:
+                if playback is not self._interrupted:
+                    raise  # The turn itself was cancelled
+                logger.info("Caller interrupted the agent")
+                return False
+            finally:
+                if self._playback is playback:
+                    self._playback = None
+    
+    def interrupt(self):
+        """Stop speaking now (barge-in); the current say() returns False."""
+        playback = self._playback
+        if playback and not playback.done():
+            self.barge_ins += 1
+            self._interrupted = playback
+            playback.cancel()
+    
+    async def _play(self, text: str, timing: Optional[TurnTiming]):
+        sentences = self._sentences.tokenize(text) or [text]
+        current, upcoming = None, self.tts.synthesize(sentences[0])
+        try:
+            for i in range(len(sentences)):
+                current = upcoming
+                # Synthesize one sentence ahead of playback
+                upcoming = self.tts.synthesize(sentences[i + 1]) if i + 1 < len(sentences) else None
+                async for audio in current:
+                    await self.playout.capture_frame(audio.frame)
+                    if timing and timing.first_audio_at is None:
+                        timing.first_audio_at = time.perf_counter()
+                        self.latency.record(timing)
+        finally:
+            for stream in (current, upcoming):
+                if stream:
+                    await stream.aclose()
+    
+    async def aclose(self):
+        """Stop listening, cancel the turn in flight and release the engines' streams."""
+        await self.turns.aclose()
+        for task in self._tasks:
+            task.cancel()
+        if self._endpoint_task:
+            self._endpoint_task.cancel()
+        await self._stt_stream.aclose()
+        await self._vad_stream.aclose()
+
+
+# Global latency stats, across this worker's calls
+voice_latency = VoiceLatencyStats()
\ No newline at end of file
@@ -2,11 +2,20 @@
 FastAPI application setup with modern lifespan event handlers.
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from src.api.routes import help_requests, knowledge, supervisor
+from src.api.middleware import RateLimitMiddleware, TenantMiddleware
 from src.utils.logger import logger
 from src.config.firebase_config import firebase_config
+from src.config.settings import settings
+from src.services.notification_outbox import notification_delivery_pool
+from src.services.ai_service import ai_service
+from src.utils.admission import llm_limiter, database_limiter
+from src.utils.exceptions import AdmissionDeniedError
 
 
 @asynccontextmanager
@@ -19,12 +28,15 @@ async def lifespan(app: FastAPI):
     logger.info("AI Supervisor System starting up...")
     firebase_config.initialize()
     logger.info("Firebase initialized")
+    notification_delivery_pool.start()
     logger.info("API ready to accept requests")
     
     yield  # Application runs here
     
     # Shutdown
     logger.info("AI Supervisor System shutting down...")
+    notification_delivery_pool.stop()
+    await ai_service.aclose()
 
 
 # Create FastAPI app with lifespan handler
@@ -32,6 +44,7 @@ app = FastAPI(
     title="AI Supervisor System",
     description="Human-in-the-loop AI agent system",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -44,6 +57,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-client rate limit (runs inside the tenant middleware, so counts are per tenant)
+app.add_middleware(RateLimitMiddleware)
+
+# Tenant (salon location) from the X-Tenant-ID header
+app.add_middleware(TenantMiddleware)
+
+# Compress larger responses (help request lists carry long contexts)
+app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size)
+
 # Include routers
 app.include_router(
     help_requests.router,
@@ -62,6 +84,17 @@ app.include_router(
 )
 
 
+@app.exception_handler(AdmissionDeniedError)
+async def admission_denied_handler(request: Request, exc: AdmissionDeniedError):
+    """Shed load (LLM or database saturated): ask the client to come back."""
+    retry_after = math.ceil(max(settings.llm_queue_timeout, settings.db_queue_timeout))
+    return ORJSONResponse(
+        {"detail": "Server busy, please retry"},
+        status_code=503,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -78,13 +111,16 @@ async def health_check():
     return {
         "status": "healthy",
         "firebase": "connected",
-        "api": "running"
+        "api": "running",
+        "admission": {
+            "llm": llm_limiter.get_stats(),
+            "database": database_limiter.get_stats()
+        }
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    from src.config.settings import settings
     
     uvicorn.run(
         "src.api.app:app",
@@ -0,0 +1,46 @@
+"""
+Conditional GETs: ETags from collection write counters.
+
+Every write to a versioned collection bumps its counter in the same
+database update, so the counter identifies the collection's contents.
+A poll whose If-None-Match still matches is answered 304 from the
+cached counter, without reading the collection.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Response
+from src.database.firebase_client import firebase_client
+from src.config.settings import settings
+from src.utils.tenant import get_tenant_id
+
+# Clients may store responses but must revalidate before reusing them
+CACHE_CONTROL = "no-cache"
+
+
+def collection_etag(collection: str, *params) -> str:
+    """
+    Strong ETag of a listing of `collection` with the given query params.
+    
+    Read before the collection itself, so a write in between can only
+    make the tag older than the body (costing one extra 200), never newer.
+    """
+    version = firebase_client.get_collection_version(collection, settings.etag_version_max_age)
+    variant = hashlib.sha1(repr(params).encode()).hexdigest()[:8]
+    return f'"{get_tenant_id()}-{collection}-{version}-{variant}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 for a client whose copy is current."""
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+ASGI middleware for the API.
+"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Iterable
+from fastapi.responses import ORJSONResponse
+from src.config.settings import settings
+from src.utils.rate_limit import TokenBucket
+from src.utils.tenant import DEFAULT_TENANT, get_tenant_id, set_tenant, reset_tenant
+from src.utils.logger import logger
+
+TENANT_HEADER = b"x-tenant-id"
+CLIENT_HEADER = b"x-client-id"
+
+# Health checks are never rate limited
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/", "/health"})
+
+
+class TenantMiddleware:
+    """
+    Runs each request as the tenant named in the X-Tenant-ID header.
+    
+    Requests without the header belong to the default tenant. Plain ASGI
+    (not BaseHTTPMiddleware) so the tenant context reaches the endpoint
+    and anything it runs in threads.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        header = dict(scope["headers"]).get(TENANT_HEADER, b"").decode("latin-1")
+        try:
+            token = set_tenant(header or DEFAULT_TENANT)
+        except ValueError:
+            logger.warning(f"Rejected request with invalid tenant id {header!r}")
+            response = ORJSONResponse({"detail": "Invalid X-Tenant-ID"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_tenant(token)
+
+
+class RateLimitMiddleware:
+    """
+    Per-client token bucket rate limit.
+    
+    Clients are identified by their peer address. Only requests from a
+    trusted proxy (`trusted_proxies`, e.g. an authenticating gateway)
+    may name the client in the X-Client-ID header (e.g. one per
+    supervisor dashboard behind the same proxy), and only those are
+    counted separately per tenant; anyone else could dodge the limit by
+    changing either header on each request. Over the limit, requests get
+    429 with a Retry-After before any route work is done. Buckets of the least
+    recently seen clients are dropped beyond `max_clients`; a dropped
+    client simply starts again with a full bucket.
+    """
+    
+    def __init__(
+        self,
+        app,
+        rate: float = None,
+        burst: float = None,
+        max_clients: int = None,
+        trusted_proxies: Iterable[str] = None
+    ):
+        self.app = app
+        self.rate = rate if rate is not None else settings.rate_limit_per_second
+        self.burst = burst if burst is not None else settings.rate_limit_burst
+        self.max_clients = max_clients or settings.rate_limit_max_clients
+        self.trusted_proxies = frozenset(
+            trusted_proxies if trusted_proxies is not None else settings.rate_limit_trusted_proxies
+        )
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _bucket(self, key: tuple) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+    
+    def client_key(self, scope) -> tuple:
+        """Bucket key of the request's client."""
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if peer not in self.trusted_proxies:
+            return (peer,)
+        header = dict(scope["headers"]).get(CLIENT_HEADER, b"").decode("latin-1").strip()
+        return (get_tenant_id(), header or peer)
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.rate <= 0
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in RATE_LIMIT_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        client = self.client_key(scope)
+        wait = self._bucket(client).try_acquire()
+        if wait > 0:
+            logger.warning(f"Rate limited client {client[-1]!r}")
+            response = ORJSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+            await response(scope, receive, send)
+            return
+        
+        await self.app(scope, receive, send)
\ No newline at end of file
@@ -1,51 +1,147 @@
 """
 Help Requests API routes.
 """
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
+from datetime import date, datetime, timedelta
 from src.models.help_request import (
     HelpRequest, HelpRequestCreate, RequestStatus
 )
 from src.services.help_request_service import help_request_service
+from src.services.tenant_registry import tenant_registry
+from src.services.idempotency import idempotency_store
+from src.api.conditional import collection_etag, etag_matches, not_modified, cache_headers
+from src.utils.exceptions import AdmissionDeniedError, IdempotencyKeyReusedError, ValidationError
+from src.utils.serialization import dump_models
 from src.utils.logger import logger
 
 router = APIRouter(redirect_slashes=False)  # Added this parameter
 
 
 @router.post("/", response_model=HelpRequest, status_code=201)
-async def create_help_request(request_data: HelpRequestCreate):
+async def create_help_request(
+    request_data: HelpRequestCreate,
+    idempotency_key: Optional[str] = Header(None, description="Replays return the first response")
+):
     """
     Create a new help request when AI doesn't know the answer.
     
     This is called by the AI agent when it needs human assistance.
+    Retries sent with the same Idempotency-Key get the original response
+    back without creating or notifying anything again.
     """
+    async def create():
+        return await asyncio.to_thread(help_request_service.create_request, request_data)
+    
     try:
-        help_request = help_request_service.create_request(request_data)
-        return help_request
+        return await idempotency_store.run(
+            idempotency_key, "create", request_data, create, status_code=201
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to create help request: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create help request")
 
 
 @router.get("/", response_model=List[HelpRequest])
-async def get_help_requests(
-    status: Optional[RequestStatus] = Query(None, description="Filter by status")
+def get_help_requests(
+    status: Optional[RequestStatus] = Query(None, description="Filter by status"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get all help requests, optionally filtered by status.
     
-    Used by supervisor UI to view pending requests.
+    Used by supervisor UI to view pending requests. Send back the ETag
+    as If-None-Match to get an empty 304 while nothing has changed.
     """
     try:
+        etag = collection_etag('help_requests', status)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        
         requests = help_request_service.get_all_requests(status)
-        return requests
+        # Already-valid models: serialize in one pass instead of re-validating
+        return ORJSONResponse(dump_models(HelpRequest, requests), headers=cache_headers(etag))
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to get help requests: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch help requests")
 
 
+@router.get("/queue")
+def get_priority_queue(
+    limit: int = Query(20, ge=1, le=500, description="Number of requests")
+):
+    """
+    Pending requests in the order they should be answered.
+    
+    Earliest effective deadline first: time left before `timeout_at`,
+    pulled forward for repeat customers and urgent requests. Served from
+    an in-memory priority index, so the cost depends on `limit`, not on
+    how many requests are pending.
+    """
+    try:
+        queue = help_request_service.get_priority_queue(limit)
+        now = datetime.utcnow()
+        requests = dump_models(HelpRequest, [request for _, request in queue])
+        return ORJSONResponse([
+            {
+                **request,
+                'effective_deadline': deadline.isoformat(),
+                'seconds_remaining': round((deadline - now).total_seconds(), 1)
+            }
+            for (deadline, _), request in zip(queue, requests)
+        ])
+    except AdmissionDeniedError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get priority queue: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch priority queue")
+
+
+@router.get("/archive", response_model=List[HelpRequest])
+def query_archived_requests(
+    start: Optional[date] = Query(None, description="First creation day (default: 30 days ago)"),
+    end: Optional[date] = Query(None, description="Last creation day (default: today)"),
+    status: Optional[RequestStatus] = Query(None, description="Filter by status"),
+    customer_phone: Optional[str] = Query(None, description="Filter by customer"),
+    limit: int = Query(100, ge=1, le=1000, description="Max results")
+):
+    """
+    Query archived (cold storage) help requests by creation date.
+    
+    Only the archive day files that can contain a match are read.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    try:
+        requests = tenant_registry.get().archive.query(start, end, status, customer_phone, limit)
+        return ORJSONResponse(dump_models(HelpRequest, requests))
+    except Exception as e:
+        logger.error(f"Failed to query archive: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to query archive")
+
+
+@router.get("/archive/stats")
+def get_archive_stats():
+    """Get size of the help request archive."""
+    try:
+        return tenant_registry.get().archive.get_stats()
+    except Exception as e:
+        logger.error(f"Failed to get archive stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get archive stats")
+
+
 @router.get("/{request_id}", response_model=HelpRequest)
-async def get_help_request(request_id: str):
+def get_help_request(request_id: str):
     """Get a specific help request by ID."""
     try:
         help_request = help_request_service.get_request(request_id)
@@ -60,7 +156,7 @@ async def get_help_request(request_id: str):
 
 
 @router.post("/check-timeouts")
-async def check_timeouts():
+def check_timeouts():
     """
     Manually trigger timeout check for old pending requests.
     
@@ -72,6 +168,8 @@ async def check_timeouts():
             "message": f"Checked timeouts successfully",
             "timed_out_count": count
         }
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to check timeouts: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to check timeouts")
\ No newline at end of file
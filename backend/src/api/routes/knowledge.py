@@ -1,32 +1,49 @@
 """
 Knowledge Base API routes.
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import List, Optional
 from src.models.knowledge_base import KnowledgeEntry, KnowledgeCreate
 from src.services.knowledge_service import knowledge_service
+from src.services.knowledge_compaction import knowledge_compactor
+from src.services.knowledge_bulk import (
+    knowledge_importer, decode_lines, read_rows, iter_export, FORMATS
+)
+from src.api.conditional import collection_etag, etag_matches, not_modified, cache_headers
+from src.utils.exceptions import AdmissionDeniedError
+from src.utils.serialization import dump_models
 from src.utils.logger import logger
 
 router = APIRouter(redirect_slashes=False)  # Added this parameter
 
 
 @router.get("/", response_model=List[KnowledgeEntry])
-async def get_all_knowledge():
+def get_all_knowledge(if_none_match: Optional[str] = Header(None)):
     """
     Get all entries in the knowledge base.
     
-    Used by supervisor UI to view learned answers.
+    Used by supervisor UI to view learned answers. Send back the ETag as
+    If-None-Match to get an empty 304 while nothing has changed.
     """
     try:
+        etag = collection_etag('knowledge_base')
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        
         entries = knowledge_service.get_all_knowledge()
-        return entries
+        # Already-valid models: serialize in one pass instead of re-validating
+        return ORJSONResponse(dump_models(KnowledgeEntry, entries), headers=cache_headers(etag))
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to get knowledge base: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch knowledge base")
 
 
 @router.get("/search", response_model=List[KnowledgeEntry])
-async def search_knowledge(
+def search_knowledge(
     query: str = Query(..., description="Search query"),
     limit: int = Query(5, ge=1, le=20, description="Max results")
 ):
@@ -37,14 +54,16 @@ async def search_knowledge(
     """
     try:
         results = knowledge_service.search_knowledge(query, limit)
-        return results
+        return ORJSONResponse(dump_models(KnowledgeEntry, results))
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to search knowledge: {str(e)}")
         raise HTTPException(status_code=500, detail="Search failed")
 
 
 @router.post("/", response_model=KnowledgeEntry, status_code=201)
-async def create_knowledge_entry(entry_data: KnowledgeCreate):
+def create_knowledge_entry(entry_data: KnowledgeCreate):
     """
     Manually add an entry to the knowledge base.
     
@@ -53,13 +72,92 @@ async def create_knowledge_entry(entry_data: KnowledgeCreate):
     try:
         entry = knowledge_service.add_entry(entry_data)
         return entry
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to create knowledge entry: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create entry")
 
 
+@router.post("/compact")
+def compact_knowledge(
+    dry_run: bool = Query(False, description="Report merges without writing"),
+    merge_similar: bool = Query(False, description="Also merge reviewed near-duplicates")
+):
+    """
+    Merge duplicate entries into one.
+    
+    Entries asking merely similar questions are listed under `review`
+    unless merge_similar is set. Safe to run while the agent is live;
+    merged ids keep resolving.
+    """
+    try:
+        return knowledge_compactor.compact(dry_run=dry_run, merge_similar=merge_similar)
+    except AdmissionDeniedError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to compact knowledge base: {str(e)}")
+        raise HTTPException(status_code=500, detail="Compaction failed")
+
+
+@router.post("/bulk")
+async def bulk_import_knowledge(
+    request: Request,
+    format: str = Query("jsonl", description="jsonl or csv"),
+    dry_run: bool = Query(False, description="Validate and report without writing")
+):
+    """
+    Import many entries from a JSONL or CSV request body.
+    
+    Rows are written in batches; questions already in the knowledge base
+    update the existing entry. Invalid rows are reported, not fatal.
+    
+    The body is streamed: the import thread pulls it chunk by chunk as
+    it goes, so memory stays flat however large the file is. Chunks
+    committed before invalid UTF-8 is reached stay written.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {', '.join(FORMATS)}")
+    
+    loop = asyncio.get_running_loop()
+    body = request.stream().__aiter__()
+    
+    def body_chunks():
+        # Runs in the import thread; each chunk is awaited on the event loop
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(body.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    
+    try:
+        rows = read_rows(decode_lines(body_chunks()), format)
+        return await asyncio.to_thread(knowledge_importer.import_rows, rows, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 text")
+    except AdmissionDeniedError:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk knowledge import failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Bulk import failed")
+
+
+@router.get("/export")
+def export_knowledge(format: str = Query("jsonl", description="jsonl or csv")):
+    """Download the whole knowledge base as JSONL or CSV."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {', '.join(FORMATS)}")
+    
+    media_type = "application/x-ndjson" if format == "jsonl" else "text/csv"
+    return StreamingResponse(
+        iter_export(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="knowledge.{format}"'}
+    )
+
+
 @router.get("/{entry_id}", response_model=KnowledgeEntry)
-async def get_knowledge_entry(entry_id: str):
+def get_knowledge_entry(entry_id: str):
     """Get a specific knowledge entry."""
     try:
         entry = knowledge_service.get_entry(entry_id)
@@ -74,11 +172,13 @@ async def get_knowledge_entry(entry_id: str):
 
 
 @router.get("/summary/stats")
-async def get_knowledge_summary():
+def get_knowledge_summary():
     """Get summary statistics about knowledge base."""
     try:
         summary = knowledge_service.get_knowledge_summary()
         return summary
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to get knowledge summary: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get summary")
+        raise HTTPException(status_code=500, detail="Failed to get summary")
\ No newline at end of file
@@ -1,18 +1,135 @@
 """
 Supervisor action routes.
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Query
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 from src.models.help_request import HelpRequest, HelpRequestResolve, RequestStatus
+from src.models.supervisor import Supervisor, SupervisorUpdate
 from src.services.help_request_service import help_request_service
+from src.services.analytics_rollups import analytics_rollups
+from src.services.work_queue import work_queue, ClaimOutcome
+from src.services.idempotency import idempotency_store
+from src.config.settings import settings
+from src.utils.exceptions import (
+    AdmissionDeniedError, IdempotencyKeyReusedError, RequestClaimedError, ValidationError
+)
 from src.utils.logger import logger
 
 router = APIRouter()
 
 
+@router.get("/supervisors", response_model=List[Supervisor])
+def get_supervisors():
+    """List supervisors with their skills, capacity and shift status."""
+    try:
+        return work_queue.get_supervisors()
+    except Exception as e:
+        logger.error(f"Failed to get supervisors: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get supervisors")
+
+
+@router.put("/supervisors/{supervisor_id}", response_model=Supervisor)
+def save_supervisor(supervisor_id: str, update: SupervisorUpdate):
+    """
+    Register a supervisor or change their skills, capacity or shift.
+    
+    Skills are request categories (e.g. "services", "pricing"); no skills
+    means the supervisor takes any category.
+    """
+    supervisor = Supervisor(supervisor_id=supervisor_id, **update.model_dump())
+    if not work_queue.save_supervisor(supervisor):
+        raise HTTPException(status_code=500, detail="Failed to save supervisor")
+    return supervisor
+
+
+@router.get("/queue/metrics")
+def get_queue_metrics():
+    """
+    Queue depth, wait times and per-supervisor load.
+    
+    Compare depth and wait against active capacity to size staffing.
+    """
+    try:
+        return work_queue.get_metrics()
+    except AdmissionDeniedError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get queue metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get queue metrics")
+
+
+@router.post("/queue/next", response_model=Optional[HelpRequest])
+def claim_next_request(
+    supervisor_id: str = Query(..., description="Supervisor asking for work")
+):
+    """
+    Claim the next request for a supervisor, or null if the queue has
+    nothing for them.
+    """
+    try:
+        return work_queue.next_request(supervisor_id)
+    except AdmissionDeniedError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to claim next request: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to claim next request")
+
+
+def _claim_response(outcome: ClaimOutcome, data: Optional[dict]) -> HelpRequest:
+    """Map a claim outcome to the request or an HTTP error."""
+    if outcome == ClaimOutcome.NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Help request not found")
+    if outcome == ClaimOutcome.NOT_PENDING:
+        raise HTTPException(status_code=409, detail="Help request is no longer pending")
+    if outcome == ClaimOutcome.HELD:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Help request is claimed by {data.get('claimed_by')}"
+        )
+    return HelpRequest.from_dict(data)
+
+
+@router.post("/{request_id}/claim", response_model=HelpRequest)
+def claim_help_request(
+    request_id: str,
+    supervisor_id: str = Query(..., description="Supervisor taking the request"),
+    lease_seconds: Optional[int] = Query(None, ge=10, le=86400, description="Lease length")
+):
+    """
+    Claim a request, or renew an existing claim.
+    
+    The claim lasts `lease_seconds` (default WORK_QUEUE_LEASE_SECONDS);
+    if it is not renewed or released, the request returns to the queue.
+    """
+    try:
+        outcome, data = work_queue.claim(request_id, supervisor_id, lease_seconds)
+    except Exception as e:
+        logger.error(f"Failed to claim help request: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to claim help request")
+    return _claim_response(outcome, data)
+
+
+@router.post("/{request_id}/release", response_model=HelpRequest)
+def release_help_request(
+    request_id: str,
+    supervisor_id: str = Query(..., description="Supervisor giving the request back")
+):
+    """Give a claimed request back to the queue."""
+    try:
+        outcome, data = work_queue.release(request_id, supervisor_id)
+    except Exception as e:
+        logger.error(f"Failed to release help request: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to release help request")
+    return _claim_response(outcome, data)
+
+
 @router.post("/{request_id}/resolve", response_model=HelpRequest)
 async def resolve_help_request(
     request_id: str,
-    resolution: HelpRequestResolve
+    resolution: HelpRequestResolve,
+    idempotency_key: Optional[str] = Header(None, description="Replays return the first response")
 ):
     """
     Supervisor resolves a help request with an answer.
@@ -21,10 +138,15 @@ async def resolve_help_request(
     1. Update request to RESOLVED
     2. Notify customer
     3. Add to knowledge base
+    
+    Returns 409 if another supervisor has the request claimed. Replays
+    with the same Idempotency-Key return the original response; without
+    one, resolving an already resolved request changes nothing.
     """
-    try:
-        help_request = help_request_service.resolve_request(
-            request_id, 
+    async def resolve():
+        help_request = await asyncio.to_thread(
+            help_request_service.resolve_request,
+            request_id,
             resolution
         )
         
@@ -35,9 +157,21 @@ async def resolve_help_request(
             )
         
         return help_request
-        
+    
+    try:
+        return await idempotency_store.run(
+            idempotency_key, f"resolve:{request_id}", resolution, resolve
+        )
     except HTTPException:
         raise
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestClaimedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to resolve help request: {str(e)}")
         raise HTTPException(
@@ -47,32 +181,101 @@ async def resolve_help_request(
 
 
 @router.get("/dashboard/stats")
-async def get_supervisor_dashboard_stats():
+def get_supervisor_dashboard_stats():
     """
     Get statistics for supervisor dashboard.
     """
     try:
         from src.services.knowledge_service import knowledge_service
         
-        all_requests = help_request_service.get_all_requests()
-        pending = help_request_service.get_all_requests(RequestStatus.PENDING)
+        counts = help_request_service.get_analytics().count_by_status()
         
         knowledge_summary = knowledge_service.get_knowledge_summary()
         
         return {
-            "total_requests": len(all_requests),
-            "pending_requests": len(pending),
-            "resolved_requests": len([
-                r for r in all_requests 
-                if r.status == RequestStatus.RESOLVED.value
-            ]),
-            "timed_out_requests": len([
-                r for r in all_requests 
-                if r.status == RequestStatus.TIMEOUT.value
-            ]),
+            "total_requests": sum(counts.values()),
+            "pending_requests": counts[RequestStatus.PENDING.value],
+            "resolved_requests": counts[RequestStatus.RESOLVED.value],
+            "timed_out_requests": counts[RequestStatus.TIMEOUT.value],
             "knowledge_entries": knowledge_summary['total_entries'],
             "knowledge_usage": knowledge_summary['total_usage']
         }
+    except AdmissionDeniedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to get dashboard stats: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get stats")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to get stats")
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _default_range(
+    granularity: str,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> tuple:
+    """
+    Last 24 hours for hourly rollups, last 30 days for daily ones.
+    
+    Bounds given with an offset (e.g. "2026-10-18T00:00:00Z") are
+    converted to naive UTC, like the rollup buckets. Raises 400 for a
+    reversed range or one longer than the configured maximum, which
+    would read a bucket per hour or day of it.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    end = end or datetime.utcnow()
+    span = timedelta(hours=23) if granularity == "hourly" else timedelta(days=29)
+    start = start or end - span
+    
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    max_days = (
+        settings.analytics_max_hourly_days if granularity == "hourly"
+        else settings.analytics_max_daily_days
+    )
+    if end - start > timedelta(days=max_days):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{granularity} ranges may span at most {max_days} days"
+        )
+    return start, end
+
+
+@router.get("/analytics")
+def get_supervisor_analytics(
+    granularity: str = Query("hourly", pattern="^(hourly|daily)$"),
+    start: Optional[datetime] = Query(None, description="First bucket (UTC)"),
+    end: Optional[datetime] = Query(None, description="Last bucket (UTC)"),
+    supervisor_id: Optional[str] = Query(None, description="Resolution figures for one supervisor")
+):
+    """
+    Escalation rate, timeout rate and resolution latency per bucket.
+    
+    Served from precomputed rollups; cost grows with the number of
+    buckets in the range, not with the number of help requests.
+    """
+    start, end = _default_range(granularity, start, end)
+    try:
+        return analytics_rollups.get_range(granularity, start, end, supervisor_id)
+    except Exception as e:
+        logger.error(f"Failed to get analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get analytics")
+
+
+@router.get("/analytics/supervisors")
+def get_supervisor_leaderboard(
+    granularity: str = Query("daily", pattern="^(hourly|daily)$"),
+    start: Optional[datetime] = Query(None, description="First bucket (UTC)"),
+    end: Optional[datetime] = Query(None, description="Last bucket (UTC)")
+):
+    """Resolved count and average resolution time per supervisor."""
+    start, end = _default_range(granularity, start, end)
+    try:
+        return analytics_rollups.get_supervisor_summary(granularity, start, end)
+    except Exception as e:
+        logger.error(f"Failed to get supervisor analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get supervisor analytics")
\ No newline at end of file
@@ -2,7 +2,7 @@
 Configuration settings loaded from environment variables.
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -12,12 +12,31 @@ class Settings(BaseSettings):
     lightning_ai_api_key: str
     lightning_ai_url: str = "https://lightning.ai/api/v1/chat/completions"
     lightning_ai_model: str = "openai/gpt-4-turbo"
+    lightning_ai_small_model: str = "openai/gpt-4o-mini"  # Keywords and cascade first try
+    ai_cascade_enabled: bool = True  # Small model first for answerability checks
+    lightning_ai_cost_per_1k_tokens: float = 0.03  # USD, for cost tracking
+    lightning_ai_small_cost_per_1k_tokens: float = 0.0006
+    
+    # LLM response cache
+    llm_cache_mode: str = "off"  # off, readwrite, record or replay
+    llm_cache_path: str = "./cache/llm_cache.sqlite3"
+    llm_cache_max_bytes: int = 100 * 1024 * 1024
     
     # LiveKit
     livekit_url: str
     livekit_api_key: str
     livekit_api_secret: str
     
+    # Voice pipeline (engines are livekit-plugins-* names; no STT/TTS = text only)
+    voice_stt: str = ""  # e.g. "deepgram"
+    voice_tts: str = ""  # e.g. "cartesia", "elevenlabs", "openai"
+    voice_vad: str = "energy"  # Built-in energy detector, or e.g. "silero"
+    voice_vad_threshold_db: float = -45.0  # Frame level (dBFS) counted as speech
+    voice_min_speech: float = 0.1  # Seconds of speech before a turn starts
+    voice_min_silence: float = 0.4  # Seconds of silence that end speech
+    voice_endpoint_delay: float = 0.3  # Extra wait for trailing transcripts
+    voice_latency_window: int = 500  # Recent turns kept for latency percentiles
+    
     # Firebase
     firebase_credentials_path: str = "./firebase-credentials.json"
     firebase_database_url: str
@@ -32,6 +51,93 @@ class Settings(BaseSettings):
     help_request_timeout: int = 3600  # 1 hour in seconds
     supervisor_notification_retry: int = 3
     
+    # Notification delivery
+    notification_workers: int = 4
+    notification_rate_per_second: float = 5.0  # Per channel
+    notification_backoff_base: float = 2.0  # Seconds, doubled per retry
+    notification_backoff_max: float = 300.0
+    notification_poll_interval: float = 10.0  # Outbox rescan for recovered jobs
+    supervisor_digest_window: float = 15.0  # Seconds, 0 sends every request alone
+    supervisor_digest_max_items: int = 10
+    
+    # Live escalation follow-up (the agent keeps the caller company meanwhile)
+    escalation_live_wait: float = 120.0  # Seconds on the call before leaving the answer to SMS
+    escalation_reassure_after: List[float] = [20.0, 60.0]  # Seconds after escalating to reassure the caller
+    
+    # Duplicate escalations
+    duplicate_escalation_window: int = 900  # Seconds, 0 disables coalescing
+    duplicate_escalation_threshold: float = 0.75  # Question similarity (0-1)
+    
+    # HTTP caching and compression
+    gzip_minimum_size: int = 1024  # Bytes; smaller responses are sent as is
+    etag_version_max_age: float = 1.0  # Seconds a collection version is trusted before re-reading
+    
+    # Idempotency-Key replays
+    idempotency_ttl_seconds: float = 86400.0  # How long responses are kept for replays
+    idempotency_max_entries: int = 10000
+    
+    # Rate limiting and admission control
+    rate_limit_per_second: float = 10.0  # Requests per client (0 disables)
+    rate_limit_burst: float = 20.0  # Requests a client may send at once
+    rate_limit_max_clients: int = 10000  # Client buckets kept in memory (LRU)
+    rate_limit_trusted_proxies: List[str] = []  # Peer IPs whose X-Client-ID header is honored
+    llm_max_concurrent: int = 8  # LLM calls in flight per process
+    llm_max_queue: int = 16  # LLM calls waiting; more are shed at once
+    llm_queue_timeout: float = 5.0  # Seconds a call may wait for a slot
+    db_max_concurrent: int = 4  # Full-collection reads in flight per process
+    db_max_queue: int = 16
+    db_queue_timeout: float = 5.0
+    
+    # Supervisor work queue
+    work_queue_lease_seconds: int = 300  # How long a claim lasts unless renewed
+    supervisor_default_capacity: int = 5  # Pending requests assigned per supervisor
+    
+    # Pending request priority (deadline moved earlier by these amounts)
+    priority_seconds_per_call: float = 60.0  # Per past call of the customer
+    priority_max_customer_bonus: float = 900.0  # Cap on the customer bonus
+    priority_urgent_seconds: float = 1800.0  # For urgent requests
+    
+    # Customer profiles
+    customer_cache_size: int = 10000  # Profiles kept in memory (LRU)
+    customer_flush_interval: float = 5.0  # Seconds call counts wait before being written
+    customer_flush_batch: int = 100  # Write sooner once this many customers changed
+    customer_history_items: int = 5  # Past requests shown to the agent for returning callers
+    customer_history_max_chars: int = 800  # Prompt budget for that history (~200 tokens)
+    
+    # Knowledge base deduplication
+    knowledge_dedup_threshold: float = 0.85  # Question similarity (0-1) for compaction
+    
+    # Bulk knowledge import
+    knowledge_import_chunk_size: int = 500  # Entries per batched write
+    knowledge_import_concurrency: int = 8  # Parallel keyword extractions
+    
+    # Archival of finished help requests
+    archive_dir: str = "./archive"
+    archive_retention_days: int = 30
+    
+    # Answering (knowledge fast path)
+    fast_path_min_score: float = 0.8  # Question match score (0-1)
+    fast_path_min_confidence: float = 0.9  # KnowledgeEntry.confidence
+    fast_path_rephrase: bool = True  # Wrap stored answers in a short template
+    knowledge_usage_flush_interval: float = 5.0  # Seconds usage counts wait before being written
+    
+    # Intent routing
+    intent_model_path: str = "./models/intent_classifier.json"
+    intent_min_confidence: float = 0.7  # Classifier probability to act on
+    intent_min_knowledge_score: float = 0.4  # Match score within a predicted FAQ category
+    
+    # Tenants (salon locations)
+    tenant_room_separator: str = "__"  # LiveKit room "{tenant_id}__{call}"
+    tenant_cache_max_tenants: int = 50  # Tenants kept in memory per process
+    tenant_cache_max_bytes: int = 128 * 1024 * 1024  # Estimated, across tenants
+    tenant_knowledge_ttl: float = 30.0  # Seconds before a knowledge index reloads
+    tenant_answer_cache_size: int = 256  # Cached answers per tenant
+    
+    # Analytics
+    analytics_refresh_interval: float = 60.0  # Seconds between full reloads
+    analytics_max_hourly_days: int = 31  # Longest range of hourly buckets per request
+    analytics_max_daily_days: int = 731  # Longest range of daily buckets per request
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,8 +1,13 @@
 """
 Firebase database client with CRUD operations.
 """
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Callable, Iterable
 from src.config.firebase_config import firebase_config
+from src.utils.tenant import get_tenant_id, tenant_path
+from src.utils.validators import sanitize_phone_for_key
+from src.utils.admission import database_limiter
+from src.utils.exceptions import AdmissionDeniedError
 from src.utils.logger import logger
 
 
@@ -14,17 +19,87 @@ class FirebaseClient:
     /help_requests/{request_id}
     /knowledge_base/{entry_id}
     /customers/{phone_number}
+    /customer_requests/{phone_number}/{created_ts}_{request_id} -> request summary
+    /notification_outbox/{job_id}
+    /knowledge_redirects/{old_entry_id} -> entry_id it was merged into
+    /analytics_rollups/{hourly|daily}/{bucket}
+    /supervisors/{supervisor_id}
+    /collection_versions/{help_requests|knowledge_base} -> write counter
+    /tenants/{tenant_id}/profile
+    /tenants/{tenant_id}/{help_requests|knowledge_base|...}  (non-default tenants)
     """
     
+    # Collections whose writes bump /collection_versions, for ETags
+    VERSIONED_COLLECTIONS = frozenset({'help_requests', 'knowledge_base'})
+    
     def __init__(self):
         self.db = firebase_config.get_database()
+        # (tenant_id, collection) -> (version, read at)
+        self._versions: Dict[tuple, tuple] = {}
+    
+    # Batched Writes
+    def commit_batch(self, updates: Dict[str, Any]) -> bool:
+        """
+        Apply a multi-path update atomically.
+        
+        Keys are paths relative to the database root, e.g.
+        'help_requests/{id}' or 'help_requests/{id}/status'; tenant
+        collections are mapped to the current tenant's copy.
+        Either every path is written or none are.
+        """
+        try:
+            self._write(updates)
+            logger.info(f"Committed batch of {len(updates)} paths")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to commit batch: {str(e)}")
+            return False
+    
+    def _write(self, updates: Dict[str, Any]):
+        """Multi-path update that also bumps the versions of the collections it touches."""
+        collections = self._versioned(updates)
+        updates = dict(updates)
+        for collection in collections:
+            updates[f"collection_versions/{collection}"] = {".sv": {"increment": 1}}
+        self.db.update({tenant_path(path): value for path, value in updates.items()})
+        self._forget_versions(collections)
+    
+    def _versioned(self, paths: Iterable[str]) -> set:
+        return {path.split('/', 1)[0] for path in paths} & self.VERSIONED_COLLECTIONS
+    
+    def _forget_versions(self, collections: Iterable[str]):
+        tenant_id = get_tenant_id()
+        for collection in collections:
+            self._versions.pop((tenant_id, collection), None)
+    
+    def run_transaction(self, path: str, update_fn: Callable[[Any], Any]) -> bool:
+        """
+        Atomically read-modify-write the value at `path`.
+        
+        `update_fn` receives the current value (None if absent) and
+        returns the new one. Firebase re-runs it if another writer got
+        there first, so it must not have side effects.
+        """
+        try:
+            self.db.child(tenant_path(path)).transaction(update_fn)
+            collections = self._versioned([path])
+            if collections:
+                self._write({f"collection_versions/{c}": {".sv": {"increment": 1}} for c in collections})
+            return True
+        except Exception as e:
+            logger.error(f"Transaction on {path} failed: {str(e)}")
+            return False
+    
+    def _read_collection(self, collection: str) -> dict:
+        """Whole collection of the current tenant, read under database_limiter."""
+        with database_limiter.admit():
+            return self.db.child(tenant_path(collection)).get() or {}
     
     # Help Requests Operations
     def create_help_request(self, request_id: str, data: dict) -> bool:
         """Create a new help request."""
         try:
-            ref = self.db.child('help_requests').child(request_id)
-            ref.set(data)
+            self._write({f"help_requests/{request_id}": data})
             logger.info(f"Created help request: {request_id}")
             return True
         except Exception as e:
@@ -34,18 +109,49 @@ class FirebaseClient:
     def get_help_request(self, request_id: str) -> Optional[dict]:
         """Get a specific help request."""
         try:
-            ref = self.db.child('help_requests').child(request_id)
+            ref = self.db.child(tenant_path('help_requests')).child(request_id)
             data = ref.get()
             return data
         except Exception as e:
             logger.error(f"Failed to get help request {request_id}: {str(e)}")
             return None
     
+    def listen_help_request(self, request_id: str, callback: Callable[[Any], None]):
+        """
+        Stream changes to a help request to `callback`.
+        
+        The callback runs on the listener's thread, first with the
+        request as it is now, then once per change.
+        
+        Returns:
+            Registration to close() when done, or None if listening failed
+        """
+        try:
+            ref = self.db.child(tenant_path('help_requests')).child(request_id)
+            return ref.listen(callback)
+        except Exception as e:
+            logger.error(f"Failed to listen to help request {request_id}: {str(e)}")
+            return None
+    
+    def get_notification_pending_requests(self) -> List[dict]:
+        """
+        Help requests flagged `notification_pending` (needs
+        ".indexOn": "notification_pending" on /help_requests).
+        """
+        try:
+            ref = self.db.child(tenant_path('help_requests'))
+            data = ref.order_by_child('notification_pending').equal_to(True).get() or {}
+            return [dict(row, request_id=request_id) for request_id, row in data.items()]
+        except Exception as e:
+            logger.error(f"Failed to get requests awaiting notification: {str(e)}")
+            return []
+    
     def update_help_request(self, request_id: str, updates: dict) -> bool:
         """Update an existing help request."""
         try:
-            ref = self.db.child('help_requests').child(request_id)
-            ref.update(updates)
+            self._write({
+                f"help_requests/{request_id}/{key}": value for key, value in updates.items()
+            })
             logger.info(f"Updated help request: {request_id}")
             return True
         except Exception as e:
@@ -53,10 +159,14 @@ class FirebaseClient:
             return False
     
     def get_all_help_requests(self, status: Optional[str] = None) -> List[dict]:
-        """Get all help requests, optionally filtered by status."""
+        """
+        Get all help requests, optionally filtered by status.
+        
+        Raises AdmissionDeniedError when too many full reads are queued,
+        rather than returning an empty list callers would cache.
+        """
         try:
-            ref = self.db.child('help_requests')
-            data = ref.get() or {}
+            data = self._read_collection('help_requests')
             
             requests = []
             for request_id, request_data in data.items():
@@ -65,6 +175,8 @@ class FirebaseClient:
                     requests.append(request_data)
             
             return requests
+        except AdmissionDeniedError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get help requests: {str(e)}")
             return []
@@ -73,8 +185,7 @@ class FirebaseClient:
     def create_knowledge_entry(self, entry_id: str, data: dict) -> bool:
         """Add a new entry to the knowledge base."""
         try:
-            ref = self.db.child('knowledge_base').child(entry_id)
-            ref.set(data)
+            self._write({f"knowledge_base/{entry_id}": data})
             logger.info(f"Created knowledge entry: {entry_id}")
             return True
         except Exception as e:
@@ -84,17 +195,16 @@ class FirebaseClient:
     def get_knowledge_entry(self, entry_id: str) -> Optional[dict]:
         """Get a specific knowledge entry."""
         try:
-            ref = self.db.child('knowledge_base').child(entry_id)
+            ref = self.db.child(tenant_path('knowledge_base')).child(entry_id)
             return ref.get()
         except Exception as e:
             logger.error(f"Failed to get knowledge entry: {str(e)}")
             return None
     
     def get_all_knowledge(self) -> List[dict]:
-        """Get all knowledge base entries."""
+        """Get all knowledge base entries (AdmissionDeniedError when shed)."""
         try:
-            ref = self.db.child('knowledge_base')
-            data = ref.get() or {}
+            data = self._read_collection('knowledge_base')
             
             entries = []
             for entry_id, entry_data in data.items():
@@ -102,6 +212,8 @@ class FirebaseClient:
                 entries.append(entry_data)
             
             return entries
+        except AdmissionDeniedError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get knowledge base: {str(e)}")
             return []
@@ -109,20 +221,30 @@ class FirebaseClient:
     def update_knowledge_entry(self, entry_id: str, updates: dict) -> bool:
         """Update a knowledge entry (e.g., increment usage count)."""
         try:
-            ref = self.db.child('knowledge_base').child(entry_id)
-            ref.update(updates)
+            self._write({
+                f"knowledge_base/{entry_id}/{key}": value for key, value in updates.items()
+            })
             return True
         except Exception as e:
             logger.error(f"Failed to update knowledge entry: {str(e)}")
             return False
     
+    def get_knowledge_redirect(self, entry_id: str) -> Optional[str]:
+        """Get the entry a merged knowledge entry now lives in."""
+        try:
+            ref = self.db.child(tenant_path('knowledge_redirects')).child(entry_id)
+            return ref.get()
+        except Exception as e:
+            logger.error(f"Failed to get knowledge redirect: {str(e)}")
+            return None
+    
     # Customer Operations (for tracking)
     def save_customer_info(self, phone: str, data: dict) -> bool:
         """Save or update customer information."""
         try:
             # Sanitize phone number for Firebase key
-            safe_phone = phone.replace('+', '_').replace(' ', '')
-            ref = self.db.child('customers').child(safe_phone)
+            safe_phone = sanitize_phone_for_key(phone)
+            ref = self.db.child(tenant_path('customers')).child(safe_phone)
             ref.set(data)
             return True
         except Exception as e:
@@ -132,12 +254,136 @@ class FirebaseClient:
     def get_customer_info(self, phone: str) -> Optional[dict]:
         """Get customer information."""
         try:
-            safe_phone = phone.replace('+', '_').replace(' ', '')
-            ref = self.db.child('customers').child(safe_phone)
+            safe_phone = sanitize_phone_for_key(phone)
+            ref = self.db.child(tenant_path('customers')).child(safe_phone)
             return ref.get()
         except Exception as e:
             logger.error(f"Failed to get customer info: {str(e)}")
             return None
+    
+    def get_customer_requests(self, phone: str, limit: int) -> Dict[str, dict]:
+        """Get a customer's `limit` most recent help request summaries."""
+        try:
+            safe_phone = sanitize_phone_for_key(phone)
+            ref = self.db.child(tenant_path('customer_requests')).child(safe_phone)
+            # Keys start with the creation time, so key order is time order
+            return ref.order_by_key().limit_to_last(limit).get() or {}
+        except Exception as e:
+            logger.error(f"Failed to get customer requests: {str(e)}")
+            return {}
+    
+    # Analytics Rollup Operations
+    def get_rollups(self, granularity: str, start_key: str, end_key: str) -> Dict[str, dict]:
+        """Get rollup buckets with keys in [start_key, end_key]."""
+        try:
+            ref = self.db.child(tenant_path('analytics_rollups')).child(granularity)
+            return ref.order_by_key().start_at(start_key).end_at(end_key).get() or {}
+        except Exception as e:
+            logger.error(f"Failed to get {granularity} rollups: {str(e)}")
+            return {}
+    
+    # Notification Outbox Operations
+    def get_notification_jobs(self, status: Optional[str] = None) -> List[dict]:
+        """
+        Get outbox jobs, optionally filtered by status.
+        
+        Filtering is done by the database (needs ".indexOn": "status"
+        on /notification_outbox).
+        """
+        try:
+            ref = self.db.child('notification_outbox')
+            if status is not None:
+                ref = ref.order_by_child('status').equal_to(status)
+            data = ref.get() or {}
+            
+            jobs = []
+            for job_id, job_data in data.items():
+                if status is None or job_data.get('status') == status:
+                    job_data['job_id'] = job_id
+                    jobs.append(job_data)
+            
+            return jobs
+        except Exception as e:
+            logger.error(f"Failed to get notification jobs: {str(e)}")
+            return []
+    
+    def update_notification_job(self, job_id: str, updates: dict) -> bool:
+        """Update an outbox job (attempts, status, next retry)."""
+        try:
+            ref = self.db.child('notification_outbox').child(job_id)
+            ref.update(updates)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update notification job {job_id}: {str(e)}")
+            return False
+    
+    # Supervisor Operations
+    def save_supervisor(self, supervisor_id: str, data: dict) -> bool:
+        """Create or replace a supervisor's routing profile."""
+        try:
+            ref = self.db.child(tenant_path('supervisors')).child(supervisor_id)
+            ref.set(data)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save supervisor: {str(e)}")
+            return False
+    
+    def get_supervisors(self) -> List[dict]:
+        """Get all supervisors."""
+        try:
+            ref = self.db.child(tenant_path('supervisors'))
+            data = ref.get() or {}
+            
+            supervisors = []
+            for supervisor_id, supervisor_data in data.items():
+                supervisor_data['supervisor_id'] = supervisor_id
+                supervisors.append(supervisor_data)
+            
+            return supervisors
+        except Exception as e:
+            logger.error(f"Failed to get supervisors: {str(e)}")
+            return []
+    
+    # Collection Versions
+    def get_collection_version(self, collection: str, max_age: float = 0.0) -> int:
+        """
+        Write counter of a collection, bumped by every write through this
+        client (in any process).
+        
+        A value read less than `max_age` seconds ago is returned without
+        a database read; this process's own writes always force a re-read.
+        """
+        key = (get_tenant_id(), collection)
+        cached = self._versions.get(key)
+        if cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+        try:
+            ref = self.db.child(tenant_path(f'collection_versions/{collection}'))
+            version = ref.get() or 0
+        except Exception as e:
+            logger.error(f"Failed to get {collection} version: {str(e)}")
+            raise
+        self._versions[key] = (version, time.monotonic())
+        return version
+    
+    # Tenants
+    def get_tenant_profile(self, tenant_id: str) -> Optional[dict]:
+        """Get a tenant's salon profile (name, hours, services...)."""
+        try:
+            ref = self.db.child('tenants').child(tenant_id).child('profile')
+            return ref.get()
+        except Exception as e:
+            logger.error(f"Failed to get tenant profile: {str(e)}")
+            return None
+    
+    def get_tenant_ids(self) -> List[str]:
+        """Ids of tenants with their own data (the default tenant excluded)."""
+        try:
+            ref = self.db.child('tenants')
+            return sorted((ref.get(shallow=True) or {}).keys())
+        except Exception as e:
+            logger.error(f"Failed to list tenants: {str(e)}")
+            return []
 
 
 # Global client instance
@@ -4,6 +4,7 @@ Customer data model.
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from src.utils.serialization import parse_datetime_fields
 
 
 class Customer(BaseModel):
@@ -38,7 +39,4 @@ class Customer(BaseModel):
     def from_dict(cls, data: dict) -> 'Customer':
         """Create instance from Firebase data."""
         datetime_fields = ['created_at', 'updated_at', 'last_call_at']
-        for field in datetime_fields:
-            if field in data and data[field]:
-                data[field] = datetime.fromisoformat(data[field])
-        return cls(**data)
\ No newline at end of file
+        return cls(**parse_datetime_fields(data, datetime_fields))
\ No newline at end of file
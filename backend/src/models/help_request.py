@@ -2,10 +2,11 @@
 Help Request data model with lifecycle management.
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict, List, ClassVar, Tuple
 from datetime import datetime
 from enum import Enum
 import uuid
+from src.utils.serialization import parse_datetime_fields, load_models
 
 
 class RequestStatus(str, Enum):
@@ -15,17 +16,33 @@ class RequestStatus(str, Enum):
     TIMEOUT = "timeout"
 
 
+class AttachedCustomer(BaseModel):
+    """Another caller waiting on the answer to the same question."""
+    customer_phone: str
+    customer_name: Optional[str] = None
+    question: Optional[str] = None  # Their wording, if it differed
+    attached_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class HelpRequest(BaseModel):
     """
     Represents a help request from AI agent to supervisor.
     
     Lifecycle: PENDING -> RESOLVED or TIMEOUT
     """
+    DATETIME_FIELDS: ClassVar[Tuple[str, ...]] = (
+        'created_at', 'updated_at', 'resolved_at', 'timeout_at', 'notification_sent_at',
+        'lease_expires_at'
+    )
+    
     request_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     customer_phone: str
     customer_name: Optional[str] = None
     question: str
     context: Optional[str] = None  # Additional conversation context
+    urgent: bool = False  # Notify supervisor right away, never in a digest
+    category: Optional[str] = None  # e.g. "services", routes to supervisors with that skill
+    customer_value: int = 0  # Customer's past calls when created, raises priority
     
     status: RequestStatus = RequestStatus.PENDING
     
@@ -38,8 +55,19 @@ class HelpRequest(BaseModel):
     supervisor_answer: Optional[str] = None
     supervisor_id: Optional[str] = None
     
+    # Work queue: who it is routed to, and who is working on it until when
+    assigned_to: Optional[str] = None
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    
+    # Callers who asked the same question while this was pending,
+    # keyed by sanitized phone number
+    attached_customers: Dict[str, AttachedCustomer] = Field(default_factory=dict)
+    
     # Follow-up tracking
     customer_notified: bool = False
+    # Resolved, but the customer notifications are not in the outbox yet
+    notification_pending: bool = False
     notification_sent_at: Optional[datetime] = None
     
     class Config:
@@ -55,18 +83,22 @@ class HelpRequest(BaseModel):
         for key, value in data.items():
             if isinstance(value, datetime):
                 data[key] = value.isoformat()
+        data['attached_customers'] = {
+            key: customer.model_dump(mode='json')
+            for key, customer in self.attached_customers.items()
+        }
         return data
     
     @classmethod
     def from_dict(cls, data: dict) -> 'HelpRequest':
         """Create instance from Firebase data."""
         # Convert ISO strings back to datetime
-        datetime_fields = ['created_at', 'updated_at', 'resolved_at', 
-                          'timeout_at', 'notification_sent_at']
-        for field in datetime_fields:
-            if field in data and data[field]:
-                data[field] = datetime.fromisoformat(data[field])
-        return cls(**data)
+        return cls(**parse_datetime_fields(data, cls.DATETIME_FIELDS))
+    
+    @classmethod
+    def from_dict_batch(cls, rows: List[dict]) -> List['HelpRequest']:
+        """Bulk conversion for listing many stored requests."""
+        return load_models(cls, rows)
 
 
 class HelpRequestCreate(BaseModel):
@@ -75,6 +107,8 @@ class HelpRequestCreate(BaseModel):
     customer_name: Optional[str] = None
     question: str
     context: Optional[str] = None
+    urgent: bool = False
+    category: Optional[str] = None
 
 
 class HelpRequestResolve(BaseModel):
@@ -2,15 +2,18 @@
 Knowledge Base entry model for learned answers.
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, ClassVar, Tuple
 from datetime import datetime
 import uuid
+from src.utils.serialization import parse_datetime_fields, load_models
 
 
 class KnowledgeEntry(BaseModel):
     """
     Represents a learned answer in the knowledge base.
     """
+    DATETIME_FIELDS: ClassVar[Tuple[str, ...]] = ('created_at', 'updated_at', 'last_used_at')
+    
     entry_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     question: str
     answer: str
@@ -22,6 +25,8 @@ class KnowledgeEntry(BaseModel):
     # Metadata
     source: str = "supervisor"  # Where this knowledge came from
     source_request_id: Optional[str] = None  # Link back to help request
+    source_request_ids: List[str] = Field(default_factory=list)  # All requests that taught us this
+    merged_entry_ids: List[str] = Field(default_factory=list)  # Duplicates folded into this entry
     confidence: float = 1.0  # How confident we are in this answer
     
     # Usage tracking
@@ -47,11 +52,12 @@ class KnowledgeEntry(BaseModel):
     @classmethod
     def from_dict(cls, data: dict) -> 'KnowledgeEntry':
         """Create instance from Firebase data."""
-        datetime_fields = ['created_at', 'updated_at', 'last_used_at']
-        for field in datetime_fields:
-            if field in data and data[field]:
-                data[field] = datetime.fromisoformat(data[field])
-        return cls(**data)
+        return cls(**parse_datetime_fields(data, cls.DATETIME_FIELDS))
+    
+    @classmethod
+    def from_dict_batch(cls, rows: List[dict]) -> List['KnowledgeEntry']:
+        """Bulk conversion for listing many stored entries."""
+        return load_models(cls, rows)
 
 
 class KnowledgeCreate(BaseModel):
@@ -0,0 +1,73 @@
+"""
+Notification outbox job model.
+"""
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+import uuid
+from src.utils.serialization import parse_datetime_fields
+from src.utils.tenant import DEFAULT_TENANT
+
+
+class NotificationKind(str, Enum):
+    """Who a notification is addressed to."""
+    SUPERVISOR = "supervisor"
+    CUSTOMER = "customer"
+
+
+class NotificationStatus(str, Enum):
+    """Outbox job lifecycle."""
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"  # Gave up after exhausting retries
+
+
+class NotificationJob(BaseModel):
+    """
+    A notification waiting in the outbox for delivery.
+    
+    Jobs are written in the same database batch as the help request
+    change that caused them, then picked up by the delivery workers.
+    
+    Lifecycle: PENDING -> SENT or DEAD
+    """
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: NotificationKind
+    recipient: str
+    message: str
+    request_id: Optional[str] = None
+    tenant_id: str = DEFAULT_TENANT  # Salon the request belongs to
+    urgent: bool = False  # Skips supervisor digest batching
+    
+    # Same key for every delivery attempt so transports can drop duplicates
+    idempotency_key: str
+    
+    status: NotificationStatus = NotificationStatus.PENDING
+    attempts: int = 0
+    last_error: Optional[str] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+    
+    class Config:
+        use_enum_values = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary for Firebase storage."""
+        data = self.model_dump()
+        for key, value in data.items():
+            if isinstance(value, datetime):
+                data[key] = value.isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'NotificationJob':
+        """Create instance from Firebase data."""
+        datetime_fields = ['created_at', 'updated_at', 'next_attempt_at', 'sent_at']
+        return cls(**parse_datetime_fields(data, datetime_fields))
\ No newline at end of file
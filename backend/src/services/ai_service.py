@@ -1,84 +1,359 @@
 """
 AI Service using Lightning AI API for conversational responses.
 """
+import asyncio
+import hashlib
+import httpx
 import requests
 import json
-from typing import List, Dict, Optional
+import re
+import threading
+import time
+import weakref
+from typing import List, Dict, Optional, Tuple
 from src.config.settings import settings
+from src.services.llm_cache import llm_cache, CacheMode
+from src.utils.single_flight import SingleFlight, AsyncSingleFlight
+from src.utils.admission import llm_limiter
+from src.utils.exceptions import AdmissionDeniedError
 from src.utils.logger import logger
 
+# Tasks that can be routed to different models
+TASK_KEYWORDS = "keywords"
+TASK_ANSWERABILITY = "answerability"
+TASK_ANSWER = "answer"
+
+# Hedging that makes a small-model answer too unsure to give a customer
+UNSURE_PATTERN = re.compile(
+    r"\b(i think|i believe|not sure|not certain|probably|might be|may be|"
+    r"possibly|i don't know|i do not know|unsure|unclear)\b",
+    re.IGNORECASE
+)
+
+
+def payload_key(payload: dict) -> str:
+    """Stable hash of a request payload (model, messages, temperature, max_tokens)."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
 
 class AIService:
     """
-    Handles interactions with Lightning AI (GPT-4).
+    Handles interactions with Lightning AI.
+    
+    Each task has its own model: keyword extraction uses the small model,
+    final answers the large one, and the answerability check cascades from
+    small to large when the small model is unsure.
     """
     
     def __init__(self):
         self.api_url = settings.lightning_ai_url
         self.api_key = settings.lightning_ai_api_key
         self.model = settings.lightning_ai_model
+        self.small_model = settings.lightning_ai_small_model
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.task_models = {
+            TASK_KEYWORDS: self.small_model,
+            TASK_ANSWERABILITY: (
+                self.small_model if settings.ai_cascade_enabled else self.model
+            ),
+            TASK_ANSWER: self.model
+        }
+        self.cost_per_1k_tokens = {
+            self.model: settings.lightning_ai_cost_per_1k_tokens,
+            self.small_model: settings.lightning_ai_small_cost_per_1k_tokens
+        }
+        self.stats: Dict[str, dict] = {}
+        self.cascade_stats = {'answered_by_small': 0, 'escalated_to_large': 0}
+        self._stats_lock = threading.Lock()
+        self.cache = llm_cache
+        self._single_flight = SingleFlight()
+        self._async_single_flight = AsyncSingleFlight()
+        # One pooled client per event loop (an httpx.AsyncClient is bound
+        # to the loop it was first used on); dropped with its loop
+        self._async_clients = weakref.WeakKeyDictionary()
+    
+    def model_for(self, task: str) -> str:
+        """Model configured for a task (the large model if unknown)."""
+        return self.task_models.get(task, self.model)
     
     def generate_response(
         self, 
         messages: List[Dict[str, str]], 
         temperature: float = 0.7,
-        max_tokens: int = 500
+        max_tokens: int = 500,
+        model: Optional[str] = None
     ) -> Optional[str]:
         """
         Generate AI response using Lightning AI.
         
+        Identical calls already in flight are not sent again; they wait
+        for and share the result of the first one. With the LLM cache on,
+        stored responses are returned without calling the API.
+        
         Args:
             messages: List of conversation messages
             temperature: Creativity (0-1)
             max_tokens: Max response length
+            model: Model to use (defaults to the large model)
         
         Returns:
             AI response text or None if failed
+        
+        Raises:
+            AdmissionDeniedError: Too many LLM calls running and waiting
+                (see llm_limiter); nothing was sent
         """
-        try:
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
+        payload = self._build_payload(messages, temperature, max_tokens, model)
+        key = payload_key(payload)
+        hit, cached = self._from_cache(key)
+        if hit:
+            return cached
+        
+        response = self._single_flight.do(key, lambda: self._post(payload))
+        self._to_cache(key, payload, response)
+        return response
+    
+    async def agenerate_response(
+        self, 
+        messages: List[Dict[str, str]], 
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """Async generate_response, for callers on an event loop."""
+        payload = self._build_payload(messages, temperature, max_tokens, model)
+        key = payload_key(payload)
+        hit, cached = self._from_cache(key)
+        if hit:
+            return cached
+        
+        response = await self._async_single_flight.do(key, lambda: self._apost(payload))
+        self._to_cache(key, payload, response)
+        return response
+    
+    def _from_cache(self, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look a payload up in the LLM cache.
+        
+        Returns:
+            (hit, response); a replay miss counts as a hit with no response,
+            so the API is never called while replaying
+        """
+        if not self.cache.reads:
+            return False, None
+        cached = self.cache.get(key)
+        if cached is not None:
+            return True, cached
+        if self.cache.mode == CacheMode.REPLAY:
+            logger.warning(f"LLM cache replay miss for {key[:12]}; no API call made")
+            return True, None
+        return False, None
+    
+    def _to_cache(self, key: str, payload: dict, response: Optional[str]):
+        if response is not None and self.cache.writes:
+            self.cache.put(key, payload['model'], response)
+    
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        model: Optional[str]
+    ) -> dict:
+        return {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
+    def _post(self, payload: dict) -> Optional[str]:
+        """Send one chat completion request."""
+        with llm_limiter.admit():
+            start = time.perf_counter()
+            try:
+                response = requests.post(
+                    url=self.api_url,
+                    headers=self.headers,
+                    data=json.dumps(payload),
+                    timeout=30
+                )
+                response.raise_for_status()
+                return self._handle_result(payload, response.json(), start)
             
-            response = requests.post(
-                url=self.api_url,
-                headers=self.headers,
-                data=json.dumps(payload),
-                timeout=30
-            )
-            response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                self._record_call(payload['model'], time.perf_counter() - start, failed=True)
+                logger.error(f"AI API request failed: {str(e)}")
+                return None
+            except json.JSONDecodeError as e:
+                self._record_call(payload['model'], time.perf_counter() - start, failed=True)
+                logger.error(f"Failed to parse AI response: {str(e)}")
+                return None
+    
+    async def _apost(self, payload: dict) -> Optional[str]:
+        """Send one chat completion request without blocking the loop."""
+        async with llm_limiter.aadmit():
+            start = time.perf_counter()
+            try:
+                response = await self._get_async_client().post(
+                    self.api_url,
+                    headers=self.headers,
+                    content=json.dumps(payload),
+                    timeout=30
+                )
+                response.raise_for_status()
+                return self._handle_result(payload, response.json(), start)
             
-            result = response.json()
+            except httpx.HTTPError as e:
+                self._record_call(payload['model'], time.perf_counter() - start, failed=True)
+                logger.error(f"AI API request failed: {str(e)}")
+                return None
+            except json.JSONDecodeError as e:
+                self._record_call(payload['model'], time.perf_counter() - start, failed=True)
+                logger.error(f"Failed to parse AI response: {str(e)}")
+                return None
+    
+    def _handle_result(self, payload: dict, result: dict, start: float) -> Optional[str]:
+        """Extract the answer from a completion and record the call."""
+        model = payload['model']
+        try:
             ai_response = result['choices'][0]['message']['content']
-            
-            logger.info(f"AI response generated successfully")
-            return ai_response
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"AI API request failed: {str(e)}")
-            return None
-        except (KeyError, IndexError, json.JSONDecodeError) as e:
+        except (KeyError, IndexError, TypeError) as e:
+            self._record_call(model, time.perf_counter() - start, failed=True)
             logger.error(f"Failed to parse AI response: {str(e)}")
             return None
+        
+        self._record_call(
+            model, time.perf_counter() - start, payload['messages'], ai_response, result.get('usage')
+        )
+        logger.info(f"AI response generated successfully ({model})")
+        return ai_response
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Pooled async client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._async_clients[loop] = httpx.AsyncClient()
+        return client
+    
+    async def aclose(self):
+        """Close the running event loop's client and its connection pool."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def _record_call(
+        self,
+        model: str,
+        latency: float,
+        messages: Optional[List[Dict[str, str]]] = None,
+        response: Optional[str] = None,
+        usage: Optional[dict] = None,
+        failed: bool = False
+    ):
+        """Accumulate latency, tokens and cost for a model."""
+        tokens = 0
+        if not failed:
+            if usage and usage.get('total_tokens'):
+                tokens = usage['total_tokens']
+            else:
+                # Rough estimate (~4 characters per token) when usage is not reported
+                chars = sum(len(m.get('content', '')) for m in messages or []) + len(response or '')
+                tokens = chars // 4
+        
+        with self._stats_lock:
+            stats = self.stats.setdefault(model, {
+                'calls': 0, 'failures': 0, 'latency_seconds': 0.0, 'tokens': 0, 'cost_usd': 0.0
+            })
+            stats['calls'] += 1
+            stats['failures'] += failed
+            stats['latency_seconds'] += latency
+            stats['tokens'] += tokens
+            stats['cost_usd'] += tokens / 1000 * self.cost_per_1k_tokens.get(model, 0.0)
+    
+    def get_stats(self) -> dict:
+        """Per-model latency and cost, plus how often the cascade escalated."""
+        with self._stats_lock:
+            models = {
+                model: {
+                    'calls': s['calls'],
+                    'failures': s['failures'],
+                    'avg_latency_ms': round(s['latency_seconds'] / s['calls'] * 1000, 1),
+                    'tokens': s['tokens'],
+                    'cost_usd': round(s['cost_usd'], 4)
+                }
+                for model, s in self.stats.items()
+            }
+            return {
+                'models': models,
+                'cascade': dict(self.cascade_stats),
+                'cache': dict(self.cache.stats),
+                'single_flight': {
+                    key: self._single_flight.stats[key] + self._async_single_flight.stats[key]
+                    for key in self._single_flight.stats
+                }
+            }
     
     def check_if_needs_help(
         self, 
         question: str, 
-        knowledge_base: List[Dict]
+        knowledge_base: List[Dict],
+        customer_context: str = ""
     ) -> tuple[bool, Optional[str]]:
         """
         Determine if AI can answer the question or needs help.
         
+        With the cascade on, the small model answers first; the large
+        model is asked only when it says NEEDS_HELP, fails or hedges.
+        
+        Args:
+            customer_context: Optional returning-caller history to include
+        
         Returns:
             (needs_help, answer_or_none)
         """
+        messages = self._answerability_messages(question, knowledge_base, customer_context)
+        first_model = self.model_for(TASK_ANSWERABILITY)
+        final_model = self.model_for(TASK_ANSWER)
+        
+        if first_model != final_model:
+            draft = self.generate_response(messages, temperature=0.3, model=first_model)
+            if self._accept_draft(question, draft, first_model, final_model):
+                return False, draft
+        
+        response = self.generate_response(messages, temperature=0.3, model=final_model)
+        return self._verdict(question, response)
+    
+    async def acheck_if_needs_help(
+        self,
+        question: str,
+        knowledge_base: List[Dict],
+        customer_context: str = ""
+    ) -> tuple[bool, Optional[str]]:
+        """Async check_if_needs_help; cancelling it cancels the HTTP request."""
+        messages = self._answerability_messages(question, knowledge_base, customer_context)
+        first_model = self.model_for(TASK_ANSWERABILITY)
+        final_model = self.model_for(TASK_ANSWER)
+        
+        if first_model != final_model:
+            draft = await self.agenerate_response(messages, temperature=0.3, model=first_model)
+            if self._accept_draft(question, draft, first_model, final_model):
+                return False, draft
+        
+        response = await self.agenerate_response(messages, temperature=0.3, model=final_model)
+        return self._verdict(question, response)
+    
+    def _answerability_messages(
+        self,
+        question: str,
+        knowledge_base: List[Dict],
+        customer_context: str
+    ) -> List[Dict[str, str]]:
         # Build knowledge context
         knowledge_context = self._build_knowledge_context(knowledge_base)
         
@@ -90,14 +365,29 @@ You have the following knowledge:
 If you can confidently answer the question using your knowledge, provide the answer.
 If you cannot answer confidently, respond with exactly: "NEEDS_HELP"
 """
+        if customer_context:
+            system_prompt += f"\n{customer_context}\n"
         
-        messages = [
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": question}
         ]
+    
+    def _accept_draft(self, question: str, draft: Optional[str], first_model: str, final_model: str) -> bool:
+        """Whether the small model's answer stands (otherwise the large model is asked)."""
+        if draft and "NEEDS_HELP" not in draft and not self._looks_unsure(draft):
+            with self._stats_lock:
+                self.cascade_stats['answered_by_small'] += 1
+            logger.info(f"AI can answer: {question} ({first_model})")
+            return True
         
-        response = self.generate_response(messages, temperature=0.3)
-        
+        with self._stats_lock:
+            self.cascade_stats['escalated_to_large'] += 1
+        logger.info(f"Small model unsure, asking {final_model}")
+        return False
+    
+    @staticmethod
+    def _verdict(question: str, response: Optional[str]) -> tuple[bool, Optional[str]]:
         if response and "NEEDS_HELP" in response:
             logger.info(f"AI needs help with: {question}")
             return True, None
@@ -105,6 +395,11 @@ If you cannot answer confidently, respond with exactly: "NEEDS_HELP"
         logger.info(f"AI can answer: {question}")
         return False, response
     
+    @staticmethod
+    def _looks_unsure(answer: str) -> bool:
+        """Whether an answer hedges instead of stating the facts."""
+        return bool(UNSURE_PATTERN.search(answer))
+    
     def _build_knowledge_context(self, knowledge_base: List[Dict]) -> str:
         """Format knowledge base for prompt context."""
         if not knowledge_base:
@@ -121,6 +416,9 @@ If you cannot answer confidently, respond with exactly: "NEEDS_HELP"
     def extract_keywords(self, text: str) -> List[str]:
         """
         Extract keywords from text for knowledge base categorization.
+        
+        Keywords are optional, so none are returned while the LLM is
+        shedding load.
         """
         messages = [
             {
@@ -130,7 +428,16 @@ If you cannot answer confidently, respond with exactly: "NEEDS_HELP"
             {"role": "user", "content": text}
         ]
         
-        response = self.generate_response(messages, temperature=0.3, max_tokens=50)
+        try:
+            response = self.generate_response(
+                messages,
+                temperature=0.3,
+                max_tokens=50,
+                model=self.model_for(TASK_KEYWORDS)
+            )
+        except AdmissionDeniedError:
+            logger.warning("Skipped keyword extraction: LLM overloaded")
+            return []
         
         if response:
             keywords = [k.strip() for k in response.split(',')]
@@ -0,0 +1,245 @@
+"""
+Analytics Rollups - Hourly and daily counters for supervisor analytics.
+
+Every lifecycle transition bumps a few counters in the bucket of the
+hour and the day it happened in:
+
+    /analytics_rollups/hourly/2025-01-15T09
+    /analytics_rollups/daily/2025-01-15
+        calls, escalations, resolved, timed_out, resolution_seconds,
+        supervisors/{supervisor_id}/{resolved, resolution_seconds}
+
+Range queries read only the buckets in the range, so their cost does not
+depend on how many help requests exist.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from src.models.help_request import HelpRequest, RequestStatus
+from src.database.firebase_client import firebase_client
+from src.utils.validators import sanitize_key
+from src.utils.logger import logger
+
+GRANULARITIES = {
+    'hourly': ('%Y-%m-%dT%H', timedelta(hours=1)),
+    'daily': ('%Y-%m-%d', timedelta(days=1)),
+}
+
+COUNTERS = ('calls', 'escalations', 'resolved', 'timed_out', 'resolution_seconds')
+
+
+def bucket_key(granularity: str, at: datetime) -> str:
+    """Rollup bucket key of `at` for the granularity."""
+    return at.strftime(GRANULARITIES[granularity][0])
+
+
+def _apply_increments(bucket: Optional[dict], increments: Dict[str, float]) -> dict:
+    """Add increments (keys may be nested 'a/b/c' paths) to a bucket."""
+    bucket = bucket or {}
+    for path, amount in increments.items():
+        node = bucket
+        *parents, leaf = path.split('/')
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = node.get(leaf, 0) + amount
+    return bucket
+
+
+def summarize_bucket(bucket: dict, supervisor_id: Optional[str] = None) -> dict:
+    """
+    Derived metrics for one bucket (or a sum of buckets).
+    
+    With `supervisor_id`, resolution figures are that supervisor's only.
+    """
+    escalations = bucket.get('escalations', 0)
+    calls = bucket.get('calls', 0)
+    timed_out = bucket.get('timed_out', 0)
+    
+    if supervisor_id:
+        own = bucket.get('supervisors', {}).get(sanitize_key(supervisor_id), {})
+        resolved = own.get('resolved', 0)
+        resolution_seconds = own.get('resolution_seconds', 0)
+    else:
+        resolved = bucket.get('resolved', 0)
+        resolution_seconds = bucket.get('resolution_seconds', 0)
+    
+    return {
+        'calls': calls,
+        'escalations': escalations,
+        'resolved': resolved,
+        'timed_out': timed_out,
+        'escalation_rate': round(escalations / calls, 4) if calls else None,
+        'timeout_rate': round(timed_out / escalations, 4) if escalations else None,
+        'avg_resolution_seconds': round(resolution_seconds / resolved, 1) if resolved else None
+    }
+
+
+class AnalyticsRollups:
+    """
+    Incrementally maintained hourly and daily rollups.
+    """
+    
+    def _increment(self, at: datetime, increments: Dict[str, float]) -> bool:
+        """Bump counters in the hourly and daily buckets containing `at`."""
+        success = True
+        for granularity in GRANULARITIES:
+            path = f"analytics_rollups/{granularity}/{bucket_key(granularity, at)}"
+            if not firebase_client.run_transaction(
+                path,
+                lambda bucket: _apply_increments(bucket, increments)
+            ):
+                success = False
+        
+        if not success:
+            logger.warning(f"Failed to update analytics rollups for {at.isoformat()}")
+        return success
+    
+    # Transitions
+    def record_call(self, at: Optional[datetime] = None) -> bool:
+        """Count an incoming call."""
+        return self._increment(at or datetime.utcnow(), {'calls': 1})
+    
+    def record_escalation(self, help_request: HelpRequest) -> bool:
+        """Count a newly created help request."""
+        return self._increment(help_request.created_at, {'escalations': 1})
+    
+    def record_resolution(self, help_request: HelpRequest) -> bool:
+        """Count a resolution and its latency, overall and per supervisor."""
+        seconds = (help_request.resolved_at - help_request.created_at).total_seconds()
+        increments = {'resolved': 1, 'resolution_seconds': seconds}
+        if help_request.supervisor_id:
+            prefix = f"supervisors/{sanitize_key(help_request.supervisor_id)}"
+            increments[f"{prefix}/resolved"] = 1
+            increments[f"{prefix}/resolution_seconds"] = seconds
+        return self._increment(help_request.resolved_at, increments)
+    
+    def record_timeout(self, at: Optional[datetime] = None) -> bool:
+        """Count a request that timed out."""
+        return self._increment(at or datetime.utcnow(), {'timed_out': 1})
+    
+    # Queries
+    def get_range(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        supervisor_id: Optional[str] = None
+    ) -> dict:
+        """
+        Metrics for every bucket between `start` and `end` (inclusive).
+        
+        Returns:
+            Per-bucket metrics (empty buckets included) and range totals
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        _, step = GRANULARITIES[granularity]
+        
+        stored = firebase_client.get_rollups(
+            granularity,
+            bucket_key(granularity, start),
+            bucket_key(granularity, end)
+        )
+        
+        buckets = []
+        totals: dict = {}
+        key, last_key, at = bucket_key(granularity, start), bucket_key(granularity, end), start
+        while key <= last_key:
+            bucket = stored.get(key, {})
+            buckets.append({'bucket': key, **summarize_bucket(bucket, supervisor_id)})
+            totals = self._merge(totals, bucket)
+            at += step
+            key = bucket_key(granularity, at)
+        
+        return {
+            'granularity': granularity,
+            'supervisor_id': supervisor_id,
+            'buckets': buckets,
+            'totals': summarize_bucket(totals, supervisor_id)
+        }
+    
+    def get_supervisor_summary(self, granularity: str, start: datetime, end: datetime) -> List[dict]:
+        """Resolution counts and average latency per supervisor over a range."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        
+        stored = firebase_client.get_rollups(
+            granularity,
+            bucket_key(granularity, start),
+            bucket_key(granularity, end)
+        )
+        totals: dict = {}
+        for bucket in stored.values():
+            totals = self._merge(totals, bucket)
+        
+        summary = [
+            {'supervisor_id': supervisor_id, **summarize_bucket(totals, supervisor_id)}
+            for supervisor_id in totals.get('supervisors', {})
+        ]
+        summary.sort(key=lambda s: s['resolved'], reverse=True)
+        return summary
+    
+    @staticmethod
+    def _merge(total: dict, bucket: dict) -> dict:
+        """Sum a bucket into a running total (nested supervisor counters too)."""
+        for key, value in bucket.items():
+            if isinstance(value, dict):
+                total[key] = AnalyticsRollups._merge(total.get(key, {}), value)
+            else:
+                total[key] = total.get(key, 0) + value
+        return total
+    
+    # Backfill
+    def rebuild(self, rows: List[dict], since: datetime) -> int:
+        """
+        Recompute request-derived counters from raw help request rows.
+        
+        Used once to backfill history recorded before rollups existed.
+        Only buckets from `since` on are rewritten: older requests may
+        already be archived, so the hot store cannot recount them. Call
+        counts cannot be reconstructed and are left as they are.
+        
+        Returns:
+            Number of buckets written
+        """
+        computed: Dict[str, Dict[str, dict]] = {g: {} for g in GRANULARITIES}
+        
+        def add(at: datetime, increments: Dict[str, float]):
+            if at < since:
+                return
+            for granularity, buckets in computed.items():
+                key = bucket_key(granularity, at)
+                buckets[key] = _apply_increments(buckets.get(key), increments)
+        
+        for row in rows:
+            request = HelpRequest.from_dict(row)
+            add(request.created_at, {'escalations': 1})
+            if request.status == RequestStatus.RESOLVED and request.resolved_at:
+                seconds = (request.resolved_at - request.created_at).total_seconds()
+                increments = {'resolved': 1, 'resolution_seconds': seconds}
+                if request.supervisor_id:
+                    prefix = f"supervisors/{sanitize_key(request.supervisor_id)}"
+                    increments[f"{prefix}/resolved"] = 1
+                    increments[f"{prefix}/resolution_seconds"] = seconds
+                add(request.resolved_at, increments)
+            elif request.status == RequestStatus.TIMEOUT:
+                add(request.updated_at, {'timed_out': 1})
+        
+        batch = {}
+        for granularity, buckets in computed.items():
+            for key, bucket in buckets.items():
+                path = f"analytics_rollups/{granularity}/{key}"
+                for counter in COUNTERS:
+                    if counter != 'calls':
+                        batch[f"{path}/{counter}"] = bucket.get(counter, 0)
+                batch[f"{path}/supervisors"] = bucket.get('supervisors')
+        
+        if batch and not firebase_client.commit_batch(batch):
+            raise Exception("Database error")
+        
+        written = sum(len(buckets) for buckets in computed.values())
+        logger.info(f"Rebuilt {written} analytics rollup buckets from {len(rows)} requests")
+        return written
+
+
+# Global instance
+analytics_rollups = AnalyticsRollups()
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Analytics Store - Compact columnar copy of help request metadata.
+
+Dashboards only need a handful of fields per request, so instead of
+materializing full HelpRequest objects (with their long context strings)
+the store keeps one NumPy array per field:
+
+    status        int8    code into an interned category table
+    created_at    datetime64[us]
+    resolved_at   datetime64[us]  (NaT while unresolved)
+    timeout_at    datetime64[us]
+    supervisor    int32   code into an interned table (-1 = none)
+    customer      int32   code into an interned table of phone keys
+
+Aggregations are vectorized over the columns.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from src.models.help_request import HelpRequest, RequestStatus
+from src.utils.validators import sanitize_phone_for_key
+
+MISSING = -1
+INITIAL_CAPACITY = 1024
+SECOND = np.timedelta64(1, 's')
+
+
+class Interner:
+    """Maps repeated strings to small integer codes."""
+    
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+    
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _to_datetime64(values: Sequence[Optional[str]]) -> np.ndarray:
+    """Parse ISO strings (or None) into a datetime64 column in one call."""
+    return np.array(
+        [value or 'NaT' for value in values],
+        dtype='datetime64[us]'
+    )
+
+
+def _datetime64(value: Optional[datetime]) -> np.datetime64:
+    return np.datetime64(value, 'us') if value else np.datetime64('NaT')
+
+
+class RequestAnalyticsStore:
+    """
+    Columnar, in-memory store of help request metadata.
+    
+    Rows are upserted by request_id; columns grow by doubling so appends
+    stay amortized O(1).
+    """
+    
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+    
+    def _allocate(self, capacity: int):
+        self.statuses = Interner(status.value for status in RequestStatus)
+        self.supervisors = Interner()
+        self.customers = Interner()
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._status = np.zeros(capacity, dtype=np.int8)
+        self._created = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[us]')
+        self._resolved = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[us]')
+        self._timeout = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[us]')
+        self._supervisor = np.full(capacity, MISSING, dtype=np.int32)
+        self._customer = np.full(capacity, MISSING, dtype=np.int32)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and interned strings."""
+        columns = (self._status, self._created, self._resolved, self._timeout, self._supervisor, self._customer)
+        strings = sum(len(v) + 50 for v in self.supervisors.values + self.customers.values)
+        return sum(column.nbytes for column in columns) + strings + len(self._rows) * 100
+    
+    def _grow(self, needed: int):
+        capacity = len(self._status)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_status', '_created', '_resolved', '_timeout', '_supervisor', '_customer'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+    
+    # Writes
+    def load(self, rows: List[dict]):
+        """
+        Replace the store contents with raw help request rows.
+        
+        Rows are the plain dicts Firebase returns; only the metadata
+        fields are read and every column is built in a single pass.
+        """
+        with self._lock:
+            self._allocate(max(INITIAL_CAPACITY, len(rows)))
+            self._size = len(rows)
+            if not rows:
+                return
+            
+            n = len(rows)
+            self._rows = {row['request_id']: i for i, row in enumerate(rows)}
+            self._status[:n] = np.fromiter(
+                (self.statuses.code(row.get('status')) for row in rows), np.int8, n
+            )
+            self._created[:n] = _to_datetime64([row.get('created_at') for row in rows])
+            self._resolved[:n] = _to_datetime64([row.get('resolved_at') for row in rows])
+            self._timeout[:n] = _to_datetime64([row.get('timeout_at') for row in rows])
+            self._supervisor[:n] = np.fromiter(
+                (self.supervisors.code(row.get('supervisor_id')) for row in rows), np.int32, n
+            )
+            self._customer[:n] = np.fromiter(
+                (
+                    self.customers.code(sanitize_phone_for_key(row['customer_phone']))
+                    if row.get('customer_phone') else MISSING
+                    for row in rows
+                ),
+                np.int32,
+                n
+            )
+    
+    def record(self, help_request: HelpRequest):
+        """Insert or update one request after a lifecycle transition."""
+        status = help_request.status
+        status = status.value if isinstance(status, RequestStatus) else status
+        
+        with self._lock:
+            row = self._rows.get(help_request.request_id)
+            if row is None:
+                row = self._size
+                self._grow(row + 1)
+                self._rows[help_request.request_id] = row
+                self._size += 1
+            
+            self._status[row] = self.statuses.code(status)
+            self._created[row] = _datetime64(help_request.created_at)
+            self._resolved[row] = _datetime64(help_request.resolved_at)
+            self._timeout[row] = _datetime64(help_request.timeout_at)
+            self._supervisor[row] = self.supervisors.code(help_request.supervisor_id)
+            self._customer[row] = self.customers.code(
+                sanitize_phone_for_key(help_request.customer_phone)
+            )
+    
+    def set_status(self, request_id: str, status: RequestStatus) -> bool:
+        """Update just the status of a known request."""
+        with self._lock:
+            row = self._rows.get(request_id)
+            if row is None:
+                return False
+            self._status[row] = self.statuses.code(status.value)
+            return True
+    
+    # Aggregations
+    def _range_mask(self, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+        created = self._created[:self._size]
+        mask = np.ones(self._size, dtype=bool)
+        if start:
+            mask &= created >= np.datetime64(start, 'us')
+        if end:
+            mask &= created < np.datetime64(end, 'us')
+        return mask
+    
+    def count_by_status(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Number of requests per status, optionally for a creation range."""
+        with self._lock:
+            codes = self._status[:self._size][self._range_mask(start, end)]
+            codes = codes[codes >= 0]
+            counts = np.bincount(codes, minlength=len(self.statuses))
+            return {value: int(counts[code]) for code, value in enumerate(self.statuses.values)}
+    
+    def resolution_time_percentiles(
+        self,
+        percentiles: Sequence[float] = (50, 90, 99),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Optional[float]]:
+        """
+        Percentiles of resolved_at - created_at, in seconds.
+        
+        Returns:
+            {'p50': ..., 'p90': ...}; values are None when nothing resolved
+        """
+        with self._lock:
+            mask = self._range_mask(start, end)
+            resolved = self._resolved[:self._size][mask]
+            created = self._created[:self._size][mask]
+            done = ~np.isnat(resolved)
+            seconds = (resolved[done] - created[done]) / SECOND
+        
+        keys = [f"p{p:g}" for p in percentiles]
+        if not len(seconds):
+            return dict.fromkeys(keys)
+        values = np.percentile(seconds, percentiles)
+        return {key: round(float(value), 1) for key, value in zip(keys, values)}
+    
+    def hourly_volume(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Tuple[datetime, int]]:
+        """Requests created per UTC hour, oldest first (empty hours omitted)."""
+        with self._lock:
+            created = self._created[:self._size][self._range_mask(start, end)]
+        
+        created = created[~np.isnat(created)]
+        hours, counts = np.unique(created.astype('datetime64[h]'), return_counts=True)
+        return [
+            (hour.astype('datetime64[us]').item(), int(count))
+            for hour, count in zip(hours, counts)
+        ]
\ No newline at end of file
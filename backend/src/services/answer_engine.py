@@ -0,0 +1,270 @@
+"""
+Answer Engine - Decides how each customer question gets answered.
+
+Tiers, cheapest first:
+
+    CANNED     the intent classifier recognizes a greeting, thanks, goodbye
+               or small talk with no content words, answered with a fixed reply
+    KNOWLEDGE  a stored answer matches the question closely and is trusted,
+               so it is spoken directly (no LLM call). The stored question
+               must contain every content word asked, so "how much are
+               eyelash extensions?" is not answered with the reply to "do
+               you do eyelash extensions?". When the classifier is
+               confident about the FAQ category, a looser match within
+               that category is enough
+    LLM        the model answers using the closest knowledge as context
+    ESCALATE   the model says it needs help; a supervisor is asked
+
+KNOWLEDGE and LLM answers are cached per tenant by normalized question
+until that tenant's knowledge index is reloaded or changed. Uses of stored
+answers are counted in the background (knowledge_service.record_usage),
+so answering never waits on a database write.
+
+When the LLM or the knowledge read is shed (AdmissionDeniedError) the
+engine degrades instead of failing the call: a cached answer still wins,
+then the best confident knowledge match above the looser
+`intent_min_knowledge_score`, and otherwise the question is escalated.
+"""
+import asyncio
+import threading
+import zlib
+from enum import Enum
+from typing import NamedTuple, Optional, Tuple
+from src.agents.prompts import get_small_talk_response
+from src.services.ai_service import ai_service
+from src.services.knowledge_service import knowledge_service
+from src.services.tenant_registry import tenant_registry
+from src.services.intent_classifier import (
+    IntentClassifier, intent_classifier, CONVERSATIONAL_INTENTS, OTHER_INTENT, SMALL_TALK_WORDS
+)
+from src.config.settings import settings
+from src.utils.exceptions import AdmissionDeniedError
+from src.utils.text import normalize_text, question_tokens
+from src.utils.logger import logger
+
+# Light wording variety for stored answers; {answer} is the stored text
+REPHRASE_TEMPLATES = (
+    "{answer}",
+    "Good question! {answer}",
+    "Sure! {answer}",
+    "Happy to help with that. {answer}",
+)
+
+
+class AnswerTier(str, Enum):
+    """Which tier produced an answer."""
+    CANNED = "canned"
+    KNOWLEDGE = "knowledge"
+    LLM = "llm"
+    ESCALATE = "escalate"
+
+
+class AnswerResult(NamedTuple):
+    """Outcome of answering one question."""
+    tier: AnswerTier
+    answer: Optional[str]
+    entry_id: Optional[str] = None
+    score: float = 0.0
+    intent: Optional[str] = None
+
+
+class _PendingLLM(NamedTuple):
+    """A question the local tiers could not answer, ready for the LLM."""
+    tenant: object
+    cache_key: str
+    intent: Optional[str]
+    matches: list
+    
+    def knowledge(self) -> list:
+        return [entry.to_dict() for _, entry in self.matches]
+
+
+class AnswerEngine:
+    """
+    Tiered answering: stored knowledge first, the LLM only when unsure.
+    """
+    
+    def __init__(
+        self,
+        min_score: float = None,
+        min_confidence: float = None,
+        rephrase: bool = None,
+        classifier: Optional[IntentClassifier] = None
+    ):
+        self.min_score = min_score if min_score is not None else settings.fast_path_min_score
+        self.min_confidence = (
+            min_confidence if min_confidence is not None else settings.fast_path_min_confidence
+        )
+        self.rephrase = rephrase if rephrase is not None else settings.fast_path_rephrase
+        self.classifier = classifier or intent_classifier
+        self.stats = {tier.value: 0 for tier in AnswerTier}
+        self.degraded = 0  # Answers given while the LLM or database shed load
+        self._lock = threading.Lock()
+    
+    def answer(self, question: str, customer_context: str = "") -> AnswerResult:
+        """
+        Answer a customer question for the current tenant using the
+        cheapest tier that can.
+        
+        Args:
+            question: What the customer asked
+            customer_context: Returning-caller history for the LLM tier;
+                answers that used it are not cached
+        
+        Returns:
+            AnswerResult; `answer` is None when the tier is ESCALATE
+        """
+        result, pending = self._answer_locally(question)
+        if result is not None:
+            return result
+        
+        try:
+            needs_help, answer = ai_service.check_if_needs_help(
+                question, pending.knowledge(), customer_context
+            )
+        except AdmissionDeniedError:
+            return self._degrade(question, pending.intent, pending.matches)
+        return self._llm_result(pending, needs_help, answer, customer_context)
+    
+    async def aanswer(self, question: str, customer_context: str = "") -> AnswerResult:
+        """
+        answer() for the event loop.
+        
+        The local tiers run in a worker thread and the LLM is called over
+        async HTTP, so cancelling the awaiting task (a caller interrupting
+        or hanging up) also cancels the LLM request.
+        """
+        result, pending = await asyncio.to_thread(self._answer_locally, question)
+        if result is not None:
+            return result
+        
+        try:
+            needs_help, answer = await ai_service.acheck_if_needs_help(
+                question, pending.knowledge(), customer_context
+            )
+        except AdmissionDeniedError:
+            return self._degrade(question, pending.intent, pending.matches)
+        return self._llm_result(pending, needs_help, answer, customer_context)
+    
+    def _answer_locally(self, question: str) -> Tuple[Optional[AnswerResult], Optional[_PendingLLM]]:
+        """
+        The canned, cached and knowledge tiers.
+        
+        Returns:
+            (result, None) if answered, else (None, what the LLM tier needs)
+        """
+        tenant = tenant_registry.get()
+        intent = self.classify(question)
+        if intent in CONVERSATIONAL_INTENTS and question_tokens(question) - SMALL_TALK_WORDS:
+            # "Hi, do you do balayage?" is a question, whatever the
+            # classifier thinks; only pure small talk gets a canned reply
+            intent = None
+        if intent in CONVERSATIONAL_INTENTS:
+            return self._record(AnswerResult(
+                AnswerTier.CANNED,
+                get_small_talk_response(intent, tenant.salon_name),
+                intent=intent
+            )), None
+        
+        cache_key = normalize_text(question)
+        cached = tenant.get_answer(cache_key)
+        if cached is not None:
+            if cached.tier == AnswerTier.KNOWLEDGE:
+                knowledge_service.record_usage(cached.entry_id)
+            return self._record(cached), None
+        
+        try:
+            matches = knowledge_service.search_knowledge_scored(question)
+        except AdmissionDeniedError:
+            return self._degrade(question, intent, []), None
+        
+        tokens = question_tokens(question)
+        for score, entry in matches:
+            # Nothing asked may go unanswered by the stored question
+            if entry.confidence < self.min_confidence or not tokens <= question_tokens(entry.question):
+                continue
+            in_category = intent is not None and entry.category == intent
+            if score >= self.min_score or (
+                in_category and score >= settings.intent_min_knowledge_score
+            ):
+                logger.info(f"Answered from knowledge {entry.entry_id} (score {score:.2f})")
+                knowledge_service.record_usage(entry.entry_id)
+                return self._record(self._cache(tenant, cache_key, AnswerResult(
+                    AnswerTier.KNOWLEDGE,
+                    self._render(question, entry.answer),
+                    entry.entry_id,
+                    score,
+                    intent
+                ))), None
+        
+        return None, _PendingLLM(tenant, cache_key, intent, matches)
+    
+    def _llm_result(
+        self,
+        pending: _PendingLLM,
+        needs_help: bool,
+        answer: Optional[str],
+        customer_context: str
+    ) -> AnswerResult:
+        if needs_help or not answer:
+            return self._record(AnswerResult(AnswerTier.ESCALATE, None, intent=pending.intent))
+        
+        best_score = pending.matches[0][0] if pending.matches else 0.0
+        result = AnswerResult(AnswerTier.LLM, answer, score=best_score, intent=pending.intent)
+        if customer_context:
+            # Possibly specific to this caller
+            return self._record(result)
+        return self._record(self._cache(pending.tenant, pending.cache_key, result))
+    
+    def classify(self, question: str) -> Optional[str]:
+        """Confident intent of a turn, or None if there is no model or it is unsure."""
+        if self.classifier is None:
+            return None
+        intent, probability = self.classifier.predict(question)
+        if intent == OTHER_INTENT or probability < settings.intent_min_confidence:
+            return None
+        return intent
+    
+    def _degrade(self, question: str, intent: Optional[str], matches: list) -> AnswerResult:
+        """
+        Best answer without the LLM, for when admission was denied.
+        
+        Not cached: a looser match is acceptable only while overloaded.
+        """
+        with self._lock:
+            self.degraded += 1
+        for score, entry in matches:
+            if entry.confidence >= self.min_confidence and score >= settings.intent_min_knowledge_score:
+                logger.warning(f"Overloaded: answered from knowledge {entry.entry_id} (score {score:.2f})")
+                knowledge_service.record_usage(entry.entry_id)
+                return self._record(AnswerResult(
+                    AnswerTier.KNOWLEDGE,
+                    self._render(question, entry.answer),
+                    entry.entry_id,
+                    score,
+                    intent
+                ))
+        logger.warning("Overloaded: escalating without an LLM answer")
+        return self._record(AnswerResult(AnswerTier.ESCALATE, None, intent=intent))
+    
+    def _render(self, question: str, answer: str) -> str:
+        """Stored answer, optionally wrapped in a short template."""
+        if not self.rephrase:
+            return answer
+        # Stable per question, so the same question always reads the same
+        index = zlib.crc32(question.lower().encode()) % len(REPHRASE_TEMPLATES)
+        return REPHRASE_TEMPLATES[index].format(answer=answer)
+    
+    @staticmethod
+    def _cache(tenant, key: str, result: AnswerResult) -> AnswerResult:
+        tenant.put_answer(key, result, len(key) + len(result.answer))
+        return result
+    
+    def _record(self, result: AnswerResult) -> AnswerResult:
+        with self._lock:
+            self.stats[result.tier.value] += 1
+        return result
+
+
+# Global engine instance
+answer_engine = AnswerEngine()
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Archive Service - Moves old finished help requests to cold storage.
+
+Cold storage layout (under settings.archive_dir):
+
+    help_requests/2025-01-15.jsonl.gz   one gzip JSONL file per creation day
+    help_requests/index.tsv             request_id, day, status, customer key
+
+Day files are appended to as new gzip members, so archiving never
+rewrites existing data. The index is small enough to keep in memory and
+lets lookups open only the day files that can contain a match.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from src.models.help_request import HelpRequest, RequestStatus
+from src.database.firebase_client import firebase_client
+from src.config.settings import settings
+from src.utils.validators import sanitize_phone_for_key
+from src.utils.logger import logger
+
+FINISHED_STATUSES = (RequestStatus.RESOLVED.value, RequestStatus.TIMEOUT.value)
+
+# Firebase rejects very large multi-path updates, so deletes are chunked
+DELETE_BATCH_SIZE = 500
+
+
+class IndexRecord(NamedTuple):
+    """One line of the archive index."""
+    day: str
+    status: str
+    customer_key: str
+
+
+class ArchiveService:
+    """
+    Cold store for RESOLVED and TIMEOUT help requests.
+    """
+    
+    def __init__(self, archive_dir: str = None):
+        self.root = os.path.join(archive_dir or settings.archive_dir, 'help_requests')
+        self.index_path = os.path.join(self.root, 'index.tsv')
+        self._index: Optional[Dict[str, IndexRecord]] = None
+        self._lock = threading.Lock()
+    
+    # Index
+    def _load_index(self) -> Dict[str, IndexRecord]:
+        if self._index is not None:
+            return self._index
+        
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 4:
+                        index[parts[0]] = IndexRecord(parts[1], parts[2], parts[3])
+        self._index = index
+        return index
+    
+    def _day_path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.jsonl.gz")
+    
+    # Archiving
+    def archive_old_requests(
+        self,
+        retention_days: int = None,
+        dry_run: bool = False
+    ) -> dict:
+        """
+        Move finished requests older than the retention window to disk.
+        
+        Requests are written and flushed to the cold store before they
+        are deleted from Firebase, so an interrupted run loses nothing;
+        the next run skips what is already indexed and finishes deleting.
+        
+        Args:
+            retention_days: Keep finished requests this many days in the hot store
+            dry_run: Report what would move without writing or deleting
+        
+        Returns:
+            Counts of archived and deleted requests
+        """
+        if retention_days is None:
+            retention_days = settings.archive_retention_days
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        
+        candidates: List[HelpRequest] = []
+        for data in firebase_client.get_all_help_requests():
+            if data.get('status') not in FINISHED_STATUSES:
+                continue
+            request = HelpRequest.from_dict(data)
+            finished_at = request.resolved_at or request.updated_at
+            if finished_at < cutoff:
+                candidates.append(request)
+        
+        if dry_run:
+            return {'dry_run': True, 'archived': len(candidates), 'deleted': 0}
+        
+        with self._lock:
+            index = self._load_index()
+            new_requests = [r for r in candidates if r.request_id not in index]
+            
+            by_day: Dict[str, List[HelpRequest]] = {}
+            for request in new_requests:
+                by_day.setdefault(request.created_at.date().isoformat(), []).append(request)
+            
+            os.makedirs(self.root, exist_ok=True)
+            index_lines = []
+            for day, requests in by_day.items():
+                with gzip.open(self._day_path(day), 'at', encoding='utf-8') as f:
+                    for request in requests:
+                        f.write(json.dumps(request.to_dict(), separators=(',', ':')))
+                        f.write('\n')
+                for request in requests:
+                    record = IndexRecord(
+                        day,
+                        request.status,
+                        sanitize_phone_for_key(request.customer_phone)
+                    )
+                    index[request.request_id] = record
+                    index_lines.append(
+                        f"{request.request_id}\t{day}\t{record.status}\t{record.customer_key}\n"
+                    )
+            
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.writelines(index_lines)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        deleted = 0
+        for start in range(0, len(candidates), DELETE_BATCH_SIZE):
+            chunk = candidates[start:start + DELETE_BATCH_SIZE]
+            batch = {f"help_requests/{r.request_id}": None for r in chunk}
+            if firebase_client.commit_batch(batch):
+                deleted += len(chunk)
+        
+        logger.info(
+            f"Archived {len(new_requests)} help requests "
+            f"({deleted} removed from hot store)"
+        )
+        return {'dry_run': False, 'archived': len(new_requests), 'deleted': deleted}
+    
+    # Queries
+    def _read_day(self, day: str) -> Iterator[dict]:
+        path = self._day_path(day)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    
+    def get(self, request_id: str) -> Optional[HelpRequest]:
+        """Look up one archived request, reading only its day file."""
+        with self._lock:
+            record = self._load_index().get(request_id)
+        if record is None:
+            return None
+        
+        for data in self._read_day(record.day):
+            if data.get('request_id') == request_id:
+                return HelpRequest.from_dict(data)
+        return None
+    
+    def query(
+        self,
+        start: date,
+        end: date,
+        status: Optional[RequestStatus] = None,
+        customer_phone: Optional[str] = None,
+        limit: int = 100
+    ) -> List[HelpRequest]:
+        """
+        Archived requests created between `start` and `end` (inclusive).
+        
+        The index narrows the scan to days that hold a matching request,
+        and day files are streamed, so memory stays bounded by `limit`.
+        """
+        status_str = status.value if status else None
+        customer_key = sanitize_phone_for_key(customer_phone) if customer_phone else None
+        start_day, end_day = start.isoformat(), end.isoformat()
+        
+        with self._lock:
+            wanted: Dict[str, set] = {}
+            for request_id, record in self._load_index().items():
+                if not start_day <= record.day <= end_day:
+                    continue
+                if status_str and record.status != status_str:
+                    continue
+                if customer_key and record.customer_key != customer_key:
+                    continue
+                wanted.setdefault(record.day, set()).add(request_id)
+        
+        results = []
+        for day in sorted(wanted):
+            ids = wanted[day]
+            for data in self._read_day(day):
+                if data.get('request_id') in ids:
+                    results.append(HelpRequest.from_dict(data))
+                    if len(results) >= limit:
+                        return results
+        return results
+    
+    def get_stats(self) -> dict:
+        """Archive size by status."""
+        with self._lock:
+            index = self._load_index()
+            by_status: Dict[str, int] = {}
+            days = set()
+            for record in index.values():
+                by_status[record.status] = by_status.get(record.status, 0) + 1
+                days.add(record.day)
+        return {
+            'archived_requests': len(index),
+            'days': len(days),
+            'by_status': by_status
+        }
+
+
+# Global service instance
+archive_service = ArchiveService()
\ No newline at end of file
@@ -0,0 +1,327 @@
+"""
+Customer Service - Cached customer profiles and write-behind call tracking.
+
+Profiles are read through an LRU cache keyed on tenant and normalized
+phone number, and prefetched when a caller joins, so personalizing a
+turn never waits on the database. Calls update the cached profile at
+once and are written behind in batches; `total_calls` is written as a
+server-side increment, so agent processes sharing a customer add up
+their counts instead of overwriting each other.
+
+Each customer's help requests are also indexed under
+/customer_requests/{phone}, keyed "{created}_{request_id}" so the most
+recent ones come back from a single limited key query instead of a scan
+of /help_requests.
+"""
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from src.models.customer import Customer
+from src.models.help_request import HelpRequest
+from src.database.firebase_client import firebase_client
+from src.config.settings import settings
+from src.utils.tenant import get_tenant_id, tenant_scope
+from src.utils.validators import normalize_phone_number, sanitize_phone_for_key
+from src.utils.logger import logger
+
+CacheKey = Tuple[str, str]  # (tenant_id, sanitized phone)
+
+# Stored answers are cut to this length in the history index
+HISTORY_ANSWER_CHARS = 300
+
+
+def _increment(amount: int) -> dict:
+    """Firebase server value adding `amount` to the stored number."""
+    return {".sv": {"increment": amount}}
+
+
+def _history_callers(help_request: HelpRequest) -> List[Tuple[str, datetime, str]]:
+    """(phone, asked at, question) of everyone waiting on a request."""
+    callers = [(help_request.customer_phone, help_request.created_at, help_request.question)]
+    for attached in help_request.attached_customers.values():
+        callers.append((
+            attached.customer_phone,
+            attached.attached_at,
+            attached.question or help_request.question
+        ))
+    return callers
+
+
+def _history_path(phone: str, asked_at: datetime, request_id: str) -> Optional[str]:
+    normalized = normalize_phone_number(phone)
+    if not normalized:
+        return None
+    entry_key = f"{asked_at.strftime('%Y%m%d%H%M%S%f')}_{request_id}"
+    return f"customer_requests/{sanitize_phone_for_key(normalized)}/{entry_key}"
+
+
+class CustomerService:
+    """
+    Customer profiles with an in-memory LRU cache and batched writes.
+    """
+    
+    def __init__(self, cache_size: int = None, flush_interval: float = None, flush_batch: int = None):
+        self.cache_size = cache_size or settings.customer_cache_size
+        self.flush_interval = (
+            settings.customer_flush_interval if flush_interval is None else flush_interval
+        )
+        self.flush_batch = flush_batch or settings.customer_flush_batch
+        
+        # Known customers, and phones known to have no profile (None)
+        self._cache: OrderedDict = OrderedDict()
+        # Recent help request summaries, newest first
+        self._history: OrderedDict = OrderedDict()
+        # Calls not yet written: key -> {'calls', 'profile', 'new'}
+        self._pending: Dict[CacheKey, dict] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        
+        self.stats = {'hits': 0, 'misses': 0, 'flushes': 0, 'written': 0}
+    
+    @staticmethod
+    def _key(phone: Optional[str]) -> Tuple[Optional[str], Optional[CacheKey]]:
+        normalized = normalize_phone_number(phone)
+        if not normalized:
+            return None, None
+        return normalized, (get_tenant_id(), sanitize_phone_for_key(normalized))
+    
+    def _put_locked(self, key: CacheKey, customer: Optional[Customer]):
+        self._cache[key] = customer
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    # Profiles
+    def get_profile(self, phone: Optional[str]) -> Optional[Customer]:
+        """Profile of a caller, from the cache when possible."""
+        normalized, key = self._key(phone)
+        if key is None:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._cache[key]
+            self.stats['misses'] += 1
+        return self._load(normalized, key)
+    
+    def prefetch(self, phone: Optional[str]) -> Optional[Customer]:
+        """
+        (Re)load a caller's profile and request history into the cache.
+        
+        Called when a participant joins, off the conversation path, so
+        later turns hit the cache and see changes made by other
+        processes since the last call.
+        """
+        normalized, key = self._key(phone)
+        if key is None:
+            return None
+        self._load_history(normalized, key)
+        return self._load(normalized, key)
+    
+    def _load(self, normalized: str, key: CacheKey) -> Optional[Customer]:
+        data = firebase_client.get_customer_info(normalized)
+        customer = Customer.from_dict(data) if data else None
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                # Calls counted here but not written yet
+                base = customer or pending['profile']
+                customer = base.model_copy(update={
+                    'total_calls': (customer.total_calls if customer else 0) + pending['calls'],
+                    'last_call_at': pending['profile'].last_call_at,
+                    'name': pending['profile'].name or base.name
+                })
+            self._put_locked(key, customer)
+        return customer
+    
+    # Request history
+    def history_entry_updates(
+        self,
+        help_request: HelpRequest,
+        phone: Optional[str] = None
+    ) -> Dict[str, dict]:
+        """
+        Index writes for a new request, or for one more caller (`phone`)
+        attached to it; include them in the request's batch.
+        """
+        updates = {}
+        for caller_phone, asked_at, question in _history_callers(help_request):
+            if phone is not None and caller_phone != phone:
+                continue
+            path = _history_path(caller_phone, asked_at, help_request.request_id)
+            if path:
+                updates[path] = {
+                    'request_id': help_request.request_id,
+                    'question': question,
+                    'status': help_request.status,
+                    'created_at': asked_at.isoformat()
+                }
+        return updates
+    
+    def history_status_updates(self, help_request: HelpRequest) -> Dict[str, Any]:
+        """Index writes recording a request's new status (and answer) for every caller."""
+        updates = {}
+        for caller_phone, asked_at, _ in _history_callers(help_request):
+            path = _history_path(caller_phone, asked_at, help_request.request_id)
+            if path:
+                updates[f"{path}/status"] = help_request.status
+                if help_request.supervisor_answer:
+                    updates[f"{path}/answer"] = help_request.supervisor_answer[:HISTORY_ANSWER_CHARS]
+        return updates
+    
+    def forget_history(self, help_request: HelpRequest):
+        """Drop cached histories of a request's callers after it changed."""
+        with self._lock:
+            for caller_phone, _, _ in _history_callers(help_request):
+                _, key = self._key(caller_phone)
+                if key is not None:
+                    self._history.pop(key, None)
+    
+    def get_history(self, phone: Optional[str]) -> List[dict]:
+        """A caller's most recent help requests, newest first."""
+        normalized, key = self._key(phone)
+        if key is None:
+            return []
+        with self._lock:
+            if key in self._history:
+                self._history.move_to_end(key)
+                return self._history[key]
+        return self._load_history(normalized, key)
+    
+    def _load_history(self, normalized: str, key: CacheKey) -> List[dict]:
+        rows = firebase_client.get_customer_requests(normalized, settings.customer_history_items)
+        history = [rows[entry_key] for entry_key in sorted(rows, reverse=True)]
+        with self._lock:
+            self._history[key] = history
+            self._history.move_to_end(key)
+            while len(self._history) > self.cache_size:
+                self._history.popitem(last=False)
+        return history
+    
+    # Call tracking
+    def record_call(
+        self,
+        phone: Optional[str],
+        name: Optional[str] = None,
+        at: Optional[datetime] = None
+    ) -> Optional[Customer]:
+        """
+        Count a call from `phone`.
+        
+        The cached profile is updated immediately; the database write
+        happens within `flush_interval` seconds, or sooner once
+        `flush_batch` customers have changed.
+        
+        Returns:
+            The updated profile, or None if the phone number is invalid
+        """
+        normalized, key = self._key(phone)
+        if key is None:
+            return None
+        at = at or datetime.utcnow()
+        current = self.get_profile(normalized)
+        
+        with self._lock:
+            current = self._cache.get(key, current)
+            is_new = current is None
+            if is_new:
+                current = Customer(phone=normalized, created_at=at)
+            updated = current.model_copy(update={
+                'total_calls': current.total_calls + 1,
+                'last_call_at': at,
+                'updated_at': at,
+                'name': name or current.name
+            })
+            self._put_locked(key, updated)
+            
+            pending = self._pending.setdefault(key, {'calls': 0, 'new': False})
+            pending['calls'] += 1
+            pending['profile'] = updated
+            pending['new'] = pending['new'] or is_new
+            
+            flush_now = self.flush_interval <= 0 or len(self._pending) >= self.flush_batch
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if flush_now:
+            self.flush()
+        return updated
+    
+    def flush(self) -> int:
+        """
+        Write pending call counts now, one batch per tenant.
+        
+        Returns:
+            Number of customers written; failed batches are retried on
+            the next flush
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        
+        by_tenant: Dict[str, Dict[str, dict]] = {}
+        for (tenant_id, phone_key), change in pending.items():
+            by_tenant.setdefault(tenant_id, {})[phone_key] = change
+        
+        written = 0
+        for tenant_id, changes in by_tenant.items():
+            updates = {}
+            for phone_key, change in changes.items():
+                profile = change['profile']
+                path = f"customers/{phone_key}"
+                updates[f"{path}/phone"] = profile.phone
+                updates[f"{path}/total_calls"] = _increment(change['calls'])
+                updates[f"{path}/last_call_at"] = profile.last_call_at.isoformat()
+                updates[f"{path}/updated_at"] = profile.updated_at.isoformat()
+                if profile.name:
+                    updates[f"{path}/name"] = profile.name
+                if change['new']:
+                    updates[f"{path}/created_at"] = profile.created_at.isoformat()
+            
+            with tenant_scope(tenant_id):
+                success = firebase_client.commit_batch(updates)
+            if success:
+                written += len(changes)
+            else:
+                logger.warning(f"Failed to write {len(changes)} customer profiles; will retry")
+                self._requeue({(tenant_id, key): change for key, change in changes.items()})
+        
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['written'] += written
+        return written
+    
+    def _requeue(self, changes: Dict[CacheKey, dict]):
+        """Put unwritten changes back, merged with any newer ones."""
+        with self._lock:
+            for key, change in changes.items():
+                newer = self._pending.get(key)
+                if newer:
+                    newer['calls'] += change['calls']
+                    newer['new'] = newer['new'] or change['new']
+                else:
+                    self._pending[key] = change
+            if self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def clear(self):
+        """Drop cached profiles and histories (pending writes are kept)."""
+        with self._lock:
+            self._cache.clear()
+            self._history.clear()
+
+
+# Global service instance
+customer_service = CustomerService()
+atexit.register(customer_service.flush)
\ No newline at end of file
@@ -1,27 +1,65 @@
 """
 Help Request Service - Business logic for managing help requests.
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from src.models.help_request import (
-    HelpRequest, HelpRequestCreate, HelpRequestResolve, RequestStatus
+    HelpRequest, HelpRequestCreate, HelpRequestResolve, RequestStatus,
+    AttachedCustomer
 )
+from src.models.notification import NotificationJob
 from src.database.firebase_client import firebase_client
-from src.services.notification_service import notification_service
+from src.services.notification_outbox import (
+    notification_outbox, notification_delivery_pool
+)
 from src.services.knowledge_service import knowledge_service
+from src.services.customer_service import customer_service
+from src.services.question_index import PendingQuestionIndex
+from src.services.analytics_store import RequestAnalyticsStore
+from src.services.tenant_registry import tenant_registry
+from src.services.work_queue import work_queue, ClaimOutcome
+from src.services.analytics_rollups import analytics_rollups
+from src.services.resolution_events import resolution_events
 from src.config.settings import settings
+from src.utils.validators import normalize_phone_number, sanitize_key, sanitize_phone_for_key
+from src.utils.exceptions import RequestClaimedError
 from src.utils.logger import logger
 
+# How often the pending question index is reloaded to pick up requests
+# created or resolved by other processes
+PENDING_INDEX_REFRESH_SECONDS = 60
+
+# Age a resolution must reach before the outbox poller queues its missing
+# customer notifications (the resolving process may still be writing them)
+NOTIFICATION_STAGING_GRACE = 60
+
+
+def _customer_key(phone: str) -> str:
+    """Key of a caller under attached_customers: one per number, however it was dialed."""
+    normalized = normalize_phone_number(phone)
+    return sanitize_phone_for_key(normalized) if normalized else sanitize_key(phone)
+
 
 class HelpRequestService:
     """
     Manages the lifecycle of help requests.
+    
+    Requests belong to the current tenant; the pending question and
+    priority indexes, analytics store and archive used are that tenant's.
     """
     
     def create_request(self, request_data: HelpRequestCreate) -> HelpRequest:
         """
         Create a new help request and notify supervisor.
+        
+        If another caller asked the same question recently and it is
+        still pending, this caller is attached to that request instead
+        and the supervisor is not pinged again.
         """
+        duplicate = self._find_duplicate(request_data.question)
+        if duplicate:
+            return self._attach_customer(duplicate, request_data)
+        
         # Calculate timeout
         timeout_at = datetime.utcnow() + timedelta(
             seconds=settings.help_request_timeout
@@ -33,31 +71,185 @@ class HelpRequestService:
             customer_name=request_data.customer_name,
             question=request_data.question,
             context=request_data.context,
+            urgent=request_data.urgent,
+            category=request_data.category,
+            customer_value=self._customer_value(request_data.customer_phone),
             timeout_at=timeout_at
         )
+        work_queue.assign(help_request)
         
-        # Save to database
-        success = firebase_client.create_help_request(
-            help_request.request_id,
-            help_request.to_dict()
-        )
+        # Save request, customer history entry and supervisor
+        # notification in one batch
+        supervisor_job = notification_outbox.supervisor_job(help_request)
+        batch = {f"help_requests/{help_request.request_id}": help_request.to_dict()}
+        batch.update(customer_service.history_entry_updates(help_request))
+        batch.update(notification_outbox.stage(supervisor_job))
+        
+        success = firebase_client.commit_batch(batch)
         
         if not success:
             logger.error("Failed to save help request to database")
             raise Exception("Database error")
+        customer_service.forget_history(help_request)
         
         # Notify supervisor
-        notification_service.notify_supervisor(help_request)
+        notification_delivery_pool.dispatch(supervisor_job)
+        
+        tenant = tenant_registry.get()
+        tenant.pending_index.add(
+            help_request.request_id,
+            help_request.question,
+            help_request.created_at
+        )
+        tenant.priority_index.add(help_request)
+        tenant.analytics.record(help_request)
+        analytics_rollups.record_escalation(help_request)
         
         logger.info(f"Help request created: {help_request.request_id}")
         return help_request
     
+    @staticmethod
+    def _customer_value(phone: str) -> int:
+        """How many times the customer has called (0 if unknown)."""
+        customer = customer_service.get_profile(phone)
+        return customer.total_calls if customer else 0
+    
+    def _find_duplicate(self, question: str) -> Optional[HelpRequest]:
+        """Find a recent pending request asking the same question."""
+        if settings.duplicate_escalation_window <= 0:
+            return None
+        
+        pending_index = self._refresh_pending_index()
+        
+        matches = pending_index.find_matches(
+            question,
+            settings.duplicate_escalation_window
+        )
+        for score, request_id in matches:
+            # Another process may have resolved it since we indexed it
+            existing = self.get_request(request_id)
+            if existing and existing.status == RequestStatus.PENDING:
+                logger.info(
+                    f"Question matches pending request {request_id} "
+                    f"(similarity {score:.2f})"
+                )
+                return existing
+            pending_index.remove(request_id)
+        
+        return None
+    
+    def _refresh_pending_index(self) -> PendingQuestionIndex:
+        """
+        The tenant's pending question index, reloaded if stale.
+        
+        The priority index is rebuilt from the same read.
+        """
+        tenant = tenant_registry.get()
+        now = datetime.utcnow()
+        loaded_at = tenant.pending_loaded_at
+        if loaded_at and (now - loaded_at).total_seconds() < PENDING_INDEX_REFRESH_SECONDS:
+            return tenant.pending_index
+        
+        tenant.pending_index.clear()
+        tenant.priority_index.clear()
+        for request in self.get_all_requests(RequestStatus.PENDING):
+            tenant.pending_index.add(
+                request.request_id,
+                request.question,
+                request.created_at
+            )
+            tenant.priority_index.add(request)
+        tenant.pending_loaded_at = now
+        return tenant.pending_index
+    
+    def _attach_customer(
+        self,
+        help_request: HelpRequest,
+        request_data: HelpRequestCreate
+    ) -> HelpRequest:
+        """Add a caller to an existing pending request."""
+        phone = request_data.customer_phone
+        key = _customer_key(phone)
+        
+        if key == _customer_key(help_request.customer_phone) or key in help_request.attached_customers:
+            logger.info(f"{phone} is already waiting on request {help_request.request_id}")
+            return help_request
+        
+        now = datetime.utcnow()
+        attached = AttachedCustomer(
+            customer_phone=phone,
+            customer_name=request_data.customer_name,
+            question=request_data.question,
+            attached_at=now
+        )
+        
+        help_request.attached_customers[key] = attached
+        
+        path = f"help_requests/{help_request.request_id}"
+        batch = {
+            f"{path}/attached_customers/{key}": attached.model_dump(mode='json'),
+            f"{path}/updated_at": now.isoformat()
+        }
+        batch.update(customer_service.history_entry_updates(help_request, phone))
+        success = firebase_client.commit_batch(batch)
+        
+        if not success:
+            del help_request.attached_customers[key]
+            logger.error("Failed to attach customer to help request")
+            raise Exception("Database error")
+        
+        help_request.updated_at = now
+        customer_service.forget_history(help_request)
+        tenant_registry.get().priority_index.add(help_request)
+        
+        logger.info(f"Attached {phone} to help request {help_request.request_id}")
+        return help_request
+    
+    def add_customer_phone(self, request_id: str, phone: str, question: str) -> Optional[HelpRequest]:
+        """
+        Give a caller who escalated without a known number one to be
+        texted the answer at.
+        
+        Fills in the request's own number if it has none; a caller who
+        was attached to someone else's request is attached again under
+        the new number.
+        
+        Returns:
+            The updated request, or None if it is no longer pending
+        """
+        help_request = self.get_request(request_id)
+        if not help_request or help_request.status != RequestStatus.PENDING:
+            return None
+        if normalize_phone_number(help_request.customer_phone):
+            return self._attach_customer(
+                help_request,
+                HelpRequestCreate(customer_phone=phone, question=question)
+            )
+        
+        now = datetime.utcnow()
+        updated = help_request.model_copy(update={'customer_phone': phone, 'updated_at': now})
+        path = f"help_requests/{request_id}"
+        batch = {
+            f"{path}/customer_phone": phone,
+            f"{path}/updated_at": now.isoformat()
+        }
+        batch.update(customer_service.history_entry_updates(updated, phone))
+        
+        if not firebase_client.commit_batch(batch):
+            logger.error("Failed to add customer phone to help request")
+            raise Exception("Database error")
+        
+        customer_service.forget_history(updated)
+        tenant_registry.get().priority_index.add(updated)
+        logger.info(f"Added customer phone to help request {request_id}")
+        return updated
+    
     def get_request(self, request_id: str) -> Optional[HelpRequest]:
-        """Get a specific help request."""
+        """Get a specific help request, falling back to the archive."""
         data = firebase_client.get_help_request(request_id)
         if data:
             return HelpRequest.from_dict(data)
-        return None
+        return tenant_registry.get().archive.get(request_id)
     
     def get_all_requests(
         self, 
@@ -67,13 +259,24 @@ class HelpRequestService:
         status_str = status.value if status else None
         data_list = firebase_client.get_all_help_requests(status_str)
         
-        requests = [HelpRequest.from_dict(data) for data in data_list]
+        requests = HelpRequest.from_dict_batch(data_list)
         
         # Sort by creation time (newest first)
         requests.sort(key=lambda x: x.created_at, reverse=True)
         
         return requests
     
+    def get_priority_queue(self, limit: int = 20) -> List[Tuple[datetime, HelpRequest]]:
+        """
+        The `limit` pending requests to answer first, with their
+        effective deadlines (earliest first).
+        
+        Ordered by time left before `timeout_at`, pulled forward for
+        repeat customers and urgent requests.
+        """
+        self._refresh_pending_index()
+        return tenant_registry.get().priority_index.top(limit)
+    
     def resolve_request(
         self, 
         request_id: str, 
@@ -83,9 +286,20 @@ class HelpRequestService:
         Resolve a help request with supervisor's answer.
         
         This triggers:
-        1. Update request status to RESOLVED
-        2. Notify customer with the answer
-        3. Add answer to knowledge base
+        1. Update request status to RESOLVED, in a transaction so only
+           one supervisor can resolve it; the same write flags it
+           `notification_pending`
+        2. Queue customer notifications for the original caller and every
+           attached caller, clearing the flag in the same batch (if this
+           write fails, the outbox poller queues them later)
+        3. Publish the answer to agents still on a call with those callers
+        4. Add answer to knowledge base (once, however many callers)
+        
+        `customer_notified` is set by the delivery worker once the
+        notification actually goes out.
+        
+        Raises:
+            RequestClaimedError: Another supervisor holds the request's lease
         """
         # Get existing request
         help_request = self.get_request(request_id)
@@ -104,35 +318,38 @@ class HelpRequestService:
             'supervisor_answer': resolution.supervisor_answer,
             'supervisor_id': resolution.supervisor_id,
             'resolved_at': now.isoformat(),
-            'updated_at': now.isoformat()
+            'updated_at': now.isoformat(),
+            'notification_pending': True
         }
         
-        success = firebase_client.update_help_request(request_id, updates)
-        if not success:
-            logger.error("Failed to update help request")
+        outcome, data = work_queue.complete(request_id, resolution.supervisor_id, updates)
+        if outcome == ClaimOutcome.HELD:
+            raise RequestClaimedError(
+                f"Request {request_id} is claimed by {data.get('claimed_by')}"
+            )
+        if outcome == ClaimOutcome.NOT_FOUND:
+            logger.error(f"Request not found: {request_id}")
             return None
+        help_request = HelpRequest.from_dict(data)
+        if outcome != ClaimOutcome.OK:
+            # Someone else resolved or timed it out since we read it
+            logger.warning(f"Request {request_id} is not pending")
+            return help_request
         
-        # Update local object
-        help_request.status = RequestStatus.RESOLVED
-        help_request.supervisor_answer = resolution.supervisor_answer
-        help_request.supervisor_id = resolution.supervisor_id
-        help_request.resolved_at = now
-        help_request.updated_at = now
+        customer_jobs = self._stage_customer_notifications(help_request)
         
-        # Notify customer
-        notification_success = notification_service.notify_customer(
-            help_request.customer_phone,
-            help_request.question,
-            resolution.supervisor_answer
-        )
+        work_queue.finished(help_request)
+        customer_service.forget_history(help_request)
+        tenant = tenant_registry.get()
+        tenant.pending_index.remove(request_id)
+        tenant.priority_index.remove(request_id)
+        tenant.analytics.record(help_request)
+        analytics_rollups.record_resolution(help_request)
         
-        if notification_success:
-            firebase_client.update_help_request(request_id, {
-                'customer_notified': True,
-                'notification_sent_at': now.isoformat()
-            })
-            help_request.customer_notified = True
-            help_request.notification_sent_at = now
+        # Tell agents still on the line with a caller, then text everyone
+        resolution_events.publish(request_id, RequestStatus.RESOLVED, help_request.supervisor_answer)
+        for job in customer_jobs:
+            notification_delivery_pool.dispatch(job)
         
         # Add to knowledge base
         knowledge_service.add_from_help_request(help_request)
@@ -140,20 +357,117 @@ class HelpRequestService:
         logger.info(f"Request resolved: {request_id}")
         return help_request
     
+    def _stage_customer_notifications(self, help_request: HelpRequest) -> List[NotificationJob]:
+        """
+        Write a resolved request's customer notifications to the outbox,
+        with its history status, clearing `notification_pending`.
+        
+        Returns:
+            The staged jobs, or [] if the write failed (the request
+            stays flagged for stage_pending_notifications)
+        """
+        customer_jobs = [notification_outbox.customer_job(help_request)]
+        for attached in help_request.attached_customers.values():
+            customer_jobs.append(notification_outbox.customer_job(
+                help_request,
+                attached.customer_phone
+            ))
+        
+        batch = customer_service.history_status_updates(help_request)
+        for job in customer_jobs:
+            batch.update(notification_outbox.stage(job))
+        batch[f"help_requests/{help_request.request_id}/notification_pending"] = False
+        
+        if not firebase_client.commit_batch(batch):
+            logger.error(
+                f"Failed to queue customer notifications for {help_request.request_id}; "
+                f"the outbox poller will retry"
+            )
+            return []
+        help_request.notification_pending = False
+        return customer_jobs
+    
+    def stage_pending_notifications(self, grace_seconds: float = NOTIFICATION_STAGING_GRACE) -> int:
+        """
+        Queue the customer notifications of requests that were resolved
+        but never got them (the second write failed or the process died).
+        
+        Requests resolved less than `grace_seconds` ago are left to the
+        process resolving them, which may still be writing the batch.
+        
+        Returns:
+            Number of requests whose notifications were queued
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        staged = 0
+        for help_request in HelpRequest.from_dict_batch(
+            firebase_client.get_notification_pending_requests()
+        ):
+            if help_request.status != RequestStatus.RESOLVED:
+                continue
+            if help_request.resolved_at and help_request.resolved_at > cutoff:
+                continue
+            customer_jobs = self._stage_customer_notifications(help_request)
+            for job in customer_jobs:
+                notification_delivery_pool.dispatch(job)
+            staged += bool(customer_jobs)
+        
+        if staged:
+            logger.info(f"Queued missing customer notifications for {staged} requests")
+        return staged
+    
     def mark_timeout(self, request_id: str) -> bool:
-        """Mark a request as timed out."""
+        """
+        Mark a request as timed out, in its callers' histories too.
+        
+        Compare-and-set: only a request that is still pending (and not
+        claimed by a supervisor working on it) is changed, so a timeout
+        racing a resolution never overwrites the answer.
+        """
         now = datetime.utcnow()
         updates = {
             'status': RequestStatus.TIMEOUT.value,
             'updated_at': now.isoformat()
         }
         
-        success = firebase_client.update_help_request(request_id, updates)
+        outcome, data = work_queue.complete(request_id, None, updates)
+        if outcome != ClaimOutcome.OK:
+            logger.info(f"Request {request_id} not timed out ({outcome.value})")
+            return False
+        help_request = HelpRequest.from_dict(data)
         
-        if success:
-            logger.info(f"Request timed out: {request_id}")
+        history = customer_service.history_status_updates(help_request)
+        if history and not firebase_client.commit_batch(history):
+            logger.warning(f"Failed to record timeout of {request_id} in customer history")
         
-        return success
+        work_queue.finished(help_request)
+        customer_service.forget_history(help_request)
+        tenant = tenant_registry.get()
+        tenant.pending_index.remove(request_id)
+        tenant.priority_index.remove(request_id)
+        tenant.analytics.set_status(request_id, RequestStatus.TIMEOUT)
+        analytics_rollups.record_timeout(now)
+        resolution_events.publish(request_id, RequestStatus.TIMEOUT)
+        logger.info(f"Request timed out: {request_id}")
+        
+        return True
+    
+    def get_analytics(self) -> RequestAnalyticsStore:
+        """
+        The tenant's columnar analytics store, reloaded from the database
+        when stale.
+        
+        Transitions made by this process are recorded immediately; the
+        periodic reload picks up those made elsewhere (e.g. the agent).
+        """
+        tenant = tenant_registry.get()
+        now = datetime.utcnow()
+        loaded_at = tenant.analytics_loaded_at
+        if not loaded_at or (now - loaded_at).total_seconds() >= settings.analytics_refresh_interval:
+            tenant.analytics.load(firebase_client.get_all_help_requests())
+            tenant.analytics_loaded_at = now
+            tenant_registry.enforce_quota(keep=tenant.tenant_id)
+        return tenant.analytics
     
     def check_and_timeout_old_requests(self) -> int:
         """
@@ -0,0 +1,160 @@
+"""
+Idempotency Store - Replays responses for repeated Idempotency-Key requests.
+
+A client that retries a POST (agent retries, double-clicked buttons)
+sends the same `Idempotency-Key` header each time. The first request
+runs; its response is kept for `idempotency_ttl_seconds` and returned
+for every replay without touching the database, the notification
+outbox or the LLM again. Concurrent duplicates wait for the first one
+instead of running alongside it.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from src.config.settings import settings
+from src.utils.exceptions import IdempotencyKeyReusedError, ValidationError
+from src.utils.single_flight import AsyncSingleFlight
+from src.utils.tenant import get_tenant_id
+from src.utils.logger import logger
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse(NamedTuple):
+    """A completed response kept for replays."""
+    expires_at: float
+    fingerprint: str
+    status_code: int
+    body: Any
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request payload."""
+    return hashlib.sha256(
+        orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded in-memory TTL map of idempotency keys to responses.
+    
+    Keys are scoped per tenant and per endpoint. Only successful
+    responses are stored, so a request that failed can be retried with
+    the same key.
+    """
+    
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl or settings.idempotency_ttl_seconds
+        self.max_entries = max_entries or settings.idempotency_max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._flight = AsyncSingleFlight()
+        self._lock = threading.Lock()
+        self.stats = {'executed': 0, 'replayed': 0, 'rejected': 0}
+    
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                return None
+            if stored.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return stored
+    
+    def put(self, key: str, stored: StoredResponse):
+        with self._lock:
+            if key in self._entries:
+                return  # First response wins
+            self._entries[key] = stored
+            # Entries are added in expiry order, so the oldest go first
+            now = time.monotonic()
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or next(iter(self._entries.values())).expires_at <= now
+            ):
+                self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    async def run(
+        self,
+        idempotency_key: Optional[str],
+        scope: str,
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int = 200
+    ) -> ORJSONResponse:
+        """
+        Run `handler` once per idempotency key and return its JSON response.
+        
+        Args:
+            idempotency_key: Client-supplied key; None runs the handler as usual
+            scope: Endpoint the key belongs to, e.g. "resolve:{request_id}"
+            payload: Request body, to detect a key reused for another request
+            handler: Produces the response body
+            status_code: Status of a successful response
+        
+        Raises:
+            ValidationError: Key is empty or too long
+            IdempotencyKeyReusedError: Key was used with a different payload
+        """
+        if idempotency_key is None:
+            body = jsonable_encoder(await handler())
+            return ORJSONResponse(body, status_code=status_code)
+        
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise ValidationError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        
+        key = f"{get_tenant_id()}:{scope}:{idempotency_key}"
+        request_fingerprint = fingerprint(payload)
+        
+        stored = self.get(key)
+        if stored is None:
+            async def execute() -> StoredResponse:
+                body = jsonable_encoder(await handler())
+                result = StoredResponse(
+                    time.monotonic() + self.ttl, request_fingerprint, status_code, body
+                )
+                self.put(key, result)
+                self._count('executed')
+                return result
+            
+            result = await self._flight.do(f"{key}:{request_fingerprint}", execute)
+            stored = self.get(key) or result
+            if stored is result:
+                return ORJSONResponse(stored.body, status_code=stored.status_code)
+        
+        if stored.fingerprint != request_fingerprint:
+            self._count('rejected')
+            raise IdempotencyKeyReusedError(
+                "Idempotency-Key was already used for a different request"
+            )
+        
+        self._count('replayed')
+        logger.info(f"Replayed response for idempotency key {idempotency_key} ({scope})")
+        return ORJSONResponse(
+            stored.body,
+            status_code=stored.status_code,
+            headers={REPLAY_HEADER: "true"}
+        )
+
+
+# Global store instance
+idempotency_store = IdempotencyStore()
\ No newline at end of file
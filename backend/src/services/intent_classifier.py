@@ -0,0 +1,200 @@
+"""
+Intent Classifier - Cheap local routing of customer turns.
+
+A multinomial logistic regression over hashed word and character
+n-grams. It is
+trained offline (scripts/train_intent_classifier.py), saved as JSON and
+predicts in well under a millisecond on CPU, so every turn can be
+classified before deciding whether the LLM is needed at all.
+"""
+import json
+import math
+import os
+import random
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.config.settings import settings
+from src.utils.text import normalize_text, QUESTION_WORDS
+from src.utils.logger import logger
+
+# Turns answered with a canned reply, no knowledge lookup or LLM
+CONVERSATIONAL_INTENTS = ("greeting", "thanks", "goodbye", "small_talk")
+
+# Words a conversational turn may contain besides stopwords (as stemmed by
+# question_tokens), question words included for "how are you?"; any other
+# word makes it a question worth answering
+SMALL_TALK_WORDS = frozenset("""
+afternoon appreciate awesome bye cheer day doing evening fine good goodbye
+great lot morning much nice ok okay perfect thank thanks wonderful
+""".split()) | QUESTION_WORDS
+
+# Label for anything the classifier should not route
+OTHER_INTENT = "other"
+
+NGRAM_SIZES = (3, 4, 5)
+DEFAULT_FEATURES = 2 ** 18
+
+
+def extract_features(text: str, n_features: int = DEFAULT_FEATURES) -> List[int]:
+    """
+    Hashed features of a normalized utterance.
+    
+    Words and word pairs carry phrasing ("thank you", "how much");
+    character n-grams within each word cope with typos and inflections.
+    
+    Args:
+        text: Raw utterance
+        n_features: Hash space size
+    
+    Returns:
+        Distinct feature indices
+    """
+    words = normalize_text(text).split()
+    grams = {f"w:{word}" for word in words}
+    grams.update(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f" {word} "
+        grams.update(
+            padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)
+        )
+    return [zlib.crc32(gram.encode()) % n_features for gram in grams]
+
+
+class IntentClassifier:
+    """
+    Linear softmax classifier over sparse hashed features.
+    
+    Weights are stored sparsely ({feature: [weight per label]}), so the
+    model stays small however large the hash space is.
+    """
+    
+    def __init__(
+        self,
+        labels: Sequence[str],
+        n_features: int = DEFAULT_FEATURES,
+        weights: Optional[Dict[int, List[float]]] = None,
+        bias: Optional[List[float]] = None
+    ):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights: Dict[int, List[float]] = weights or {}
+        self.bias = bias or [0.0] * len(self.labels)
+    
+    def _scores(self, features: List[int]) -> List[float]:
+        scores = list(self.bias)
+        for feature in features:
+            row = self.weights.get(feature)
+            if row is not None:
+                for i, weight in enumerate(row):
+                    scores[i] += weight
+        return scores
+    
+    @staticmethod
+    def _softmax(scores: List[float]) -> List[float]:
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+    
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probability of each intent for an utterance."""
+        probs = self._softmax(self._scores(extract_features(text, self.n_features)))
+        return dict(zip(self.labels, probs))
+    
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Most likely intent of an utterance.
+        
+        Returns:
+            (intent, probability)
+        """
+        probs = self._softmax(self._scores(extract_features(text, self.n_features)))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.labels[best], probs[best]
+    
+    # Training
+    def fit(
+        self,
+        examples: List[Tuple[str, str]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-2,
+        seed: int = 0
+    ) -> 'IntentClassifier':
+        """
+        Train with stochastic gradient descent on (text, intent) pairs.
+        
+        Labels missing from `self.labels` are added.
+        """
+        for _, label in examples:
+            if label not in self.labels:
+                self.labels.append(label)
+                self.bias.append(0.0)
+                for row in self.weights.values():
+                    row.append(0.0)
+        
+        k = len(self.labels)
+        index = {label: i for i, label in enumerate(self.labels)}
+        data = [(extract_features(text, self.n_features), index[label]) for text, label in examples]
+        rng = random.Random(seed)
+        
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, target in data:
+                probs = self._softmax(self._scores(features))
+                grads = [p - (1.0 if i == target else 0.0) for i, p in enumerate(probs)]
+                for i in range(k):
+                    self.bias[i] -= rate * grads[i]
+                for feature in features:
+                    row = self.weights.setdefault(feature, [0.0] * k)
+                    for i in range(k):
+                        row[i] -= rate * (grads[i] + l2 * row[i])
+        
+        return self
+    
+    # Persistence
+    def save(self, path: str):
+        """Write the model as JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'labels': self.labels,
+                'n_features': self.n_features,
+                'bias': self.bias,
+                'weights': {
+                    str(feature): [round(w, 5) for w in row]
+                    for feature, row in self.weights.items()
+                }
+            }, f, separators=(',', ':'))
+    
+    @classmethod
+    def load(cls, path: str) -> 'IntentClassifier':
+        """Read a model written by save()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            labels=data['labels'],
+            n_features=data['n_features'],
+            weights={int(feature): row for feature, row in data['weights'].items()},
+            bias=data['bias']
+        )
+
+
+def load_intent_classifier(path: str = None) -> Optional[IntentClassifier]:
+    """Load the trained model, or None when it has not been trained yet."""
+    path = path or settings.intent_model_path
+    if not os.path.exists(path):
+        logger.info(f"No intent model at {path}; turns will not be pre-routed")
+        return None
+    try:
+        return IntentClassifier.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Failed to load intent model: {str(e)}")
+        return None
+
+
+# Global classifier (None until scripts/train_intent_classifier.py has run)
+intent_classifier = load_intent_classifier()
\ No newline at end of file
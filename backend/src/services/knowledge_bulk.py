@@ -0,0 +1,347 @@
+"""
+Knowledge Bulk - Streaming import and export of knowledge entries.
+
+Imports read JSONL or CSV row by row and write in chunks, one multi-path
+Firebase update per chunk instead of one write per entry. Keywords
+missing from a chunk are extracted in parallel (capped by
+`knowledge_import_concurrency`). After each committed chunk the line
+reached is saved to an optional checkpoint file, so an interrupted import
+resumes where it stopped.
+
+Rows asking a question already in the knowledge base (or earlier in the
+same file) update that entry instead of adding a duplicate, exactly like
+`knowledge_service.add_entry`.
+
+CSV columns: question, answer, category, keywords (separated by ";").
+"""
+import codecs
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from src.models.knowledge_base import KnowledgeEntry, KnowledgeCreate
+from src.database.firebase_client import firebase_client
+from src.services.ai_service import ai_service
+from src.services.knowledge_service import merge_entry, SAME_QUESTION_SCORE
+from src.services.question_index import QuestionIndex
+from src.services.tenant_registry import tenant_registry
+from src.config.settings import settings
+from src.utils.logger import logger
+
+FORMATS = ('jsonl', 'csv')
+
+CSV_FIELDS = ('entry_id', 'question', 'answer', 'category', 'keywords', 'confidence', 'times_used')
+
+KEYWORD_SEPARATOR = ';'
+
+# Invalid rows listed in a report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+
+def format_from_path(path: str) -> str:
+    """Bulk format implied by a file name."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def decode_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    UTF-8 lines (newlines kept) of a body arriving in chunks.
+    
+    Only the current line is held in memory. A byte order mark is
+    dropped; invalid UTF-8 raises UnicodeDecodeError when reached.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Stream raw rows from a JSONL or CSV file.
+    
+    Yields:
+        (line_number, row); rows that cannot be parsed come through as
+        {'_error': message} so they are reported rather than aborting
+    """
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                row = {'_error': f"Invalid JSON: {e.msg}"}
+            if not isinstance(row, dict):
+                row = {'_error': "Expected a JSON object"}
+            yield line_number, row
+    elif fmt == 'csv':
+        # Line 1 is the header
+        for line_number, row in enumerate(csv.DictReader(stream), 2):
+            keywords = row.get('keywords') or ''
+            row['keywords'] = [k.strip() for k in keywords.split(KEYWORD_SEPARATOR) if k.strip()]
+            yield line_number, {
+                k: v for k, v in row.items() if k is not None and v not in (None, '')
+            }
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def parse_row(row: dict) -> KnowledgeCreate:
+    """Validate one raw row (raises ValueError)."""
+    if '_error' in row:
+        raise ValueError(row['_error'])
+    try:
+        entry_data = KnowledgeCreate(**row)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        ))
+    if not entry_data.question.strip() or not entry_data.answer.strip():
+        raise ValueError("question and answer must not be empty")
+    return entry_data
+
+
+class KnowledgeImporter:
+    """
+    Chunked, resumable bulk import into the knowledge base.
+    """
+    
+    def __init__(self, chunk_size: int = None, concurrency: int = None):
+        self.chunk_size = chunk_size or settings.knowledge_import_chunk_size
+        self.concurrency = concurrency or settings.knowledge_import_concurrency
+    
+    def import_rows(
+        self,
+        rows: Iterable[Tuple[int, dict]],
+        dry_run: bool = False,
+        checkpoint_path: Optional[str] = None,
+        source: str = "import"
+    ) -> dict:
+        """
+        Import numbered rows (as yielded by read_rows).
+        
+        Args:
+            rows: (line_number, row) pairs, in file order
+            dry_run: Validate and report without enriching or writing
+            checkpoint_path: File recording the last committed line
+            source: `source` of created entries
+        
+        Returns:
+            Counts of created, updated, invalid and skipped rows, plus
+            the first invalid rows with their errors
+        """
+        resume_after = 0 if dry_run else self._load_checkpoint(checkpoint_path)
+        
+        report = {
+            'dry_run': dry_run,
+            'rows': 0,
+            'created': 0,
+            'updated': 0,
+            'invalid': 0,
+            'skipped': 0,
+            'enriched': 0,
+            'errors': []
+        }
+        
+        existing = {entry.entry_id: entry for entry in KnowledgeEntry.from_dict_batch(
+            firebase_client.get_all_knowledge()
+        )}
+        index = QuestionIndex(SAME_QUESTION_SCORE)
+        for entry in existing.values():
+            index.add(entry.entry_id, entry.question)
+        
+        chunk: List[Tuple[int, KnowledgeCreate]] = []
+        for line_number, row in rows:
+            report['rows'] += 1
+            if line_number <= resume_after:
+                report['skipped'] += 1
+                continue
+            try:
+                chunk.append((line_number, parse_row(row)))
+            except ValueError as e:
+                report['invalid'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'line': line_number, 'error': str(e)})
+                continue
+            
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, existing, index, report, dry_run, source)
+                self._save_checkpoint(checkpoint_path, chunk[-1][0], dry_run)
+                chunk = []
+        
+        if chunk:
+            self._import_chunk(chunk, existing, index, report, dry_run, source)
+            self._save_checkpoint(checkpoint_path, chunk[-1][0], dry_run)
+        
+        if checkpoint_path and not dry_run and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        if not dry_run and (report['created'] or report['updated']):
+            tenant_registry.get().invalidate_knowledge()
+        
+        logger.info(
+            f"Knowledge import{' (dry run)' if dry_run else ''}: "
+            f"{report['created']} created, {report['updated']} updated, "
+            f"{report['invalid']} invalid, {report['skipped']} skipped"
+        )
+        return report
+    
+    def import_file(self, path: str, **kwargs) -> dict:
+        """Import a .jsonl or .csv file."""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return self.import_rows(read_rows(f, format_from_path(path)), **kwargs)
+    
+    def _import_chunk(
+        self,
+        chunk: List[Tuple[int, KnowledgeCreate]],
+        existing: Dict[str, KnowledgeEntry],
+        index: QuestionIndex,
+        report: dict,
+        dry_run: bool,
+        source: str
+    ):
+        """Resolve duplicates, enrich keywords and commit one chunk."""
+        created: Dict[str, KnowledgeEntry] = {}
+        # entry_id -> changed fields of existing entries
+        updated: Dict[str, dict] = {}
+        
+        for _, entry_data in chunk:
+            match_id = index.find(entry_data.question)
+            if match_id is None:
+                entry = KnowledgeEntry(
+                    question=entry_data.question,
+                    answer=entry_data.answer,
+                    category=entry_data.category,
+                    keywords=entry_data.keywords,
+                    source=source,
+                    source_request_id=entry_data.source_request_id,
+                    source_request_ids=(
+                        [entry_data.source_request_id] if entry_data.source_request_id else []
+                    )
+                )
+                created[entry.entry_id] = existing[entry.entry_id] = entry
+                index.add(entry.entry_id, entry.question)
+                report['created'] += 1
+                continue
+            
+            changes = merge_entry(existing[match_id], entry_data)
+            if match_id not in created:
+                updated[match_id] = changes
+            report['updated'] += 1
+        
+        if dry_run:
+            return
+        
+        report['enriched'] += self._enrich([e for e in created.values() if not e.keywords])
+        
+        batch = {f"knowledge_base/{entry_id}": entry.to_dict() for entry_id, entry in created.items()}
+        for entry_id, changes in updated.items():
+            # Field paths, so usage counters written meanwhile are kept
+            for field, value in changes.items():
+                batch[f"knowledge_base/{entry_id}/{field}"] = value
+        
+        if not firebase_client.commit_batch(batch):
+            logger.error(f"Failed to commit knowledge import chunk ending at line {chunk[-1][0]}")
+            raise Exception("Database error")
+    
+    def _enrich(self, entries: List[KnowledgeEntry]) -> int:
+        """Extract missing keywords in parallel; returns how many got some."""
+        if not entries:
+            return 0
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            keyword_lists = list(pool.map(
+                lambda e: ai_service.extract_keywords(f"{e.question} {e.answer}"),
+                entries
+            ))
+        
+        enriched = 0
+        for entry, keywords in zip(entries, keyword_lists):
+            entry.keywords = keywords
+            enriched += bool(keywords)
+        return enriched
+    
+    @staticmethod
+    def _load_checkpoint(path: Optional[str]) -> int:
+        """Last committed line recorded by an interrupted import."""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                line = int(json.load(f)['line'])
+            logger.info(f"Resuming knowledge import after line {line}")
+            return line
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Ignoring unreadable import checkpoint: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def _save_checkpoint(path: Optional[str], line: int, dry_run: bool):
+        if not path or dry_run:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'line': line, 'saved_at': datetime.utcnow().isoformat()}, f)
+        os.replace(tmp_path, path)
+
+
+def iter_export(fmt: str) -> Iterator[str]:
+    """
+    Stream the knowledge base as JSONL lines or CSV rows.
+    
+    JSONL carries every stored field; CSV carries CSV_FIELDS. Both can be
+    imported again. Entries are read here rather than lazily, so the
+    current tenant's knowledge is exported wherever the lines are consumed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return _export_lines(fmt, firebase_client.get_all_knowledge())
+
+
+def _export_lines(fmt: str, rows: List[dict]) -> Iterator[str]:
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+        return
+    
+    class _Line:
+        def write(self, value: str) -> str:
+            return value
+    
+    writer = csv.writer(_Line())
+    yield writer.writerow(CSV_FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            KEYWORD_SEPARATOR.join(row.get(field) or []) if field == 'keywords' else row.get(field, '')
+            for field in CSV_FIELDS
+        ])
+
+
+def export_file(path: str) -> int:
+    """Write the knowledge base to a .jsonl or .csv file; returns entries written."""
+    fmt = format_from_path(path)
+    count = -1 if fmt == 'csv' else 0  # CSV header is not an entry
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for line in iter_export(fmt):
+            f.write(line)
+            count += 1
+    logger.info(f"Exported {count} knowledge entries to {path}")
+    return count
+
+
+# Global importer
+knowledge_importer = KnowledgeImporter()
\ No newline at end of file
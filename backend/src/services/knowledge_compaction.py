@@ -0,0 +1,180 @@
+"""
+Knowledge Compaction - Merges near-duplicate knowledge entries.
+"""
+from datetime import datetime
+from typing import Dict, List, Set
+from src.models.knowledge_base import KnowledgeEntry
+from src.database.firebase_client import firebase_client
+from src.services.knowledge_service import knowledge_service
+from src.services.tenant_registry import tenant_registry
+from src.config.settings import settings
+from src.utils.text import question_tokens, token_similarity
+from src.utils.logger import logger
+
+# Keyword lists of merged entries are capped so search scoring stays sane
+MAX_MERGED_KEYWORDS = 10
+
+
+class KnowledgeCompactor:
+    """
+    Clusters knowledge entries asking the same question and folds each
+    cluster into a single entry.
+    
+    Clusters whose questions all have the same content words are merged;
+    clusters of merely similar questions are reported for review and only
+    merged when asked to. The surviving entry keeps the newest answer
+    (latest `updated_at`, which usage does not touch), the summed usage
+    count and every source request id. Merged-away ids are recorded under
+    /knowledge_redirects so existing links keep resolving.
+    """
+    
+    def __init__(self, threshold: float = None):
+        self.threshold = threshold or settings.knowledge_dedup_threshold
+    
+    def find_clusters(self, entries: List[KnowledgeEntry]) -> List[List[KnowledgeEntry]]:
+        """
+        Group near-duplicate entries.
+        
+        Leader clustering: each entry joins the first cluster whose leader
+        is similar enough, so clusters cannot drift through chains of
+        loosely related questions. Only clusters with duplicates are
+        returned.
+        """
+        leaders: List[tuple] = []  # (tokens, cluster)
+        by_token: Dict[str, Set[int]] = {}
+        
+        for entry in sorted(entries, key=lambda e: e.created_at):
+            tokens = question_tokens(entry.question)
+            
+            candidates = set()
+            for token in tokens:
+                candidates.update(by_token.get(token, ()))
+            
+            best_score, best_index = 0.0, None
+            for index in candidates:
+                score = token_similarity(tokens, leaders[index][0])
+                if score > best_score:
+                    best_score, best_index = score, index
+            
+            if best_index is not None and best_score >= self.threshold:
+                leaders[best_index][1].append(entry)
+                continue
+            
+            leaders.append((tokens, [entry]))
+            for token in tokens:
+                by_token.setdefault(token, set()).add(len(leaders) - 1)
+        
+        return [cluster for _, cluster in leaders if len(cluster) > 1]
+    
+    @staticmethod
+    def is_exact(cluster: List[KnowledgeEntry]) -> bool:
+        """Whether every question in the cluster has the same content words."""
+        return len({question_tokens(entry.question) for entry in cluster}) == 1
+    
+    def merge_cluster(self, cluster: List[KnowledgeEntry]) -> tuple:
+        """
+        Fold a cluster into its newest entry.
+        
+        Returns:
+            (merged_entry, batch) where batch is the multi-path update
+            that writes the merge
+        """
+        cluster = sorted(cluster, key=lambda e: e.updated_at, reverse=True)
+        survivor = cluster[0].model_copy(deep=True)
+        others = cluster[1:]
+        
+        for entry in others:
+            survivor.times_used += entry.times_used
+            if entry.last_used_at and (
+                not survivor.last_used_at or entry.last_used_at > survivor.last_used_at
+            ):
+                survivor.last_used_at = entry.last_used_at
+            survivor.created_at = min(survivor.created_at, entry.created_at)
+            survivor.category = survivor.category or entry.category
+            survivor.confidence = max(survivor.confidence, entry.confidence)
+            
+            for keyword in entry.keywords:
+                if keyword not in survivor.keywords and len(survivor.keywords) < MAX_MERGED_KEYWORDS:
+                    survivor.keywords.append(keyword)
+            
+            for request_id in [entry.source_request_id] + entry.source_request_ids:
+                if request_id and request_id not in survivor.source_request_ids:
+                    survivor.source_request_ids.append(request_id)
+            
+            for entry_id in [entry.entry_id] + entry.merged_entry_ids:
+                if entry_id not in survivor.merged_entry_ids:
+                    survivor.merged_entry_ids.append(entry_id)
+        
+        if survivor.source_request_id and survivor.source_request_id not in survivor.source_request_ids:
+            survivor.source_request_ids.insert(0, survivor.source_request_id)
+        survivor.updated_at = datetime.utcnow()
+        
+        batch = {f"knowledge_base/{survivor.entry_id}": survivor.to_dict()}
+        for entry_id in survivor.merged_entry_ids:
+            batch[f"knowledge_base/{entry_id}"] = None
+            batch[f"knowledge_redirects/{entry_id}"] = survivor.entry_id
+        
+        return survivor, batch
+    
+    def compact(self, dry_run: bool = False, merge_similar: bool = False) -> dict:
+        """
+        Run one compaction pass over the knowledge base.
+        
+        Args:
+            dry_run: Report what would be merged without writing
+            merge_similar: Also merge clusters of similar but not identical
+                questions, once they have been reviewed
+        
+        Returns:
+            Summary of clusters merged, clusters left for review and
+            entries removed
+        """
+        entries = knowledge_service.get_all_knowledge()
+        clusters = self.find_clusters(entries)
+        
+        merged = []
+        review = []
+        removed = 0
+        for cluster in clusters:
+            if not merge_similar and not self.is_exact(cluster):
+                review.append({
+                    'entry_ids': [e.entry_id for e in cluster],
+                    'questions': [e.question for e in cluster]
+                })
+                continue
+            
+            survivor, batch = self.merge_cluster(cluster)
+            
+            if not dry_run:
+                if not firebase_client.commit_batch(batch):
+                    logger.error(f"Failed to merge cluster into {survivor.entry_id}")
+                    continue
+            
+            removed += len(cluster) - 1
+            merged.append({
+                'entry_id': survivor.entry_id,
+                'question': survivor.question,
+                'merged_entry_ids': [e.entry_id for e in cluster if e.entry_id != survivor.entry_id],
+                'times_used': survivor.times_used
+            })
+        
+        logger.info(
+            f"Knowledge compaction {'(dry run) ' if dry_run else ''}"
+            f"found {len(clusters)} clusters, removed {removed} entries, "
+            f"{len(review)} left for review"
+        )
+        
+        if merged and not dry_run:
+            tenant_registry.get().invalidate_knowledge()
+        
+        return {
+            'dry_run': dry_run,
+            'entries_before': len(entries),
+            'entries_after': len(entries) - removed,
+            'clusters': merged,
+            'review': review
+        }
+
+
+# Global instance
+knowledge_compactor = KnowledgeCompactor()
\ No newline at end of file
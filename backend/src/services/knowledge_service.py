@@ -1,22 +1,87 @@
 """
 Knowledge Base Service - Manages learned answers.
+
+Uses of stored answers are counted write-behind: record_usage() only
+queues the count, and a timer writes the queued counts every
+`knowledge_usage_flush_interval` seconds, so a fast-path answer never
+waits on the database.
 """
-from typing import List, Optional
+import atexit
+import threading
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from src.models.knowledge_base import KnowledgeEntry, KnowledgeCreate
 from src.models.help_request import HelpRequest
 from src.database.firebase_client import firebase_client
 from src.services.ai_service import ai_service
+from src.services.tenant_registry import tenant_registry
+from src.config.settings import settings
+from src.utils.tenant import get_tenant_id, tenant_scope
+from src.utils.text import question_tokens, token_similarity
 from src.utils.logger import logger
 
+# Match score of two questions with the same content words. Only these
+# are merged automatically: a near match ("walk-ins on Sunday?" vs
+# "walk-ins?") may well need a different answer, so it is left to
+# compaction review
+SAME_QUESTION_SCORE = 1.0
+
+
+def merge_entry(entry: KnowledgeEntry, entry_data: KnowledgeCreate) -> dict:
+    """
+    Refresh `entry` in place with a newer answer to the same question.
+    
+    Returns:
+        The changed fields, to write as field paths (so usage counters
+        written meanwhile are kept)
+    """
+    entry.answer = entry_data.answer
+    entry.category = entry_data.category or entry.category
+    for keyword in entry_data.keywords:
+        if keyword not in entry.keywords:
+            entry.keywords.append(keyword)
+    if entry_data.source_request_id:
+        entry.source_request_id = entry_data.source_request_id
+        if entry_data.source_request_id not in entry.source_request_ids:
+            entry.source_request_ids.append(entry_data.source_request_id)
+    entry.updated_at = datetime.utcnow()
+    
+    return {
+        'answer': entry.answer,
+        'category': entry.category,
+        'keywords': entry.keywords,
+        'source_request_id': entry.source_request_id,
+        'source_request_ids': entry.source_request_ids,
+        'updated_at': entry.updated_at.isoformat()
+    }
+
 
 class KnowledgeService:
     """
     Manages the knowledge base that AI learns from.
     """
     
+    def __init__(self, usage_flush_interval: float = None):
+        self.usage_flush_interval = (
+            settings.knowledge_usage_flush_interval if usage_flush_interval is None
+            else usage_flush_interval
+        )
+        # Uses not yet written: (tenant_id, entry_id) -> count
+        self._pending_usage: Dict[Tuple[str, str], int] = {}
+        self._usage_timer: Optional[threading.Timer] = None
+        self._usage_lock = threading.Lock()
+    
     def add_entry(self, entry_data: KnowledgeCreate) -> KnowledgeEntry:
-        """Add a new entry to the knowledge base."""
+        """
+        Add a new entry to the knowledge base.
+        
+        If an entry already asks the same question, it is updated with
+        the new answer instead of inserting a duplicate.
+        """
+        existing = self.find_matching_entry(entry_data.question)
+        if existing:
+            return self._update_existing(existing, entry_data)
+        
         # Extract keywords if not provided
         if not entry_data.keywords:
             keywords = ai_service.extract_keywords(
@@ -30,7 +95,10 @@ class KnowledgeService:
             answer=entry_data.answer,
             category=entry_data.category,
             keywords=keywords,
-            source_request_id=entry_data.source_request_id
+            source_request_id=entry_data.source_request_id,
+            source_request_ids=(
+                [entry_data.source_request_id] if entry_data.source_request_id else []
+            )
         )
         
         success = firebase_client.create_knowledge_entry(
@@ -42,9 +110,36 @@ class KnowledgeService:
             logger.error("Failed to save knowledge entry")
             raise Exception("Database error")
         
+        tenant_registry.get().invalidate_knowledge()
         logger.info(f"Knowledge entry created: {entry.entry_id}")
         return entry
     
+    def find_matching_entry(self, question: str) -> Optional[KnowledgeEntry]:
+        """Find the existing entry that asks the same question, if any."""
+        matches = self.search_knowledge_scored(question, limit=1)
+        if matches and matches[0][0] >= SAME_QUESTION_SCORE:
+            return matches[0][1]
+        return None
+    
+    def _update_existing(
+        self,
+        entry: KnowledgeEntry,
+        entry_data: KnowledgeCreate
+    ) -> KnowledgeEntry:
+        """Refresh an existing entry with a newer answer."""
+        success = firebase_client.update_knowledge_entry(
+            entry.entry_id,
+            merge_entry(entry, entry_data)
+        )
+        
+        if not success:
+            logger.error("Failed to update knowledge entry")
+            raise Exception("Database error")
+        
+        tenant_registry.get().invalidate_knowledge()
+        logger.info(f"Knowledge entry updated instead of duplicated: {entry.entry_id}")
+        return entry
+    
     def add_from_help_request(self, help_request: HelpRequest) -> KnowledgeEntry:
         """
         Automatically add knowledge from a resolved help request.
@@ -60,7 +155,7 @@ class KnowledgeService:
     def get_all_knowledge(self) -> List[KnowledgeEntry]:
         """Get all knowledge base entries."""
         data_list = firebase_client.get_all_knowledge()
-        entries = [KnowledgeEntry.from_dict(data) for data in data_list]
+        entries = KnowledgeEntry.from_dict_batch(data_list)
         
         # Sort by most recently used
         entries.sort(
@@ -101,26 +196,109 @@ class KnowledgeService:
         scored_entries.sort(key=lambda x: x[0], reverse=True)
         return [entry for _, entry in scored_entries[:limit]]
     
-    def increment_usage(self, entry_id: str) -> bool:
+    def search_knowledge_scored(
+        self,
+        query: str,
+        limit: int = 5
+    ) -> List[Tuple[float, KnowledgeEntry]]:
+        """
+        Search knowledge base with a normalized match score per entry.
+        
+        The score is the content-word overlap between the query and the
+        stored question: 1.0 means the same question, 0.0 nothing shared.
+        Searches the current tenant's cached knowledge index.
+        
+        Returns:
+            List of (score, entry), best match first
+        """
+        tokens = question_tokens(query)
+        if not tokens:
+            return []
+        
+        scored = []
+        for entry_tokens, entry in tenant_registry.get().knowledge_index(self.get_all_knowledge):
+            score = token_similarity(tokens, entry_tokens)
+            if score > 0:
+                scored.append((score, entry))
+        
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored[:limit]
+    
+    def record_usage(self, entry_id: str):
+        """
+        Count a use of an entry of the current tenant.
+        
+        Written within `usage_flush_interval` seconds, or at once if
+        the interval is 0.
+        """
+        key = (get_tenant_id(), entry_id)
+        with self._usage_lock:
+            self._pending_usage[key] = self._pending_usage.get(key, 0) + 1
+            flush_now = self.usage_flush_interval <= 0
+            if not flush_now and self._usage_timer is None:
+                self._usage_timer = threading.Timer(self.usage_flush_interval, self.flush_usage)
+                self._usage_timer.daemon = True
+                self._usage_timer.start()
+        
+        if flush_now:
+            self.flush_usage()
+    
+    def flush_usage(self) -> int:
+        """
+        Write queued usage counts now, one update per entry.
+        
+        Returns:
+            Number of entries written; failed ones are dropped (usage
+            counts are advisory)
+        """
+        with self._usage_lock:
+            pending, self._pending_usage = self._pending_usage, {}
+            if self._usage_timer is not None:
+                self._usage_timer.cancel()
+                self._usage_timer = None
+        
+        written = 0
+        for (tenant_id, entry_id), uses in pending.items():
+            try:
+                with tenant_scope(tenant_id):
+                    if self.increment_usage(entry_id, uses):
+                        written += 1
+            except Exception as e:
+                logger.warning(f"Failed to record usage of {entry_id}: {str(e)}")
+        return written
+    
+    def increment_usage(self, entry_id: str, amount: int = 1) -> bool:
         """Increment usage counter when knowledge is used."""
         entry = self.get_entry(entry_id)
         if not entry:
             return False
         
-        now = datetime.utcnow()
+        # updated_at is left alone: it dates the answer, which compaction
+        # relies on to keep the newest one
         updates = {
-            'times_used': entry.times_used + 1,
-            'last_used_at': now.isoformat(),
-            'updated_at': now.isoformat()
+            'times_used': entry.times_used + amount,
+            'last_used_at': datetime.utcnow().isoformat()
         }
         
-        return firebase_client.update_knowledge_entry(entry_id, updates)
+        # entry.entry_id, not entry_id: the requested id may have been merged away
+        return firebase_client.update_knowledge_entry(entry.entry_id, updates)
     
     def get_entry(self, entry_id: str) -> Optional[KnowledgeEntry]:
-        """Get a specific knowledge entry."""
+        """
+        Get a specific knowledge entry.
+        
+        Ids of entries merged away by compaction resolve to the entry
+        they were merged into.
+        """
         data = firebase_client.get_knowledge_entry(entry_id)
         if data:
             return KnowledgeEntry.from_dict(data)
+        
+        merged_into = firebase_client.get_knowledge_redirect(entry_id)
+        if merged_into and merged_into != entry_id:
+            data = firebase_client.get_knowledge_entry(merged_into)
+            if data:
+                return KnowledgeEntry.from_dict(data)
         return None
     
     def get_knowledge_summary(self) -> dict:
@@ -145,4 +323,5 @@ class KnowledgeService:
 
 
 # Global service instance
-knowledge_service = KnowledgeService()
\ No newline at end of file
+knowledge_service = KnowledgeService()
+atexit.register(knowledge_service.flush_usage)
\ No newline at end of file
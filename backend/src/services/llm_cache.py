@@ -0,0 +1,165 @@
+"""
+LLM Cache - Disk-backed, content-addressed cache of LLM responses.
+
+Responses are stored in SQLite under the hash of the request payload
+(model, messages, temperature, max_tokens), so the same request always
+maps to the same entry. Modes:
+
+    off        no caching (default)
+    readwrite  serve hits, call the API on misses and store the result
+    record     always call the API and store (refreshes a recording)
+    replay     serve hits only; a miss returns None and never calls the API
+
+Replay makes integration runs, seeding and load tests deterministic and
+free of network access once a run has been recorded. The file is kept
+under `llm_cache_max_bytes` by evicting least recently used entries.
+"""
+import os
+import sqlite3
+import threading
+import time
+from enum import Enum
+from typing import Optional
+from src.config.settings import settings
+from src.utils.logger import logger
+
+
+class CacheMode(str, Enum):
+    """How the cache is used."""
+    OFF = "off"
+    READWRITE = "readwrite"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class LLMCache:
+    """
+    SQLite store of LLM responses with size-bounded LRU eviction.
+    """
+    
+    def __init__(self, path: str = None, mode: str = None, max_bytes: int = None):
+        self.path = path or settings.llm_cache_path
+        self.mode = CacheMode(mode or settings.llm_cache_mode)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.llm_cache_max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size: Optional[int] = None
+    
+    @property
+    def reads(self) -> bool:
+        """Whether lookups are served from the cache."""
+        return self.mode in (CacheMode.READWRITE, CacheMode.REPLAY)
+    
+    @property
+    def writes(self) -> bool:
+        """Whether API responses are stored."""
+        return self.mode in (CacheMode.READWRITE, CacheMode.RECORD)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (nothing is created while off)."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cached response for a payload hash.
+        
+        Returns:
+            The response, or None on a miss
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.stats['misses'] += 1
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self.stats['hits'] += 1
+                return row[0]
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {str(e)}")
+            return None
+    
+    def put(self, key: str, model: str, response: str) -> bool:
+        """Store a response, evicting old entries if over the size limit."""
+        size = len(key) + len(response.encode('utf-8'))
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                self._size += size - (old[0] if old else 0)
+                self.stats['writes'] += 1
+                self._evict(conn)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {str(e)}")
+            return False
+    
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until under max_bytes."""
+        if not self.max_bytes or self._size <= self.max_bytes:
+            return
+        evicted = []
+        while self._size > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            batch = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                batch.append((key,))
+                self._size -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", batch)
+            evicted.extend(batch)
+        self.stats['evictions'] += len(evicted)
+        logger.info(f"Evicted {len(evicted)} LLM cache entries")
+    
+    def size_bytes(self) -> int:
+        """Total stored size of keys and responses."""
+        with self._lock:
+            self._connect()
+            return self._size
+    
+    def clear(self):
+        """Delete every entry."""
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._size = 0
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global cache instance
+llm_cache = LLMCache()
\ No newline at end of file
@@ -0,0 +1,380 @@
+"""
+Notification Outbox - Durable, retried delivery of notifications.
+
+Jobs are persisted in /notification_outbox in the same batch as the help
+request change that produced them, then delivered by a pool of worker
+threads with per-channel rate limiting and exponential backoff.
+Supervisor notifications may be coalesced into digests on the way out.
+"""
+import heapq
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from src.models.help_request import HelpRequest
+from src.models.notification import (
+    NotificationJob, NotificationKind, NotificationStatus
+)
+from src.database.firebase_client import firebase_client
+from src.services.notification_service import notification_service
+from src.services.supervisor_digest import SupervisorDigest
+from src.services.tenant_registry import all_tenant_ids
+from src.config.settings import settings
+from src.utils.rate_limit import TokenBucket
+from src.utils.tenant import get_tenant_id, tenant_scope
+from src.utils.logger import logger
+
+
+class NotificationOutbox:
+    """
+    Builds outbox jobs and the database writes that persist them.
+    """
+    
+    def supervisor_job(self, help_request: HelpRequest) -> NotificationJob:
+        """Job announcing a new help request to the supervisor."""
+        return NotificationJob(
+            kind=NotificationKind.SUPERVISOR,
+            recipient="supervisor",
+            message=notification_service._format_supervisor_notification(
+                help_request
+            ),
+            request_id=help_request.request_id,
+            tenant_id=get_tenant_id(),
+            urgent=help_request.urgent,
+            idempotency_key=f"supervisor:{help_request.request_id}"
+        )
+    
+    def customer_job(
+        self,
+        help_request: HelpRequest,
+        phone: Optional[str] = None
+    ) -> NotificationJob:
+        """Job sending the supervisor's answer back to a customer."""
+        phone = phone or help_request.customer_phone
+        return NotificationJob(
+            kind=NotificationKind.CUSTOMER,
+            recipient=phone,
+            message=notification_service._format_customer_notification(
+                help_request.question,
+                help_request.supervisor_answer
+            ),
+            request_id=help_request.request_id,
+            tenant_id=get_tenant_id(),
+            idempotency_key=f"customer:{help_request.request_id}:{phone}"
+        )
+    
+    def stage(self, job: NotificationJob) -> Dict[str, dict]:
+        """Database paths to include in the caller's batch write."""
+        return {f"notification_outbox/{job.job_id}": job.to_dict()}
+
+
+class NotificationDeliveryPool:
+    """
+    Worker pool that drains the notification outbox.
+    
+    Committed jobs are handed over with `submit` for immediate delivery.
+    A poller also rescans the outbox so jobs written by other processes
+    (e.g. the LiveKit agent) or left behind by a crash are delivered too.
+    """
+    
+    def __init__(
+        self,
+        workers: int = None,
+        rate_per_second: float = None,
+        max_attempts: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None,
+        poll_interval: Optional[float] = -1,
+        digest_window: float = None
+    ):
+        self.workers = workers or settings.notification_workers
+        self.rate_per_second = rate_per_second or settings.notification_rate_per_second
+        self.max_attempts = max_attempts or settings.supervisor_notification_retry + 1
+        self.backoff_base = (
+            settings.notification_backoff_base if backoff_base is None else backoff_base
+        )
+        self.backoff_max = backoff_max or settings.notification_backoff_max
+        # -1 means "use settings", None disables rescanning
+        self.poll_interval = (
+            settings.notification_poll_interval if poll_interval == -1 else poll_interval
+        )
+        
+        self._heap: List[tuple] = []  # (due_ts, seq, job)
+        self._scheduled = set()  # job_ids queued or in flight
+        self._delivered = OrderedDict()  # Recent idempotency keys
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._stopped = threading.Event()
+        
+        self.digest = SupervisorDigest(self._deliver, window=digest_window)
+        self.stats = {'sent': 0, 'retried': 0, 'dead': 0, 'duplicates': 0}
+    
+    # Lifecycle
+    def start(self):
+        """Start worker threads and the outbox poller."""
+        if self._running:
+            return
+        self._running = True
+        self._stopped.clear()
+        
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"notification-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        
+        if self.poll_interval:
+            poller = threading.Thread(
+                target=self._poll_loop,
+                name="notification-poller",
+                daemon=True
+            )
+            poller.start()
+            self._threads.append(poller)
+        
+        logger.info(f"Notification delivery pool started with {self.workers} workers")
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop workers. Undelivered jobs stay pending in the outbox."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._stopped.set()
+        self.digest.cancel()
+        
+        with self._cond:
+            self._heap = []
+            self._scheduled = set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Notification delivery pool stopped")
+    
+    @property
+    def running(self) -> bool:
+        return self._running
+    
+    # Scheduling
+    def submit(self, job: NotificationJob):
+        """Queue a committed job for delivery at its next_attempt_at."""
+        due = (
+            job.next_attempt_at.replace(tzinfo=timezone.utc).timestamp()
+            if job.next_attempt_at else time.time()
+        )
+        with self._cond:
+            if job.job_id in self._scheduled:
+                return
+            self._scheduled.add(job.job_id)
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, job))
+            self._cond.notify()
+    
+    def dispatch(self, job: NotificationJob):
+        """Hand over a just-committed job; left for the poller if not running."""
+        if not self._running:
+            logger.info(f"Delivery pool not running, job {job.job_id} left in outbox")
+            return
+        self.submit(job)
+    
+    def pending_count(self) -> int:
+        """Jobs queued or in flight in this process."""
+        with self._cond:
+            return len(self._scheduled)
+    
+    def _next_job(self) -> Optional[NotificationJob]:
+        with self._cond:
+            while self._running:
+                if self._heap:
+                    due, _, job = self._heap[0]
+                    wait = due - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        return job
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+    
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.error(f"Notification worker crashed on {job.job_id}: {str(e)}")
+                with self._cond:
+                    self._scheduled.discard(job.job_id)
+    
+    def _poll_loop(self):
+        while True:
+            self.recover_pending()
+            if self._stopped.wait(self.poll_interval):
+                return
+    
+    def recover_pending(self) -> int:
+        """
+        Schedule pending outbox jobs not already known to this pool.
+        
+        Resolved requests whose customer notifications never reached the
+        outbox are queued first (help_request_service stages them).
+        """
+        # Imported here: help_request_service writes to this outbox
+        from src.services.help_request_service import help_request_service
+        for tenant_id in all_tenant_ids():
+            with tenant_scope(tenant_id):
+                help_request_service.stage_pending_notifications()
+        
+        count = 0
+        for data in firebase_client.get_notification_jobs(
+            NotificationStatus.PENDING.value
+        ):
+            try:
+                job = NotificationJob.from_dict(data)
+            except Exception as e:
+                logger.error(f"Skipping malformed outbox job: {str(e)}")
+                continue
+            with self._cond:
+                known = job.job_id in self._scheduled
+            if not known:
+                self.submit(job)
+                count += 1
+        return count
+    
+    # Delivery
+    def _bucket(self, channel: str) -> TokenBucket:
+        with self._cond:
+            if channel not in self._buckets:
+                self._buckets[channel] = TokenBucket(self.rate_per_second)
+            return self._buckets[channel]
+    
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        # Full jitter keeps retries from a burst of failures apart
+        return random.uniform(delay / 2, delay)
+    
+    def _count(self, name: str):
+        with self._cond:
+            self.stats[name] += 1
+    
+    def _remember_delivered(self, key: str):
+        with self._cond:
+            self._delivered[key] = True
+            while len(self._delivered) > 10000:
+                self._delivered.popitem(last=False)
+    
+    def _process(self, job: NotificationJob):
+        with self._cond:
+            duplicate = job.idempotency_key in self._delivered
+        if duplicate:
+            self._count('duplicates')
+            self._mark_sent(job)
+            return
+        
+        if self.digest.accepts(job):
+            self.digest.add(job)
+            return
+        
+        self._deliver([job], job)
+    
+    def _deliver(self, jobs: List[NotificationJob], envelope: NotificationJob):
+        """
+        Send `envelope` on behalf of `jobs`.
+        
+        For a single job the envelope is the job itself; for a digest it
+        is the combined message and every member shares the outcome.
+        """
+        self._bucket(envelope.kind).acquire()
+        
+        for job in jobs:
+            job.attempts += 1
+        try:
+            success = notification_service.deliver(envelope)
+            error = None if success else "Transport rejected notification"
+        except Exception as e:
+            success = False
+            error = str(e)
+        
+        for job in jobs:
+            if success:
+                self._remember_delivered(job.idempotency_key)
+                self._count('sent')
+                self._mark_sent(job)
+            else:
+                self._retry_or_give_up(job, error)
+    
+    def _retry_or_give_up(self, job: NotificationJob, error: str):
+        now = datetime.utcnow()
+        job.last_error = error
+        job.updated_at = now
+        
+        if job.attempts >= self.max_attempts:
+            job.status = NotificationStatus.DEAD.value
+            self._count('dead')
+            logger.error(
+                f"Giving up on notification {job.job_id} after "
+                f"{job.attempts} attempts: {error}"
+            )
+            firebase_client.update_notification_job(job.job_id, {
+                'status': job.status,
+                'attempts': job.attempts,
+                'last_error': error,
+                'updated_at': now.isoformat()
+            })
+            with self._cond:
+                self._scheduled.discard(job.job_id)
+            return
+        
+        delay = self._backoff(job.attempts)
+        job.next_attempt_at = now + timedelta(seconds=delay)
+        self._count('retried')
+        logger.warning(
+            f"Notification {job.job_id} failed (attempt {job.attempts}), "
+            f"retrying in {delay:.1f}s: {error}"
+        )
+        updates = {
+            'attempts': job.attempts,
+            'last_error': error,
+            'next_attempt_at': job.next_attempt_at.isoformat(),
+            'updated_at': now.isoformat()
+        }
+        
+        # Reschedule before persisting so a slow write never delays the retry
+        with self._cond:
+            self._scheduled.discard(job.job_id)
+        self.submit(job)
+        
+        firebase_client.update_notification_job(job.job_id, updates)
+    
+    def _mark_sent(self, job: NotificationJob):
+        now = datetime.utcnow()
+        job.status = NotificationStatus.SENT.value
+        job.sent_at = now
+        
+        # Delivered jobs leave the outbox, so it only ever holds jobs
+        # still in flight (and dead ones, kept for inspection)
+        updates = {f"notification_outbox/{job.job_id}": None}
+        if job.kind == NotificationKind.CUSTOMER.value and job.request_id:
+            updates[f"help_requests/{job.request_id}/customer_notified"] = True
+            updates[f"help_requests/{job.request_id}/notification_sent_at"] = now.isoformat()
+        
+        # Workers serve every tenant; the request lives in the job's
+        with tenant_scope(job.tenant_id):
+            firebase_client.commit_batch(updates)
+        
+        with self._cond:
+            self._scheduled.discard(job.job_id)
+
+
+# Global instances
+notification_outbox = NotificationOutbox()
+notification_delivery_pool = NotificationDeliveryPool()
\ No newline at end of file
@@ -1,38 +1,111 @@
 """
 Notification Service - Simulates sending messages to supervisor and customers.
 """
-from typing import Optional
+import hashlib
+import threading
+from typing import Optional, List
 from src.models.help_request import HelpRequest
+from src.models.notification import NotificationJob, NotificationKind
 from src.utils.logger import logger
 
 
+class NotificationTransport:
+    """
+    Delivers a formatted notification to the outside world.
+    
+    Implementations must be safe to call from several worker threads
+    and should pass `job.idempotency_key` to providers that support it.
+    """
+    
+    def send(self, job: NotificationJob) -> bool:
+        """Deliver a job. Return True on success; raise or return False to retry."""
+        raise NotImplementedError
+
+
+class LogTransport(NotificationTransport):
+    """
+    Phase 1 transport: console logging simulation.
+    """
+    
+    def send(self, job: NotificationJob) -> bool:
+        if job.kind == NotificationKind.SUPERVISOR.value:
+            title = "📞 SUPERVISOR NOTIFICATION"
+        else:
+            title = f"📱 CUSTOMER NOTIFICATION TO {job.recipient}"
+        
+        logger.info("=" * 60)
+        logger.info(title)
+        logger.info("=" * 60)
+        logger.info(job.message)
+        logger.info("=" * 60)
+        
+        # TODO: Integrate webhook or Twilio SMS in production
+        # Example: self._send_sms(job.recipient, job.message)
+        
+        return True
+
+
+class FakeTransport(NotificationTransport):
+    """
+    In-memory transport for tests.
+    
+    Records delivered jobs, drops repeats of an idempotency key like a
+    real provider would, and can be told to fail the next N sends.
+    """
+    
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.sent: List[NotificationJob] = []
+        self.attempts = 0
+        self._seen_keys = set()
+        self._lock = threading.Lock()
+    
+    def send(self, job: NotificationJob) -> bool:
+        with self._lock:
+            self.attempts += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("Simulated transport failure")
+            if job.idempotency_key not in self._seen_keys:
+                self._seen_keys.add(job.idempotency_key)
+                self.sent.append(job)
+            return True
+
+
 class NotificationService:
     """
     Handles notifications to supervisors and customers.
     
     Phase 1: Console logging simulation
     Phase 2: Can integrate Twilio, webhooks, etc.
+    
+    Help request flows do not call this directly any more; they write
+    jobs to the outbox (see notification_outbox) and the delivery
+    workers hand them to `deliver`.
     """
     
+    def __init__(self, transport: Optional[NotificationTransport] = None):
+        self.transport = transport or LogTransport()
+    
+    def deliver(self, job: NotificationJob) -> bool:
+        """Send an outbox job through the configured transport."""
+        return bool(self.transport.send(job))
+    
     def notify_supervisor(self, help_request: HelpRequest) -> bool:
         """
-        Notify supervisor about a new help request.
+        Notify supervisor about a new help request immediately.
         
-        Currently simulated via console log.
+        Bypasses the outbox: no persistence and no retries.
         """
         try:
             message = self._format_supervisor_notification(help_request)
-            
-            logger.info("=" * 60)
-            logger.info("📞 SUPERVISOR NOTIFICATION")
-            logger.info("=" * 60)
-            logger.info(message)
-            logger.info("=" * 60)
-            
-            # TODO: Integrate webhook or SMS in production
-            # Example: self._send_webhook(supervisor_webhook_url, message)
-            
-            return True
+            return self.deliver(NotificationJob(
+                kind=NotificationKind.SUPERVISOR,
+                recipient="supervisor",
+                message=message,
+                request_id=help_request.request_id,
+                idempotency_key=f"supervisor:{help_request.request_id}"
+            ))
             
         except Exception as e:
             logger.error(f"Failed to notify supervisor: {str(e)}")
@@ -45,23 +118,18 @@ class NotificationService:
         answer: str
     ) -> bool:
         """
-        Send follow-up answer to customer.
+        Send follow-up answer to customer immediately.
         
-        Currently simulated via console log.
+        Bypasses the outbox: no persistence and no retries.
         """
         try:
             message = self._format_customer_notification(question, answer)
-            
-            logger.info("=" * 60)
-            logger.info(f"📱 CUSTOMER NOTIFICATION TO {phone}")
-            logger.info("=" * 60)
-            logger.info(message)
-            logger.info("=" * 60)
-            
-            # TODO: Integrate Twilio SMS in production
-            # Example: self._send_sms(phone, message)
-            
-            return True
+            return self.deliver(NotificationJob(
+                kind=NotificationKind.CUSTOMER,
+                recipient=phone,
+                message=message,
+                idempotency_key=f"customer:{phone}:{hashlib.sha1(message.encode()).hexdigest()[:16]}"
+            ))
             
         except Exception as e:
             logger.error(f"Failed to notify customer: {str(e)}")
@@ -83,6 +151,13 @@ Request ID: {help_request.request_id}
 Please respond through the admin panel to help this customer!
 """
     
+    def _format_supervisor_digest(self, messages: List[str]) -> str:
+        """Combine several supervisor notifications into one message."""
+        parts = [f"Hey! {len(messages)} customers need help answering questions.\n"]
+        for i, message in enumerate(messages, start=1):
+            parts.append(f"--- [{i}/{len(messages)}] ---\n{message}")
+        return "\n".join(parts)
+    
     def _format_customer_notification(self, question: str, answer: str) -> str:
         """Format the customer follow-up message."""
         return f"""Hi! Thanks for your patience. Here's the answer to your question:
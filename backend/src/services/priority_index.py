@@ -0,0 +1,96 @@
+"""
+Pending Priority Index - Pending help requests ordered by SLA deadline.
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from src.models.help_request import HelpRequest
+from src.config.settings import settings
+
+
+def effective_deadline(help_request: HelpRequest) -> datetime:
+    """
+    When a request should be answered by, for ordering.
+    
+    Starts from `timeout_at` and moves earlier for repeat customers
+    (`priority_seconds_per_call` per past call, capped at
+    `priority_max_customer_bonus`) and for urgent requests.
+    """
+    deadline = help_request.timeout_at or (
+        help_request.created_at + timedelta(seconds=settings.help_request_timeout)
+    )
+    bonus = min(
+        help_request.customer_value * settings.priority_seconds_per_call,
+        settings.priority_max_customer_bonus
+    )
+    if help_request.urgent:
+        bonus += settings.priority_urgent_seconds
+    return deadline - timedelta(seconds=bonus)
+
+
+class PendingPriorityIndex:
+    """
+    Min-heap of pending requests keyed on effective deadline.
+    
+    Adds and removals are O(log n); removals are lazy (the heap entry
+    stays until it surfaces or the heap is compacted). `top(n)` walks
+    the heap from the root with a small frontier heap, so it costs
+    O(n log n) however many requests are pending.
+    """
+    
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._entries: Dict[str, Tuple[Tuple[datetime, int, str], HelpRequest]] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def add(self, help_request: HelpRequest):
+        """Index (or re-index) a pending request."""
+        item = (effective_deadline(help_request), next(self._counter), help_request.request_id)
+        with self._lock:
+            self._entries[help_request.request_id] = (item, help_request)
+            heapq.heappush(self._heap, item)
+            self._maybe_compact_locked()
+    
+    def remove(self, request_id: str):
+        """Forget a request once it is no longer pending."""
+        with self._lock:
+            if self._entries.pop(request_id, None) is not None:
+                self._maybe_compact_locked()
+    
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._entries.clear()
+    
+    def _live(self, item: Tuple[datetime, int, str]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[0] is item
+    
+    def _maybe_compact_locked(self):
+        # Drop removed entries at the root, and rebuild once they dominate
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry[0] for entry in self._entries.values()]
+            heapq.heapify(self._heap)
+    
+    def top(self, n: int) -> List[Tuple[datetime, HelpRequest]]:
+        """The `n` requests with the earliest effective deadlines, in order."""
+        result = []
+        with self._lock:
+            heap = self._heap
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier and len(result) < n:
+                item, index = heapq.heappop(frontier)
+                if self._live(item):
+                    result.append((item[0], self._entries[item[2]][1]))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return result
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Question Index - Finds stored questions asking the same thing.
+
+Used for pending help requests (duplicate escalations) and for knowledge
+entries (duplicate detection during bulk imports).
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, Optional, Set
+from src.utils.text import question_tokens, token_similarity
+
+
+class QuestionIndex:
+    """
+    In-memory similarity index over questions, keyed by id.
+    
+    Questions are reduced to content-word sets; an inverted index from
+    word to ids keeps lookups proportional to the handful of questions
+    sharing a word rather than to all of them.
+    """
+    
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        self._by_token: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._tokens)
+    
+    def add(self, key: str, question: str):
+        """Index (or re-index) the question stored under `key`."""
+        tokens = question_tokens(question)
+        with self._lock:
+            self._remove_locked(key)
+            self._tokens[key] = tokens
+            for token in tokens:
+                self._by_token.setdefault(token, set()).add(key)
+    
+    def remove(self, key: str):
+        with self._lock:
+            self._remove_locked(key)
+    
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._by_token.clear()
+    
+    def _remove_locked(self, key: str):
+        tokens = self._tokens.pop(key, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            keys = self._by_token.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_token[token]
+    
+    def find_matches(self, question: str) -> list:
+        """
+        Find questions similar to `question`.
+        
+        Returns:
+            List of (similarity, id) at or above the threshold, best match first
+        """
+        return self._matches(question)
+    
+    def find(self, question: str) -> Optional[str]:
+        """Id of the question most similar to `question`, if any is similar enough."""
+        matches = self._matches(question)
+        return matches[0][1] if matches else None
+    
+    def _matches(self, question: str, accept: Optional[Callable[[str], bool]] = None) -> list:
+        """Matches among the ids `accept` returns True for (called under the lock)."""
+        tokens = question_tokens(question)
+        if not tokens:
+            return []
+        
+        with self._lock:
+            candidates = set()
+            for token in tokens:
+                candidates.update(self._by_token.get(token, ()))
+            
+            matches = []
+            for key in candidates:
+                if accept is not None and not accept(key):
+                    continue
+                score = token_similarity(tokens, self._tokens[key])
+                if score >= self.threshold:
+                    matches.append((score, key))
+        
+        matches.sort(key=lambda x: x[0], reverse=True)
+        return matches
+
+
+class PendingQuestionIndex(QuestionIndex):
+    """
+    Similarity index over pending help request questions, aware of when
+    each request was created.
+    """
+    
+    def __init__(self, threshold: float = 0.75):
+        super().__init__(threshold)
+        self._created_at: Dict[str, datetime] = {}
+    
+    def add(self, request_id: str, question: str, created_at: datetime):
+        """Index a pending request."""
+        with self._lock:
+            self._created_at[request_id] = created_at
+        super().add(request_id, question)
+    
+    def remove(self, request_id: str):
+        """Forget a request once it is no longer pending."""
+        super().remove(request_id)
+        with self._lock:
+            self._created_at.pop(request_id, None)
+    
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._created_at.clear()
+    
+    def find_matches(
+        self,
+        question: str,
+        window_seconds: int,
+        now: Optional[datetime] = None
+    ) -> list:
+        """
+        Find pending requests similar to `question`.
+        
+        Args:
+            question: New question text
+            window_seconds: Only consider requests created this recently
+            now: Reference time (defaults to utcnow)
+        
+        Returns:
+            List of (similarity, request_id), best match first
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=window_seconds)
+        return self._matches(
+            question,
+            accept=lambda request_id: self._created_at.get(request_id, cutoff) >= cutoff
+        )
\ No newline at end of file
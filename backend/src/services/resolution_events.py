@@ -0,0 +1,167 @@
+"""
+Live resolution events for help requests.
+
+An agent that escalated a caller's question subscribes to the request
+and hears the moment a supervisor answers it (or it times out), so the
+answer can be given while the caller is still on the line. Resolutions
+made in this process are published directly; those made elsewhere (the
+API server, when the agent runs as its own worker) arrive through a
+Firebase listener on the request, which streams its changes instead of
+polling for them.
+"""
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+from src.database.firebase_client import firebase_client
+from src.models.help_request import RequestStatus
+from src.utils.tenant import get_tenant_id, tenant_scope
+from src.utils.logger import logger
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """How a help request ended."""
+    request_id: str
+    status: RequestStatus
+    answer: Optional[str] = None
+
+
+class ResolutionSubscription:
+    """
+    One waiter for a request's resolution.
+    
+    Created on the event loop by ResolutionEvents.subscribe(); close()
+    it when no longer interested.
+    """
+    
+    def __init__(self, events: 'ResolutionEvents', key: Tuple[str, str]):
+        self.key = key
+        self._events = events
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+        self._listener = None
+    
+    @property
+    def request_id(self) -> str:
+        return self.key[1]
+    
+    def deliver(self, resolution: Resolution):
+        """Hand over the resolution; safe to call from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._set, resolution)
+        except RuntimeError:
+            pass  # The loop is gone, and the caller with it
+    
+    def _set(self, resolution: Resolution):
+        if not self._future.done():
+            self._future.set_result(resolution)
+    
+    async def wait(self, timeout: Optional[float] = None) -> Optional[Resolution]:
+        """
+        Wait for the resolution.
+        
+        Returns:
+            The resolution, or None if it did not arrive within `timeout` seconds
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    def close(self):
+        self._events.unsubscribe(self)
+
+
+class ResolutionEvents:
+    """
+    Publish/subscribe of help request resolutions, keyed by tenant and request.
+    """
+    
+    def __init__(self, listen: bool = True):
+        # Also stream each subscribed request from Firebase, for
+        # resolutions made by other processes
+        self.listen = listen
+        self.stats = {'published': 0, 'delivered': 0}
+        self._subscribers: Dict[Tuple[str, str], Set[ResolutionSubscription]] = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, request_id: str) -> ResolutionSubscription:
+        """Subscribe to `request_id` of the current tenant (call on the event loop)."""
+        tenant_id = get_tenant_id()
+        subscription = ResolutionSubscription(self, (tenant_id, request_id))
+        with self._lock:
+            self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        
+        if self.listen:
+            subscription._listener = firebase_client.listen_help_request(
+                request_id,
+                lambda event: self._on_change(tenant_id, request_id, event)
+            )
+        return subscription
+    
+    def unsubscribe(self, subscription: ResolutionSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+        listener, subscription._listener = subscription._listener, None
+        if listener:
+            try:
+                listener.close()
+            except Exception as e:
+                logger.warning(f"Failed to close listener on {subscription.request_id}: {str(e)}")
+    
+    def publish(
+        self,
+        request_id: str,
+        status: RequestStatus,
+        answer: Optional[str] = None,
+        tenant_id: Optional[str] = None
+    ) -> int:
+        """
+        Tell everyone waiting on `request_id` how it ended.
+        
+        Returns:
+            Number of subscribers it was delivered to
+        """
+        key = (tenant_id or get_tenant_id(), request_id)
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            self.stats['published'] += 1
+            self.stats['delivered'] += len(subscribers)
+        
+        resolution = Resolution(request_id, status, answer)
+        for subscription in subscribers:
+            subscription.deliver(resolution)
+        return len(subscribers)
+    
+    def _on_change(self, tenant_id: str, request_id: str, event: Any):
+        """Firebase listener callback (listener thread): publish once the request is final."""
+        status = _status_of(event)
+        if status is None or status == RequestStatus.PENDING.value:
+            return
+        with tenant_scope(tenant_id):
+            data = firebase_client.get_help_request(request_id) or {}
+        try:
+            status = RequestStatus(data.get('status', status))
+        except ValueError:
+            logger.warning(f"Unknown status {data.get('status')!r} on request {request_id}")
+            return
+        if status != RequestStatus.PENDING:
+            self.publish(request_id, status, data.get('supervisor_answer'), tenant_id)
+
+
+def _status_of(event: Any) -> Optional[str]:
+    """Status a listener event sets, if it sets one."""
+    if event.path == '/status':
+        return event.data
+    if event.path == '/' and isinstance(event.data, dict):
+        return event.data.get('status')
+    return None
+
+
+# Global resolution events instance
+resolution_events = ResolutionEvents()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Supervisor Digest - Coalesces bursts of supervisor notifications.
+"""
+import hashlib
+import threading
+from typing import Callable, Dict, List
+from src.models.notification import NotificationJob, NotificationKind
+from src.services.notification_service import notification_service
+from src.config.settings import settings
+from src.utils.logger import logger
+
+
+class SupervisorDigest:
+    """
+    Buffers supervisor notification jobs and sends them as one message.
+    
+    Each tenant (salon) has its own buffer, so a digest only ever goes to
+    the supervisors of the salon its requests belong to. A buffer is
+    flushed when `window` seconds have passed since its first job arrived
+    or when it holds `max_items` jobs, whichever comes first. Urgent jobs
+    never wait in a buffer.
+    
+    Buffered jobs are still pending in the outbox, so a crash before the
+    flush only delays them until the next outbox rescan.
+    """
+    
+    def __init__(
+        self,
+        flush_callback: Callable[[List[NotificationJob], NotificationJob], None],
+        window: float = None,
+        max_items: int = None
+    ):
+        self.flush_callback = flush_callback
+        self.window = settings.supervisor_digest_window if window is None else window
+        self.max_items = max_items or settings.supervisor_digest_max_items
+        
+        # Per tenant: buffered jobs and the timer that flushes them
+        self._buffers: Dict[str, List[NotificationJob]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        
+        self.stats = {'digests': 0, 'coalesced': 0}
+    
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_items > 1
+    
+    def accepts(self, job: NotificationJob) -> bool:
+        """Whether a job should wait in the buffer instead of going out now."""
+        return (
+            self.enabled
+            and job.kind == NotificationKind.SUPERVISOR.value
+            and not job.urgent
+        )
+    
+    def add(self, job: NotificationJob):
+        """Buffer a job, flushing its tenant's buffer immediately if full."""
+        tenant_id = job.tenant_id
+        with self._lock:
+            buffer = self._buffers.setdefault(tenant_id, [])
+            buffer.append(job)
+            if len(buffer) >= self.max_items:
+                batch = self._take_locked(tenant_id)
+            else:
+                batch = None
+                if tenant_id not in self._timers:
+                    timer = threading.Timer(self.window, self.flush, args=(tenant_id,))
+                    timer.daemon = True
+                    self._timers[tenant_id] = timer
+                    timer.start()
+        
+        if batch:
+            self._send(batch)
+    
+    def flush(self, tenant_id: str = None):
+        """Send whatever is buffered now, for one tenant or all of them."""
+        with self._lock:
+            tenant_ids = [tenant_id] if tenant_id is not None else list(self._buffers)
+            batches = [self._take_locked(tenant) for tenant in tenant_ids]
+        for batch in batches:
+            if batch:
+                self._send(batch)
+    
+    def cancel(self):
+        """Drop the pending timers; buffered jobs stay pending in the outbox."""
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers = {}
+            self._buffers = {}
+    
+    def _take_locked(self, tenant_id: str) -> List[NotificationJob]:
+        timer = self._timers.pop(tenant_id, None)
+        if timer is not None:
+            timer.cancel()
+        return self._buffers.pop(tenant_id, [])
+    
+    def _send(self, batch: List[NotificationJob]):
+        if len(batch) == 1:
+            self.flush_callback(batch, batch[0])
+            return
+        
+        keys = "|".join(sorted(job.idempotency_key for job in batch))
+        envelope = NotificationJob(
+            kind=NotificationKind.SUPERVISOR,
+            recipient=batch[0].recipient,
+            message=notification_service._format_supervisor_digest(
+                [job.message for job in batch]
+            ),
+            tenant_id=batch[0].tenant_id,
+            idempotency_key=f"digest:{hashlib.sha1(keys.encode()).hexdigest()}"
+        )
+        
+        with self._lock:
+            self.stats['digests'] += 1
+            self.stats['coalesced'] += len(batch)
+        logger.info(f"Sending supervisor digest with {len(batch)} requests")
+        
+        self.flush_callback(batch, envelope)
\ No newline at end of file
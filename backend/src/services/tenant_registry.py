@@ -0,0 +1,233 @@
+"""
+Tenant Registry - Per-salon in-memory state, loaded on demand.
+
+Each tenant (salon location) gets its own knowledge index, answer cache,
+pending question and priority indexes, supervisor loads, analytics store and archive. State is created
+the first time a tenant is used, so a process serving dozens of salons
+only holds the ones it is actually handling. Least recently used tenants
+are evicted when there are more than `tenant_cache_max_tenants` or their
+estimated memory exceeds `tenant_cache_max_bytes`; an evicted tenant is
+simply reloaded from the database on its next request.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, FrozenSet, List, Optional, Tuple
+from src.agents.prompts import DEFAULT_SALON_PROFILE, build_system_prompt
+from src.models.knowledge_base import KnowledgeEntry
+from src.database.firebase_client import firebase_client
+from src.services.question_index import PendingQuestionIndex
+from src.services.priority_index import PendingPriorityIndex
+from src.services.analytics_store import RequestAnalyticsStore
+from src.services.archive_service import ArchiveService, archive_service
+from src.config.settings import settings
+from src.utils.tenant import DEFAULT_TENANT, get_tenant_id
+from src.utils.text import question_tokens
+from src.utils.logger import logger
+
+# Rough per-object overhead used in memory estimates
+ENTRY_OVERHEAD_BYTES = 400
+ANSWER_OVERHEAD_BYTES = 200
+
+
+def _entry_bytes(entry: KnowledgeEntry) -> int:
+    return len(entry.question) + len(entry.answer) + ENTRY_OVERHEAD_BYTES
+
+
+class TenantState:
+    """
+    Everything one tenant keeps in memory.
+    """
+    
+    def __init__(self, tenant_id: str, profile: dict, on_grow: Callable[[str], None] = None):
+        self.tenant_id = tenant_id
+        self.profile = profile
+        self.system_prompt = build_system_prompt(profile)
+        self.pending_index = PendingQuestionIndex(settings.duplicate_escalation_threshold)
+        self.priority_index = PendingPriorityIndex()
+        self.pending_loaded_at = None
+        self.analytics = RequestAnalyticsStore()
+        self.analytics_loaded_at = None
+        self.supervisor_loads = None  # supervisor_id -> pending requests assigned
+        self.supervisor_loads_at = None
+        self.archive = archive_service if tenant_id == DEFAULT_TENANT else ArchiveService(
+            os.path.join(settings.archive_dir, 'tenants', tenant_id)
+        )
+        
+        self._knowledge: Optional[List[Tuple[FrozenSet[str], KnowledgeEntry]]] = None
+        self._knowledge_loaded_at = 0.0
+        self._knowledge_bytes = 0
+        self._answers: OrderedDict = OrderedDict()
+        self._answer_bytes = 0
+        self._on_grow = on_grow
+        self._lock = threading.Lock()
+    
+    @property
+    def salon_name(self) -> str:
+        return self.profile['salon_name']
+    
+    # Knowledge index
+    def _knowledge_fresh(self) -> bool:
+        return (
+            self._knowledge is not None
+            and time.monotonic() - self._knowledge_loaded_at < settings.tenant_knowledge_ttl
+        )
+    
+    def knowledge_index(
+        self,
+        loader: Callable[[], List[KnowledgeEntry]]
+    ) -> List[Tuple[FrozenSet[str], KnowledgeEntry]]:
+        """
+        Knowledge entries with their question tokens precomputed.
+        
+        Reloaded through `loader` after `tenant_knowledge_ttl` seconds
+        (to see entries added by other processes) or after this process
+        changed the knowledge base.
+        """
+        with self._lock:
+            if not self._knowledge_fresh():
+                entries = loader()
+                self._knowledge = [(question_tokens(e.question), e) for e in entries]
+                self._knowledge_loaded_at = time.monotonic()
+                self._knowledge_bytes = sum(_entry_bytes(e) for e in entries)
+                # Cached answers may rest on knowledge that just changed
+                self._answers.clear()
+                self._answer_bytes = 0
+                reloaded = True
+            else:
+                reloaded = False
+            index = self._knowledge
+        
+        if reloaded and self._on_grow:
+            self._on_grow(self.tenant_id)
+        return index
+    
+    def invalidate_knowledge(self):
+        """Drop the knowledge index and the answers derived from it."""
+        with self._lock:
+            self._knowledge = None
+            self._knowledge_bytes = 0
+            self._answers.clear()
+            self._answer_bytes = 0
+    
+    # Answer cache
+    def get_answer(self, key: str):
+        """Cached answer for a normalized question, while the knowledge is fresh."""
+        with self._lock:
+            if not self._knowledge_fresh():
+                return None
+            cached = self._answers.get(key)
+            if cached is None:
+                return None
+            self._answers.move_to_end(key)
+            return cached[0]
+    
+    def put_answer(self, key: str, answer, size: int):
+        """Cache an answer, evicting the least recently used beyond the cap."""
+        with self._lock:
+            if key in self._answers:
+                return
+            self._answers[key] = (answer, size + ANSWER_OVERHEAD_BYTES)
+            self._answer_bytes += size + ANSWER_OVERHEAD_BYTES
+            while len(self._answers) > settings.tenant_answer_cache_size:
+                _, (_, old_size) = self._answers.popitem(last=False)
+                self._answer_bytes -= old_size
+    
+    def size_bytes(self) -> int:
+        """Estimated memory held by this tenant."""
+        return (
+            self._knowledge_bytes
+            + self._answer_bytes
+            + self.analytics.nbytes()
+            + (len(self.pending_index) + len(self.priority_index)) * ANSWER_OVERHEAD_BYTES
+        )
+
+
+class TenantRegistry:
+    """
+    LRU cache of TenantState with a tenant count and memory quota.
+    """
+    
+    def __init__(self, max_tenants: int = None, max_bytes: int = None):
+        self.max_tenants = max_tenants or settings.tenant_cache_max_tenants
+        self.max_bytes = max_bytes or settings.tenant_cache_max_bytes
+        self._tenants: OrderedDict = OrderedDict()
+        self.stats = {'loads': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+    
+    def get(self, tenant_id: Optional[str] = None) -> TenantState:
+        """State of a tenant (the current one by default), loading it if needed."""
+        tenant_id = tenant_id or get_tenant_id()
+        with self._lock:
+            state = self._tenants.get(tenant_id)
+            if state is not None:
+                self._tenants.move_to_end(tenant_id)
+                return state
+        
+        state = TenantState(tenant_id, self._load_profile(tenant_id), self.enforce_quota)
+        
+        with self._lock:
+            # Another thread may have loaded it meanwhile
+            existing = self._tenants.get(tenant_id)
+            if existing is not None:
+                self._tenants.move_to_end(tenant_id)
+                return existing
+            self._tenants[tenant_id] = state
+            self.stats['loads'] += 1
+            self._evict_locked(keep=tenant_id)
+        logger.info(f"Loaded tenant {tenant_id}")
+        return state
+    
+    @staticmethod
+    def _load_profile(tenant_id: str) -> dict:
+        """Salon profile of a tenant, defaults filling anything missing."""
+        if tenant_id == DEFAULT_TENANT:
+            return dict(DEFAULT_SALON_PROFILE)
+        profile = firebase_client.get_tenant_profile(tenant_id)
+        if not profile:
+            logger.warning(f"No profile for tenant {tenant_id}; using defaults")
+        return {**DEFAULT_SALON_PROFILE, **(profile or {})}
+    
+    def enforce_quota(self, keep: Optional[str] = None):
+        """Evict cold tenants until within the count and memory limits."""
+        with self._lock:
+            self._evict_locked(keep)
+    
+    def _evict_locked(self, keep: Optional[str]):
+        total = sum(state.size_bytes() for state in self._tenants.values())
+        for tenant_id in list(self._tenants):
+            if len(self._tenants) <= self.max_tenants and total <= self.max_bytes:
+                break
+            if tenant_id == keep:
+                continue
+            total -= self._tenants.pop(tenant_id).size_bytes()
+            self.stats['evictions'] += 1
+            logger.info(f"Evicted cold tenant {tenant_id}")
+    
+    def loaded(self) -> List[str]:
+        """Loaded tenant ids, least recently used first."""
+        with self._lock:
+            return list(self._tenants)
+    
+    def clear(self):
+        with self._lock:
+            self._tenants.clear()
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'tenants': {
+                    tenant_id: state.size_bytes() for tenant_id, state in self._tenants.items()
+                }
+            }
+
+
+def all_tenant_ids() -> List[str]:
+    """The default tenant plus every tenant with its own data."""
+    return [DEFAULT_TENANT] + [t for t in firebase_client.get_tenant_ids() if t != DEFAULT_TENANT]
+
+
+# Global registry
+tenant_registry = TenantRegistry()
\ No newline at end of file
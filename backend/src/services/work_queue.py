@@ -0,0 +1,351 @@
+"""
+Work Queue - Assignment, claiming and load balancing of help requests.
+
+New requests are routed to the least-loaded active supervisor whose
+skills cover the request's category. A supervisor works on a request by
+claiming it: the claim is a lease written in a database transaction, so
+only one supervisor holds a request at a time, and a lease that is not
+renewed simply expires and the request goes back to the queue.
+Resolving goes through the same transaction, which closes the race
+where two supervisors could both resolve the same pending request.
+"""
+import threading
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+from src.models.help_request import HelpRequest, RequestStatus
+from src.models.supervisor import Supervisor
+from src.database.firebase_client import firebase_client
+from src.services.tenant_registry import tenant_registry
+from src.services.priority_index import effective_deadline
+from src.config.settings import settings
+from src.utils.logger import logger
+
+# How often supervisor loads are recounted from the database to pick up
+# assignments made by other processes
+LOAD_REFRESH_SECONDS = 30
+
+
+class ClaimOutcome(str, Enum):
+    """Result of a transactional claim, release or completion."""
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    NOT_PENDING = "not_pending"
+    HELD = "held"  # Another supervisor holds a live lease
+
+
+def lease_holder(data: dict, now: datetime) -> Optional[str]:
+    """Supervisor holding a live lease on a stored request, if any."""
+    holder = data.get('claimed_by')
+    expires_at = data.get('lease_expires_at')
+    if not holder or not expires_at:
+        return None
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    return holder if expires_at > now else None
+
+
+class WorkQueue:
+    """
+    Routes pending help requests to supervisors of the current tenant.
+    """
+    
+    def __init__(self, lease_seconds: int = None):
+        self.lease_seconds = lease_seconds or settings.work_queue_lease_seconds
+        self.stats = {'assigned': 0, 'unassigned': 0, 'claims': 0, 'conflicts': 0}
+        self._lock = threading.Lock()
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    # Supervisors
+    def save_supervisor(self, supervisor: Supervisor) -> bool:
+        """Register or update a supervisor's skills, capacity and shift."""
+        supervisor.updated_at = datetime.utcnow()
+        return firebase_client.save_supervisor(supervisor.supervisor_id, supervisor.to_dict())
+    
+    def get_supervisors(self) -> List[Supervisor]:
+        """All supervisors of the tenant."""
+        return [Supervisor.from_dict(data) for data in firebase_client.get_supervisors()]
+    
+    # Assignment
+    def _loads(self) -> Dict[str, int]:
+        """Pending requests assigned to each supervisor, recounted when stale."""
+        tenant = tenant_registry.get()
+        now = datetime.utcnow()
+        loaded_at = tenant.supervisor_loads_at
+        if loaded_at and (now - loaded_at).total_seconds() < LOAD_REFRESH_SECONDS:
+            return tenant.supervisor_loads
+        
+        loads: Dict[str, int] = {}
+        for data in firebase_client.get_all_help_requests(RequestStatus.PENDING.value):
+            assignee = data.get('assigned_to')
+            if assignee:
+                loads[assignee] = loads.get(assignee, 0) + 1
+        tenant.supervisor_loads = loads
+        tenant.supervisor_loads_at = now
+        return loads
+    
+    def _move_load(self, from_id: Optional[str], to_id: Optional[str]):
+        """Track a request changing hands until the next recount."""
+        loads = tenant_registry.get().supervisor_loads
+        if loads is None or from_id == to_id:
+            return
+        with self._lock:
+            if from_id and loads.get(from_id):
+                loads[from_id] -= 1
+            if to_id:
+                loads[to_id] = loads.get(to_id, 0) + 1
+    
+    def choose_assignee(self, category: Optional[str]) -> Optional[str]:
+        """
+        Least-loaded active supervisor who handles `category` and has
+        spare capacity, or None if everyone is full or off shift.
+        """
+        loads = self._loads()
+        candidates = [
+            supervisor for supervisor in self.get_supervisors()
+            if supervisor.active
+            and supervisor.handles(category)
+            and loads.get(supervisor.supervisor_id, 0) < supervisor.capacity
+        ]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda s: (
+            loads.get(s.supervisor_id, 0) / s.capacity,
+            loads.get(s.supervisor_id, 0),
+            s.supervisor_id
+        ))
+        return best.supervisor_id
+    
+    def assign(self, help_request: HelpRequest) -> Optional[str]:
+        """
+        Route a new request before it is saved.
+        
+        Unassigned requests stay in the shared queue for any supervisor
+        who handles their category.
+        """
+        assignee = self.choose_assignee(help_request.category)
+        help_request.assigned_to = assignee
+        if assignee:
+            self._move_load(None, assignee)
+            self._count('assigned')
+            logger.info(f"Assigned request {help_request.request_id} to {assignee}")
+        else:
+            self._count('unassigned')
+        return assignee
+    
+    def finished(self, help_request: HelpRequest):
+        """A request left the queue (resolved or timed out)."""
+        self._move_load(help_request.assigned_to, None)
+    
+    # Claiming
+    def _transact(
+        self,
+        request_id: str,
+        decide: Callable[[dict, datetime], Tuple[ClaimOutcome, Optional[dict]]]
+    ) -> Tuple[ClaimOutcome, Optional[dict]]:
+        """
+        Run `decide` on the stored request inside a transaction.
+        
+        `decide(data, now)` returns the outcome and the new data (None
+        to leave it unchanged). The database may call it several times;
+        the outcome of the attempt that committed is returned.
+        """
+        result = {}
+        
+        def update(current):
+            if not current:
+                result['outcome'], result['data'] = ClaimOutcome.NOT_FOUND, None
+                return current
+            outcome, new_data = decide(dict(current), datetime.utcnow())
+            result['outcome'] = outcome
+            result['data'] = new_data if new_data is not None else current
+            return result['data']
+        
+        if not firebase_client.run_transaction(f"help_requests/{request_id}", update):
+            raise Exception("Database error")
+        return result['outcome'], result['data']
+    
+    def claim(
+        self,
+        request_id: str,
+        supervisor_id: str,
+        lease_seconds: int = None
+    ) -> Tuple[ClaimOutcome, Optional[dict]]:
+        """
+        Take (or renew) the lease on a pending request.
+        
+        Fails with HELD while another supervisor's lease is live; an
+        expired lease can be taken over.
+        """
+        lease = timedelta(seconds=lease_seconds or self.lease_seconds)
+        previous = {}
+        
+        def decide(data, now):
+            if data.get('status') != RequestStatus.PENDING.value:
+                return ClaimOutcome.NOT_PENDING, None
+            holder = lease_holder(data, now)
+            if holder and holder != supervisor_id:
+                return ClaimOutcome.HELD, None
+            previous['assignee'] = data.get('assigned_to')
+            data.update({
+                'assigned_to': supervisor_id,
+                'claimed_by': supervisor_id,
+                'lease_expires_at': (now + lease).isoformat(),
+                'updated_at': now.isoformat()
+            })
+            return ClaimOutcome.OK, data
+        
+        outcome, data = self._transact(request_id, decide)
+        if outcome == ClaimOutcome.OK:
+            self._move_load(previous.get('assignee'), supervisor_id)
+            self._count('claims')
+        elif outcome == ClaimOutcome.HELD:
+            self._count('conflicts')
+        return outcome, data
+    
+    def release(self, request_id: str, supervisor_id: str) -> Tuple[ClaimOutcome, Optional[dict]]:
+        """Give a claimed request back to the queue, keeping the assignment."""
+        def decide(data, now):
+            if data.get('status') != RequestStatus.PENDING.value:
+                return ClaimOutcome.NOT_PENDING, None
+            holder = lease_holder(data, now)
+            if holder and holder != supervisor_id:
+                return ClaimOutcome.HELD, None
+            data.update({'claimed_by': None, 'lease_expires_at': None, 'updated_at': now.isoformat()})
+            return ClaimOutcome.OK, data
+        
+        return self._transact(request_id, decide)
+    
+    def complete(
+        self,
+        request_id: str,
+        supervisor_id: Optional[str],
+        updates: dict
+    ) -> Tuple[ClaimOutcome, Optional[dict]]:
+        """
+        Apply the final transition of a pending request.
+        
+        Succeeds for exactly one caller: the request must still be
+        pending and not leased to a different supervisor (any live
+        lease, when `supervisor_id` is None).
+        """
+        def decide(data, now):
+            if data.get('status') != RequestStatus.PENDING.value:
+                return ClaimOutcome.NOT_PENDING, None
+            holder = lease_holder(data, now)
+            if holder and holder != supervisor_id:
+                return ClaimOutcome.HELD, None
+            data.update(updates)
+            data.update({'claimed_by': None, 'lease_expires_at': None})
+            return ClaimOutcome.OK, data
+        
+        outcome, data = self._transact(request_id, decide)
+        if outcome == ClaimOutcome.HELD and supervisor_id:
+            self._count('conflicts')
+        return outcome, data
+    
+    def next_request(self, supervisor_id: str) -> Optional[HelpRequest]:
+        """
+        Claim the oldest pending request this supervisor should work on.
+        
+        Requests assigned to them come first, then unassigned ones in a
+        category they handle, then ones whose assignee is off shift; each
+        group earliest effective deadline first. Requests under someone
+        else's live lease are skipped.
+        """
+        supervisors = {s.supervisor_id: s for s in self.get_supervisors()}
+        me = supervisors.get(supervisor_id) or Supervisor(supervisor_id=supervisor_id)
+        now = datetime.utcnow()
+        
+        def rank(data: dict) -> Optional[int]:
+            holder = lease_holder(data, now)
+            if holder:
+                return 0 if holder == supervisor_id else None
+            assignee = data.get('assigned_to')
+            if assignee == supervisor_id:
+                return 0
+            if not me.handles(data.get('category')):
+                return None
+            if not assignee:
+                return 1
+            other = supervisors.get(assignee)
+            return 2 if other is None or not other.active else None
+        
+        candidates = []
+        for data in firebase_client.get_all_help_requests(RequestStatus.PENDING.value):
+            order = rank(data)
+            if order is not None:
+                deadline = effective_deadline(HelpRequest.from_dict(data))
+                candidates.append((order, deadline, data['request_id']))
+        
+        for _, _, request_id in sorted(candidates):
+            outcome, data = self.claim(request_id, supervisor_id)
+            if outcome == ClaimOutcome.OK:
+                return HelpRequest.from_dict(data)
+        return None
+    
+    # Metrics
+    def get_metrics(self) -> dict:
+        """
+        Queue depth, wait times and per-supervisor load, for staffing.
+        
+        Waits are measured from creation for requests still pending.
+        """
+        now = datetime.utcnow()
+        pending = HelpRequest.from_dict_batch(
+            firebase_client.get_all_help_requests(RequestStatus.PENDING.value)
+        )
+        supervisors = self.get_supervisors()
+        
+        waits = sorted((now - r.created_at).total_seconds() for r in pending)
+        by_category: Dict[str, int] = {}
+        per_supervisor = {
+            s.supervisor_id: {'assigned': 0, 'claimed': 0, 'capacity': s.capacity, 'active': s.active}
+            for s in supervisors
+        }
+        unclaimed = unassigned = 0
+        
+        for request in pending:
+            category = request.category or 'uncategorized'
+            by_category[category] = by_category.get(category, 0) + 1
+            
+            holder = request.claimed_by if (
+                request.lease_expires_at and request.lease_expires_at > now
+            ) else None
+            if not holder:
+                unclaimed += 1
+            if not request.assigned_to:
+                unassigned += 1
+            
+            for supervisor_id, key in ((request.assigned_to, 'assigned'), (holder, 'claimed')):
+                if supervisor_id:
+                    row = per_supervisor.setdefault(
+                        supervisor_id,
+                        {'assigned': 0, 'claimed': 0, 'capacity': 0, 'active': False}
+                    )
+                    row[key] += 1
+        
+        capacity = sum(s.capacity for s in supervisors if s.active)
+        with self._lock:
+            stats = dict(self.stats)
+        
+        return {
+            'depth': len(pending),
+            'unclaimed': unclaimed,
+            'unassigned': unassigned,
+            'by_category': by_category,
+            'oldest_wait_seconds': round(waits[-1], 1) if waits else None,
+            'avg_wait_seconds': round(sum(waits) / len(waits), 1) if waits else None,
+            'p90_wait_seconds': round(waits[int(0.9 * (len(waits) - 1))], 1) if waits else None,
+            'active_capacity': capacity,
+            'utilization': round(len(pending) / capacity, 3) if capacity else None,
+            'supervisors': per_supervisor,
+            'stats': stats
+        }
+
+
+# Global queue instance
+work_queue = WorkQueue()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Admission control for slow backends (the LLM API, full database reads).
+
+Each backend gets a ConcurrencyLimiter: a fixed number of calls run at
+once and a bounded number wait for a slot. When the wait queue is full
+the call is shed at once with AdmissionDeniedError instead of joining a
+queue it would time out in anyway, so callers can degrade (answer from
+cache, escalate, return 503) while the backend drains.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from src.config.settings import settings
+from src.utils.exceptions import AdmissionDeniedError
+from src.utils.logger import logger
+
+# How often async waiters look for a free slot
+ASYNC_POLL_SECONDS = 0.01
+
+
+class ConcurrencyLimiter:
+    """
+    Thread-safe concurrency limit with a bounded, timed wait queue.
+    
+    Usable from threads (`admit`) and from the event loop (`aadmit`);
+    both share the same slots.
+    """
+    
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.stats = {'admitted': 0, 'queued': 0, 'shed': 0, 'timed_out': 0}
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+    
+    def _enter_or_queue_locked(self) -> bool:
+        """
+        Take a slot if one is free, else join the queue.
+        
+        Returns:
+            True if admitted, False if queued
+        """
+        if self._active < self.max_concurrent:
+            self._active += 1
+            self.stats['admitted'] += 1
+            return True
+        if self._waiting >= self.max_queue:
+            self.stats['shed'] += 1
+            logger.warning(
+                f"Shed {self.name} call: {self._active} running, {self._waiting} waiting"
+            )
+            raise AdmissionDeniedError(f"{self.name} is overloaded")
+        self._waiting += 1
+        self.stats['queued'] += 1
+        return False
+    
+    def _leave_queue_locked(self, admitted: bool):
+        self._waiting -= 1
+        if admitted:
+            self._active += 1
+            self.stats['admitted'] += 1
+        else:
+            self.stats['timed_out'] += 1
+            logger.warning(f"{self.name} call waited {self.queue_timeout}s for a slot")
+    
+    def acquire(self):
+        """Take a slot, waiting up to `queue_timeout` (raises AdmissionDeniedError)."""
+        with self._cond:
+            if self._enter_or_queue_locked():
+                return
+            admitted = self._cond.wait_for(
+                lambda: self._active < self.max_concurrent, self.queue_timeout
+            )
+            self._leave_queue_locked(admitted)
+        if not admitted:
+            raise AdmissionDeniedError(f"Timed out waiting for {self.name}")
+    
+    async def aacquire(self):
+        """acquire() without blocking the event loop."""
+        with self._cond:
+            if self._enter_or_queue_locked():
+                return
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                await asyncio.sleep(ASYNC_POLL_SECONDS)
+                with self._cond:
+                    admitted = self._active < self.max_concurrent
+                    if admitted or time.monotonic() >= deadline:
+                        self._leave_queue_locked(admitted)
+                        break
+        except asyncio.CancelledError:
+            with self._cond:
+                self._waiting -= 1
+            raise
+        if not admitted:
+            raise AdmissionDeniedError(f"Timed out waiting for {self.name}")
+    
+    def release(self):
+        """Give a slot back."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+    
+    @contextmanager
+    def admit(self):
+        """Run a block in a slot."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    @asynccontextmanager
+    async def aadmit(self):
+        """Run a block in a slot, waiting without blocking the loop."""
+        await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {**self.stats, 'running': self._active, 'waiting': self._waiting}
+
+
+# Global limiter instances
+llm_limiter = ConcurrencyLimiter(
+    "llm", settings.llm_max_concurrent, settings.llm_max_queue, settings.llm_queue_timeout
+)
+database_limiter = ConcurrencyLimiter(
+    "database", settings.db_max_concurrent, settings.db_max_queue, settings.db_queue_timeout
+)
\ No newline at end of file
@@ -18,6 +18,21 @@ class HelpRequestNotFoundError(Exception):
     pass
 
 
+class RequestClaimedError(Exception):
+    """Raised when another supervisor holds the lease on a help request."""
+    pass
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Raised when an Idempotency-Key is replayed with a different request body."""
+    pass
+
+
 class ValidationError(Exception):
     """Raised when input validation fails."""
+    pass
+
+
+class AdmissionDeniedError(Exception):
+    """Raised when a call is shed because its backend is saturated."""
     pass
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Fast conversion helpers between stored dicts and Pydantic models.
+
+Large lists go through one cached list adapter per model, which keeps
+the whole conversion inside pydantic-core instead of paying Python call
+overhead for every row.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Sequence, Type
+from pydantic import BaseModel, TypeAdapter
+
+
+def parse_datetime_fields(data: dict, fields: Sequence[str]) -> dict:
+    """
+    Copy `data` with ISO datetime strings in `fields` parsed.
+    
+    The caller's dict is left untouched.
+    """
+    parsed = dict(data)
+    for field in fields:
+        value = parsed.get(field)
+        if value and isinstance(value, str):
+            parsed[field] = datetime.fromisoformat(value)
+    return parsed
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """One compiled list validator/serializer per model class."""
+    return TypeAdapter(List[model])
+
+
+def load_models(model: Type[BaseModel], rows: List[dict]) -> list:
+    """
+    Build many model instances in one call.
+    
+    Noticeably faster than calling the model per row on large lists, and
+    the input dicts are not modified.
+    """
+    return _list_adapter(model).validate_python(rows)
+
+
+def dump_models(model: Type[BaseModel], items: List[BaseModel]) -> list:
+    """
+    Serialize many model instances in one call.
+    
+    Datetimes and enums are left as Python objects; orjson encodes
+    them natively, so the result can go straight into an ORJSONResponse.
+    """
+    return _list_adapter(model).dump_python(items)
\ No newline at end of file
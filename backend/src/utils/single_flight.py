@@ -0,0 +1,114 @@
+"""
+Single-flight call coalescing.
+
+When several callers ask for the same thing at the same time, only the
+first one does the work; the others wait for it and share its result
+(or its exception).
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    """One in-flight call and the callers waiting on it."""
+    __slots__ = ('event', 'result', 'error')
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls made from threads.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {'executed': 0, 'deduplicated': 0}
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn` unless a call with the same key is already running.
+        
+        Args:
+            key: Identity of the call
+            fn: Work to run if this caller is first
+        
+        Returns:
+            The result of the single shared call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+            else:
+                self.stats['deduplicated'] += 1
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent identical coroutine calls on one event loop.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.stats = {'executed': 0, 'deduplicated': 0}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` unless an identical call is already in flight.
+        
+        If the caller doing the work is cancelled, a waiting caller that
+        was not cancelled itself runs the call instead.
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            self.stats['deduplicated'] += 1
+            try:
+                # Shield so one waiter being cancelled does not cancel the rest
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # This waiter was cancelled
+            future = self._calls.get(key)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.stats['executed'] += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a call nobody else waited on does not warn
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
\ No newline at end of file
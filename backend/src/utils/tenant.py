@@ -0,0 +1,88 @@
+"""
+Tenant (salon location) context.
+
+The current tenant lives in a ContextVar, so it follows each API request,
+agent job and asyncio.to_thread call without being passed around. The
+default tenant keeps the original root-level database paths; every other
+tenant's data lives under /tenants/{tenant_id}/.
+"""
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from src.config.settings import settings
+
+DEFAULT_TENANT = "default"
+
+# Top-level collections that belong to a tenant
+TENANT_COLLECTIONS = frozenset({
+    'help_requests', 'knowledge_base', 'knowledge_redirects', 'customers', 'analytics_rollups',
+    'supervisors', 'customer_requests', 'collection_versions'
+})
+
+_TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+_current_tenant: ContextVar[str] = ContextVar('tenant_id', default=DEFAULT_TENANT)
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    """Normalized tenant id (raises ValueError if unusable as a path segment)."""
+    tenant_id = (tenant_id or '').strip().lower()
+    if not _TENANT_ID.match(tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+    return tenant_id
+
+
+def get_tenant_id() -> str:
+    """Tenant of the current request, job or task."""
+    return _current_tenant.get()
+
+
+def set_tenant(tenant_id: str):
+    """Set the tenant for the current context; returns a reset token."""
+    return _current_tenant.set(validate_tenant_id(tenant_id))
+
+
+def reset_tenant(token):
+    """Restore the tenant that was current before set_tenant()."""
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def tenant_scope(tenant_id: str) -> Iterator[str]:
+    """Run a block as `tenant_id`."""
+    token = set_tenant(tenant_id)
+    try:
+        yield get_tenant_id()
+    finally:
+        reset_tenant(token)
+
+
+def tenant_path(path: str, tenant_id: Optional[str] = None) -> str:
+    """
+    Database path of `path` for a tenant.
+    
+    Paths outside the tenant collections (e.g. the notification outbox)
+    and paths that are already tenant-qualified are returned unchanged.
+    """
+    tenant_id = tenant_id or get_tenant_id()
+    if tenant_id == DEFAULT_TENANT or path.split('/', 1)[0] not in TENANT_COLLECTIONS:
+        return path
+    return f"tenants/{tenant_id}/{path}"
+
+
+def tenant_from_room(room_name: str) -> str:
+    """
+    Tenant encoded in a LiveKit room name.
+    
+    Rooms are named "{tenant_id}{separator}{anything}", e.g.
+    "downtown__call-8f2c"; rooms without the separator (or with an
+    invalid prefix) belong to the default tenant.
+    """
+    separator = settings.tenant_room_separator
+    if not separator or separator not in (room_name or ''):
+        return DEFAULT_TENANT
+    try:
+        return validate_tenant_id(room_name.split(separator, 1)[0])
+    except ValueError:
+        return DEFAULT_TENANT
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Text normalization helpers for comparing customer questions.
+"""
+import re
+from typing import FrozenSet
+
+
+# Words that carry no meaning for telling salon questions apart
+STOPWORDS = frozenset("""
+a about am an and any anything are at be can could did do does doing for
+from get got have hello hey hi i if in is it its me my of offer offers
+on or please provide provides so some tell that the there this to us we
+whether will with would you your
+""".split())
+
+# Words that set what kind of answer a question wants ("where is
+# parking?" is not "do you have parking?"); two questions only match
+# when they agree on these
+QUESTION_WORDS = frozenset("how what when where which who why".split())
+
+# Negations, all read as NEGATION ("isn't" and "not" mean the same)
+NEGATION = "not"
+NEGATIONS = frozenset("""
+aint arent cannot cant didnt doesnt dont isnt never no not wasnt werent without wont
+""".split())
+
+_QUALIFIERS = QUESTION_WORDS | {NEGATION}
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace.
+    
+    Args:
+        text: Raw text
+    
+    Returns:
+        Normalized text
+    """
+    text = _NON_WORD.sub(" ", text.lower().replace("'", ""))
+    return _SPACES.sub(" ", text).strip()
+
+
+def _stem(word: str) -> str:
+    """Very light plural stripping ("extensions" -> "extension")."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def question_tokens(text: str) -> FrozenSet[str]:
+    """
+    Content words of a question, used as its similarity signature.
+    
+    Args:
+        text: Question text
+    
+    Returns:
+        Set of normalized, stemmed, non-stopword tokens; question words
+        are kept and negations become NEGATION
+    """
+    return frozenset(
+        NEGATION if word in NEGATIONS else _stem(word)
+        for word in normalize_text(text).split()
+        if word not in STOPWORDS
+    )
+
+
+def token_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """
+    Dice coefficient between two token sets.
+    
+    Returns:
+        1.0 for identical sets; 0.0 when nothing is shared, either is
+        empty, or they differ in question words or negation
+    """
+    if not a or not b or a & _QUALIFIERS != b & _QUALIFIERS:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
\ No newline at end of file
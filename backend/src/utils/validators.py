@@ -20,6 +20,24 @@ def validate_phone_number(phone: str) -> bool:
     return bool(re.match(pattern, phone.replace(' ', '').replace('-', '')))
 
 
+def normalize_phone_number(phone: Optional[str]) -> Optional[str]:
+    """
+    Canonical form of a phone number: digits with an optional leading '+'.
+    
+    Args:
+        phone: Phone number as typed or dialed, e.g. "+1 (555) 123-4567"
+    
+    Returns:
+        Normalized number (e.g. "+15551234567"), or None if it is not a
+        valid phone number
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    normalized = ('+' if phone.startswith('+') else '') + re.sub(r'\D', '', phone)
+    return normalized if validate_phone_number(normalized) else None
+
+
 def sanitize_phone_for_key(phone: str) -> str:
     """
     Sanitize phone number for use as Firebase key.
@@ -33,6 +51,21 @@ def sanitize_phone_for_key(phone: str) -> str:
     return phone.replace('+', '_').replace(' ', '').replace('-', '')
 
 
+def sanitize_key(value: str) -> str:
+    """
+    Replace characters Firebase does not allow in keys.
+    
+    Args:
+        value: Arbitrary identifier
+    
+    Returns:
+        String safe to use as a single path segment
+    """
+    for char in '.$#[]/':
+        value = value.replace(char, '_')
+    return value
+
+
 def validate_text_length(text: str, min_length: int = 1, max_length: int = 1000) -> bool:
     """
     Validate text length.
@@ -0,0 +1,118 @@
+"""
+Tests for rate limiting, load shedding and degraded answering.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.middleware import RateLimitMiddleware
+from src.models.knowledge_base import KnowledgeEntry
+from src.services.ai_service import ai_service
+from src.services.knowledge_service import knowledge_service
+from src.services.answer_engine import AnswerEngine, AnswerTier
+from src.services.tenant_registry import tenant_registry
+from src.utils.admission import ConcurrencyLimiter
+from src.utils.exceptions import AdmissionDeniedError
+
+
+def test_limiter_queues_then_sheds():
+    """Test that calls wait for a slot, and are shed once the queue is full."""
+    limiter = ConcurrencyLimiter("test", max_concurrent=1, max_queue=1, queue_timeout=2.0)
+    limiter.acquire()
+    
+    waited = []
+    
+    def waiter():
+        with limiter.admit():
+            waited.append(True)
+    
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while limiter.get_stats()['waiting'] < 1:
+        time.sleep(0.001)
+    
+    # One running, one waiting: the next call is turned away at once
+    with pytest.raises(AdmissionDeniedError):
+        limiter.acquire()
+    
+    limiter.release()
+    thread.join()
+    assert waited == [True]
+    assert limiter.get_stats() == {
+        'admitted': 2, 'queued': 1, 'shed': 1, 'timed_out': 0, 'running': 0, 'waiting': 0
+    }
+
+
+def test_limiter_queue_timeout_async():
+    """Test that async waiters give up after queue_timeout without leaking slots."""
+    limiter = ConcurrencyLimiter("test", max_concurrent=1, max_queue=5, queue_timeout=0.05)
+    
+    async def scenario():
+        async with limiter.aadmit():
+            with pytest.raises(AdmissionDeniedError):
+                await limiter.aacquire()
+        async with limiter.aadmit():
+            pass
+    
+    asyncio.run(scenario())
+    stats = limiter.get_stats()
+    assert stats['timed_out'] == 1
+    assert stats['running'] == 0 and stats['waiting'] == 0
+
+
+def test_rate_limit_per_client():
+    """Test 429 with Retry-After once a client's bucket is empty."""
+    app = FastAPI()
+    
+    @app.get("/items")
+    async def items():
+        return []
+    
+    app.add_middleware(RateLimitMiddleware, rate=0.5, burst=2)
+    client = TestClient(app)
+    
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 200
+    limited = client.get("/items")
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "2"
+    
+    # Naming another client or tenant doesn't get a fresh bucket
+    headers = {"X-Client-ID": "dashboard-2", "X-Tenant-ID": "downtown"}
+    assert client.get("/items", headers=headers).status_code == 429
+
+
+def test_rate_limit_trusts_client_header_from_proxy():
+    """Test that X-Client-ID names the client only behind a trusted proxy."""
+    limiter = RateLimitMiddleware(None, rate=1, burst=1, trusted_proxies=["10.0.0.1"])
+    
+    def scope(peer, client_id):
+        return {"client": (peer, 443), "headers": [(b"x-client-id", client_id)]}
+    
+    assert limiter.client_key(scope("10.0.0.1", b"dashboard-1")) == ("default", "dashboard-1")
+    assert limiter.client_key(scope("10.0.0.1", b"")) == ("default", "10.0.0.1")
+    assert limiter.client_key(scope("203.0.113.9", b"dashboard-1")) == ("203.0.113.9",)
+
+
+def test_answer_engine_degrades_when_llm_shed(monkeypatch):
+    """Test looser knowledge answers, then escalation, when the LLM is shed."""
+    entries = [KnowledgeEntry(question="Do you offer balayage?", answer="Yes, from $150.")]
+    
+    def check_if_needs_help(question, knowledge_list, customer_context=""):
+        raise AdmissionDeniedError("llm is overloaded")
+    
+    monkeypatch.setattr(knowledge_service, "get_all_knowledge", lambda: entries)
+    monkeypatch.setattr(knowledge_service, "record_usage", lambda entry_id: None)
+    monkeypatch.setattr(ai_service, "check_if_needs_help", check_if_needs_help)
+    tenant_registry.clear()
+    engine = AnswerEngine(min_score=0.8, min_confidence=0.9, rephrase=False)
+    
+    # Too loose a match for the fast path, good enough while overloaded
+    result = engine.answer("balayage for long hair")
+    assert result.tier == AnswerTier.KNOWLEDGE
+    assert result.answer == "Yes, from $150."
+    
+    assert engine.answer("Which stylist is in on Friday?").tier == AnswerTier.ESCALATE
+    assert engine.degraded == 2
\ No newline at end of file
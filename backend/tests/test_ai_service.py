@@ -25,4 +25,131 @@ def test_extract_keywords():
     keywords = ai_service.extract_keywords(text)
     
     assert isinstance(keywords, list)
-    assert len(keywords) > 0
\ No newline at end of file
+    assert len(keywords) > 0
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response."""
+    
+    def __init__(self, content: str, tokens: int):
+        self._body = {
+            "choices": [{"message": {"content": content}}],
+            "usage": {"total_tokens": tokens}
+        }
+    
+    def raise_for_status(self):
+        pass
+    
+    def json(self):
+        return self._body
+
+
+def test_cascade_escalates_only_when_small_model_is_unsure(monkeypatch):
+    """Test small-model-first answering and per-model cost tracking."""
+    import json
+    from src.services import ai_service as ai_module
+    
+    service = ai_module.AIService()
+    service.task_models[ai_module.TASK_ANSWERABILITY] = "small"
+    service.task_models[ai_module.TASK_ANSWER] = "large"
+    service.cost_per_1k_tokens = {"small": 1.0, "large": 10.0}
+    
+    def fake_post(url, headers, data, timeout):
+        payload = json.loads(data)
+        question = payload["messages"][-1]["content"]
+        if payload["model"] == "small":
+            answer = "I think it might be $50" if "price" in question else "We open at 9 AM."
+        else:
+            answer = "A haircut is $45-75."
+        return FakeResponse(answer, tokens=100)
+    
+    monkeypatch.setattr(ai_module.requests, "post", fake_post)
+    
+    assert service.check_if_needs_help("When do you open?", []) == (False, "We open at 9 AM.")
+    assert service.check_if_needs_help("What's the price?", []) == (False, "A haircut is $45-75.")
+    
+    stats = service.get_stats()
+    assert stats["cascade"] == {"answered_by_small": 1, "escalated_to_large": 1}
+    assert stats["models"]["small"]["calls"] == 2
+    assert stats["models"]["large"]["calls"] == 1
+    assert stats["models"]["large"]["cost_usd"] == 1.0
+
+def test_identical_concurrent_calls_share_one_request(monkeypatch):
+    """Test single-flight deduplication on the sync and async paths."""
+    import asyncio
+    import threading
+    import time
+    from src.services import ai_service as ai_module
+    
+    service = ai_module.AIService()
+    messages = [{"role": "user", "content": "When do you open?"}]
+    posts = []
+    release = threading.Event()
+    
+    def fake_post(url, headers, data, timeout):
+        posts.append(data)
+        release.wait(5)
+        return FakeResponse("We open at 9 AM.", tokens=10)
+    
+    monkeypatch.setattr(ai_module.requests, "post", fake_post)
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.generate_response(messages)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while service._single_flight.stats['deduplicated'] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert results == ["We open at 9 AM."] * 5
+    assert len(posts) == 1
+    
+    class FakeAsyncClient:
+        async def post(self, url, headers, content, timeout):
+            posts.append(content)
+            await asyncio.sleep(0.01)
+            return FakeResponse("We close at 7 PM.", tokens=10)
+    
+    monkeypatch.setattr(service, "_get_async_client", lambda: FakeAsyncClient())
+    
+    async def ask_concurrently():
+        return await asyncio.gather(*(service.agenerate_response(messages) for _ in range(3)))
+    
+    assert asyncio.run(ask_concurrently()) == ["We close at 7 PM."] * 3
+    assert len(posts) == 2
+    assert service.get_stats()["single_flight"] == {"executed": 2, "deduplicated": 6}
+
+
+def test_cancelled_caller_hands_the_call_to_waiters(monkeypatch):
+    """Test that cancelling the caller that sent a request does not fail the others."""
+    import asyncio
+    from src.services import ai_service as ai_module
+    
+    service = ai_module.AIService()
+    messages = [{"role": "user", "content": "Do you do nails?"}]
+    posts = []
+    
+    class FakeAsyncClient:
+        async def post(self, url, headers, content, timeout):
+            posts.append(content)
+            await asyncio.sleep(0.05)
+            return FakeResponse("Yes, manicures and pedicures.", tokens=10)
+    
+    monkeypatch.setattr(service, "_get_async_client", lambda: FakeAsyncClient())
+    
+    async def scenario():
+        first = asyncio.create_task(service.agenerate_response(messages))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(service.agenerate_response(messages))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(scenario()) == "Yes, manicures and pedicures."
+    assert len(posts) == 2
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Unit tests for the supervisor analytics rollups.
+"""
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from src.api.app import app
+from src.models.help_request import HelpRequest, RequestStatus
+from src.database.firebase_client import firebase_client
+from src.services.analytics_rollups import AnalyticsRollups
+
+
+@pytest.fixture
+def rollup_store(monkeypatch):
+    """Keep rollup buckets in a dict in place of Firebase."""
+    store = {}
+    
+    def run_transaction(path, update_fn):
+        store[path] = update_fn(store.get(path))
+        return True
+    
+    def get_rollups(granularity, start_key, end_key):
+        prefix = f"analytics_rollups/{granularity}/"
+        return {
+            path[len(prefix):]: bucket for path, bucket in store.items()
+            if path.startswith(prefix) and start_key <= path[len(prefix):] <= end_key
+        }
+    
+    monkeypatch.setattr(firebase_client, "run_transaction", run_transaction)
+    monkeypatch.setattr(firebase_client, "get_rollups", get_rollups)
+    return store
+
+
+def _resolved(created_at: datetime, seconds: int, supervisor_id: str) -> HelpRequest:
+    return HelpRequest(
+        customer_phone="+15550000000",
+        question="Do you do balayage?",
+        status=RequestStatus.RESOLVED,
+        created_at=created_at,
+        resolved_at=created_at + timedelta(seconds=seconds),
+        supervisor_id=supervisor_id
+    )
+
+
+def test_rollups_track_rates_and_latency(rollup_store):
+    """Test hourly buckets, totals and per-supervisor figures."""
+    rollups = AnalyticsRollups()
+    nine = datetime(2025, 1, 15, 9, 0)
+    
+    for minute in range(4):
+        rollups.record_call(nine + timedelta(minutes=minute))
+    rollups.record_escalation(HelpRequest(customer_phone="+1", question="q", created_at=nine))
+    rollups.record_escalation(HelpRequest(customer_phone="+1", question="q", created_at=nine))
+    rollups.record_resolution(_resolved(nine, 120, "sup.a"))
+    rollups.record_resolution(_resolved(nine + timedelta(hours=1), 600, "sup-b"))
+    rollups.record_timeout(nine + timedelta(minutes=30))
+    
+    result = rollups.get_range("hourly", nine, nine + timedelta(hours=2))
+    first, second, third = result["buckets"]
+    
+    assert first["bucket"] == "2025-01-15T09"
+    assert first["escalation_rate"] == 0.5
+    assert first["timeout_rate"] == 0.5
+    assert first["avg_resolution_seconds"] == 120.0
+    assert second["resolved"] == 1 and second["escalation_rate"] is None
+    assert third["resolved"] == 0
+    assert result["totals"]["avg_resolution_seconds"] == 360.0
+    
+    daily = rollups.get_range("daily", nine, nine, supervisor_id="sup.a")
+    assert daily["totals"]["resolved"] == 1
+    
+    summary = rollups.get_supervisor_summary("daily", nine, nine)
+    by_supervisor = {s["supervisor_id"]: s for s in summary}
+    assert by_supervisor["sup_a"]["avg_resolution_seconds"] == 120.0
+    assert by_supervisor["sup-b"]["avg_resolution_seconds"] == 600.0
+
+def test_analytics_route_accepts_utc_offsets(rollup_store):
+    """Test that bounds with an offset ("Z", "+02:00") are read as UTC, not a 500."""
+    client = TestClient(app)
+    
+    response = client.get(
+        "/api/supervisor/analytics",
+        params={"granularity": "hourly", "start": "2025-01-15T09:00:00Z", "end": "2025-01-15T12:30:00+02:00"}
+    )
+    assert response.status_code == 200
+    buckets = [b["bucket"] for b in response.json()["buckets"]]
+    assert buckets == ["2025-01-15T09", "2025-01-15T10"]
+    
+    # Only start given: the default end is naive UTC now
+    start = (datetime.utcnow() - timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    response = client.get("/api/supervisor/analytics", params={"start": start})
+    assert response.status_code == 200
+
+
+def test_analytics_route_rejects_overlong_ranges(rollup_store):
+    """Test 400 for ranges longer than the per-granularity maximum."""
+    client = TestClient(app)
+    
+    response = client.get("/api/supervisor/analytics", params={"start": "2000-01-01T00:00:00"})
+    assert response.status_code == 400
+    response = client.get(
+        "/api/supervisor/analytics/supervisors",
+        params={"granularity": "hourly", "start": "2025-01-01T00:00:00", "end": "2025-03-01T00:00:00"}
+    )
+    assert response.status_code == 400
+    response = client.get(
+        "/api/supervisor/analytics",
+        params={"granularity": "daily", "start": "2025-01-01T00:00:00", "end": "2025-03-01T00:00:00"}
+    )
+    assert response.status_code == 200
\ No newline at end of file
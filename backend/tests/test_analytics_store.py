@@ -0,0 +1,67 @@
+"""
+Tests for the columnar analytics store.
+"""
+import pytest
+from datetime import datetime, timedelta
+from src.models.help_request import HelpRequest, RequestStatus
+from src.services.analytics_store import RequestAnalyticsStore
+
+
+def _row(i: int, status: str, created_at: datetime, resolve_after: int = None) -> dict:
+    row = {
+        'request_id': f"req-{i}",
+        'customer_phone': f"+1555000{i:04d}",
+        'question': "Do you do balayage?",
+        'context': "long transcript " * 50,
+        'status': status,
+        'created_at': created_at.isoformat(),
+        'updated_at': created_at.isoformat(),
+        'timeout_at': (created_at + timedelta(hours=1)).isoformat(),
+        'resolved_at': None,
+        'supervisor_id': None
+    }
+    if resolve_after is not None:
+        row['resolved_at'] = (created_at + timedelta(seconds=resolve_after)).isoformat()
+        row['supervisor_id'] = "sup-1"
+    return row
+
+
+def test_analytics_store_aggregates_loaded_rows():
+    """Test counts, resolution percentiles and hourly volume."""
+    base = datetime(2025, 1, 15, 9, 0)
+    store = RequestAnalyticsStore(capacity=4)
+    store.load([
+        _row(0, 'resolved', base, resolve_after=60),
+        _row(1, 'resolved', base + timedelta(minutes=10), resolve_after=180),
+        _row(2, 'pending', base + timedelta(hours=1)),
+        _row(3, 'timeout', base + timedelta(hours=1, minutes=5)),
+    ])
+    
+    assert store.count_by_status() == {'pending': 1, 'resolved': 2, 'timeout': 1}
+    assert store.resolution_time_percentiles((50,)) == {'p50': 120.0}
+    assert store.hourly_volume() == [(base, 2), (base + timedelta(hours=1), 2)]
+    assert store.count_by_status(start=base + timedelta(hours=1))['resolved'] == 0
+
+
+def test_analytics_store_records_transitions():
+    """Test that upserts grow the columns and update rows in place."""
+    store = RequestAnalyticsStore(capacity=1)
+    requests = [
+        HelpRequest(
+            customer_phone="+15550000000",
+            question=f"Question {i}",
+            timeout_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        for i in range(3)
+    ]
+    for request in requests:
+        store.record(request)
+    
+    requests[0].status = RequestStatus.RESOLVED
+    requests[0].resolved_at = requests[0].created_at + timedelta(seconds=30)
+    store.record(requests[0])
+    store.set_status(requests[1].request_id, RequestStatus.TIMEOUT)
+    
+    assert len(store) == 3
+    assert store.count_by_status() == {'pending': 1, 'resolved': 1, 'timeout': 1}
+    assert store.resolution_time_percentiles((50,)) == {'p50': 30.0}
\ No newline at end of file
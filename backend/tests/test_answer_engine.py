@@ -0,0 +1,126 @@
+"""
+Unit tests for the tiered answer engine.
+"""
+import pytest
+from src.models.knowledge_base import KnowledgeEntry
+from src.services.ai_service import ai_service
+from src.services.knowledge_service import knowledge_service
+from src.services.answer_engine import AnswerEngine, AnswerTier
+from src.services.tenant_registry import tenant_registry
+from src.services.intent_classifier import IntentClassifier
+
+
+@pytest.fixture
+def knowledge(monkeypatch):
+    """Fixed knowledge base; records LLM calls instead of making them."""
+    entries = [
+        KnowledgeEntry(question="Do you offer balayage?", answer="Yes, from $150."),
+        KnowledgeEntry(question="Is there parking nearby?", answer="Yes, free parking.", confidence=0.5),
+    ]
+    llm_calls = []
+    
+    def check_if_needs_help(question, knowledge_list, customer_context=""):
+        llm_calls.append(question)
+        return (True, None) if "stylist" in question else (False, "LLM answer")
+    
+    monkeypatch.setattr(knowledge_service, "get_all_knowledge", lambda: entries)
+    monkeypatch.setattr(knowledge_service, "record_usage", lambda entry_id: None)
+    monkeypatch.setattr(ai_service, "check_if_needs_help", check_if_needs_help)
+    tenant_registry.clear()  # Knowledge indexes and answers cached by earlier tests
+    return entries, llm_calls
+
+
+def test_confident_match_skips_llm(knowledge):
+    """Test that a close, trusted match is answered from the knowledge base."""
+    entries, llm_calls = knowledge
+    engine = AnswerEngine(min_score=0.8, min_confidence=0.9, rephrase=False)
+    
+    result = engine.answer("do you offer balayage")
+    
+    assert result.tier == AnswerTier.KNOWLEDGE
+    assert result.answer == "Yes, from $150."
+    assert result.entry_id == entries[0].entry_id
+    assert llm_calls == []
+
+
+def test_fast_path_needs_the_same_question(knowledge):
+    """Test that a stored answer to a different question goes to the LLM instead."""
+    entries, llm_calls = knowledge
+    entries.append(KnowledgeEntry(
+        question="Do you do eyelash extensions?", answer="No, we don't offer eyelash extensions."
+    ))
+    engine = AnswerEngine(min_score=0.8, min_confidence=0.9, rephrase=False)
+    
+    assert engine.answer("How much are eyelash extensions?").tier == AnswerTier.LLM
+    assert engine.answer("Do you do eyelash extension removal?").tier == AnswerTier.LLM
+    assert engine.answer("do you do eyelash extensions").tier == AnswerTier.KNOWLEDGE
+    assert len(llm_calls) == 2
+
+
+def test_ambiguous_questions_use_llm_or_escalate(knowledge):
+    """Test the LLM and escalation tiers."""
+    entries, llm_calls = knowledge
+    engine = AnswerEngine(min_score=0.8, min_confidence=0.9)
+    
+    # Matches well, but the entry is not trusted enough
+    assert engine.answer("Is there parking nearby?").tier == AnswerTier.LLM
+    assert engine.answer("Which stylist is in on Friday?").tier == AnswerTier.ESCALATE
+    assert len(llm_calls) == 2
+    assert engine.stats == {"canned": 0, "knowledge": 0, "llm": 1, "escalate": 1}
+
+
+def test_intent_classifier_routes_small_talk(knowledge, tmp_path):
+    """Test canned replies for small talk and save/load of the model."""
+    entries, llm_calls = knowledge
+    classifier = IntentClassifier(["greeting", "thanks", "other"]).fit([
+        ("hi", "greeting"), ("hello there", "greeting"), ("good morning", "greeting"),
+        ("thanks", "thanks"), ("thank you so much", "thanks"), ("many thanks", "thanks"),
+        ("do you offer balayage", "other"), ("is there parking", "other"),
+        ("which stylist is in", "other"),
+    ])
+    path = str(tmp_path / "intent.json")
+    classifier.save(path)
+    loaded = IntentClassifier.load(path)
+    
+    assert loaded.predict("hello")[0] == "greeting"
+    assert loaded.predict("thank you")[0] == "thanks"
+    
+    engine = AnswerEngine(classifier=loaded)
+    result = engine.answer("hello")
+    
+    assert result.tier == AnswerTier.CANNED
+    assert result.intent == "greeting"
+    assert llm_calls == []
+    
+    # Confidently a "greeting", yet a question: answered, not small-talked
+    intent, probability = loaded.predict("good morning, parking?")
+    assert intent == "greeting" and probability > 0.9
+    assert engine.answer("good morning, parking?").tier != AnswerTier.CANNED
+
+
+def test_cancelling_async_answer_cancels_llm_call(knowledge, monkeypatch):
+    """Test that a superseded turn's LLM request is cancelled, not left running."""
+    import asyncio
+    entries, llm_calls = knowledge
+    cancelled = []
+    
+    async def acheck_if_needs_help(question, knowledge_list, customer_context=""):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(question)
+            raise
+    
+    monkeypatch.setattr(ai_service, "acheck_if_needs_help", acheck_if_needs_help)
+    engine = AnswerEngine(min_score=0.8, min_confidence=0.9)
+    
+    async def scenario():
+        # Answered locally without the LLM
+        assert (await engine.aanswer("do you offer balayage")).tier == AnswerTier.KNOWLEDGE
+        turn = asyncio.create_task(engine.aanswer("Which stylist is in on Friday?"))
+        await asyncio.sleep(0.05)
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+    
+    asyncio.run(scenario())
+    assert cancelled == ["Which stylist is in on Friday?"]
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Unit tests for help request archival.
+"""
+import pytest
+from datetime import datetime, timedelta
+from src.models.help_request import HelpRequest, RequestStatus
+from src.database.firebase_client import firebase_client
+from src.services.archive_service import ArchiveService
+
+
+@pytest.fixture
+def hot_store(monkeypatch):
+    """Serve a fixed set of requests in place of Firebase."""
+    old = datetime.utcnow() - timedelta(days=90)
+    requests = [
+        HelpRequest(customer_phone="+1234567890", question="Old resolved?",
+                    status=RequestStatus.RESOLVED, created_at=old, resolved_at=old, updated_at=old),
+        HelpRequest(customer_phone="+1987654321", question="Old timeout?",
+                    status=RequestStatus.TIMEOUT, created_at=old, updated_at=old),
+        HelpRequest(customer_phone="+1234567890", question="Still pending?"),
+    ]
+    deleted = []
+    
+    monkeypatch.setattr(
+        firebase_client, "get_all_help_requests",
+        lambda status=None: [r.to_dict() for r in requests]
+    )
+    monkeypatch.setattr(
+        firebase_client, "commit_batch",
+        lambda updates: deleted.extend(updates) or True
+    )
+    return requests, deleted
+
+
+def test_archive_moves_only_old_finished_requests(hot_store, tmp_path):
+    """Test archiving old requests and reading them back."""
+    requests, deleted = hot_store
+    archive = ArchiveService(str(tmp_path))
+    
+    result = archive.archive_old_requests(retention_days=30)
+    
+    assert result['archived'] == 2
+    assert len(deleted) == 2
+    assert archive.get(requests[0].request_id).question == "Old resolved?"
+    assert archive.get(requests[2].request_id) is None
+
+
+def test_archive_query_filters_by_customer(hot_store, tmp_path):
+    """Test historical lookup by customer without a full scan."""
+    requests, _ = hot_store
+    archive = ArchiveService(str(tmp_path))
+    archive.archive_old_requests(retention_days=30)
+    
+    day = requests[0].created_at.date()
+    results = archive.query(day, day, customer_phone="+1234567890")
+    
+    assert [r.request_id for r in results] == [requests[0].request_id]
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Tests for ETags, 304 responses and response compression.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from src.api.app import app
+from src.database.firebase_client import firebase_client
+from src.models.help_request import HelpRequest
+from src.services.help_request_service import help_request_service
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """API over an in-memory version counter and help request list."""
+    state = {'version': 7, 'version_reads': 0, 'list_reads': 0}
+    requests = [
+        HelpRequest(customer_phone="+15550000000", question=f"Question {i}?", context="x" * 500)
+        for i in range(5)
+    ]
+    
+    class FakeRef:
+        def __init__(self, path):
+            self.path = path
+        
+        def child(self, path):
+            return FakeRef(f"{self.path}/{path}")
+        
+        def get(self):
+            state['version_reads'] += 1
+            return state['version']
+    
+    class FakeDb:
+        def child(self, path):
+            return FakeRef(path)
+        
+        def update(self, updates):
+            state['version'] += 1
+    
+    def get_all_requests(status=None):
+        state['list_reads'] += 1
+        return requests
+    
+    monkeypatch.setattr(firebase_client, "db", FakeDb())
+    monkeypatch.setattr(firebase_client, "_versions", {})
+    monkeypatch.setattr(help_request_service, "get_all_requests", get_all_requests)
+    return TestClient(app), state
+
+
+def test_conditional_get_and_gzip(api):
+    """Test 304 on unchanged data, a new ETag after a write, and gzip."""
+    client, state = api
+    
+    first = client.get("/api/help-requests/", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(first.json()) == 5
+    
+    # Unchanged: 304 from the cached counter, the list is not read
+    again = client.get("/api/help-requests/", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert state['list_reads'] == 1
+    assert state['version_reads'] == 1
+    
+    # Other filter: other tag
+    pending = client.get("/api/help-requests/?status=pending")
+    assert pending.headers["etag"] != etag
+    
+    # A write through the client bumps the counter and forgets the cached one
+    assert firebase_client.update_help_request("r1", {"status": "resolved"})
+    changed = client.get("/api/help-requests/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Unit tests for customer profile caching and write-behind call tracking.
+"""
+from datetime import datetime, timedelta
+from src.agents.prompts import get_customer_history_prompt
+from src.database.firebase_client import firebase_client
+from src.models.help_request import AttachedCustomer, HelpRequest, RequestStatus
+from src.services.customer_service import CustomerService
+from src.utils.tenant import tenant_scope
+from src.utils.validators import normalize_phone_number
+
+
+def test_normalize_phone_number():
+    """Test that formatting differences map to one number."""
+    assert normalize_phone_number("+1 (555) 123-4567") == "+15551234567"
+    assert normalize_phone_number(" +1-555-123-4567 ") == "+15551234567"
+    assert normalize_phone_number("unknown") is None
+    assert normalize_phone_number(None) is None
+
+
+def test_profiles_are_cached_and_calls_written_behind(monkeypatch):
+    """Test one read per caller and batched, incremental call counts."""
+    reads = []
+    batches = []
+    stored = {"+15551234567": {"phone": "+15551234567", "name": "Dana", "total_calls": 4}}
+    
+    def get_customer_info(phone):
+        reads.append(phone)
+        return dict(stored[phone]) if phone in stored else None
+    
+    monkeypatch.setattr(firebase_client, "get_customer_info", get_customer_info)
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda updates: batches.append(updates) or True)
+    
+    service = CustomerService(cache_size=10, flush_interval=60, flush_batch=10)
+    
+    profile = service.prefetch("+1 (555) 123-4567")
+    assert profile.name == "Dana"
+    assert service.record_call("+1-555-123-4567").total_calls == 5
+    assert service.record_call("+15551234567").total_calls == 6
+    assert service.record_call("+1 555 987 6543").total_calls == 1
+    assert service.get_profile("+15551234567").total_calls == 6
+    
+    # One read per phone; nothing written until the flush
+    assert reads == ["+15551234567", "+15559876543"]
+    assert batches == []
+    
+    with tenant_scope("uptown"):
+        service.record_call("+15551234567")
+    
+    assert service.flush() == 3
+    default_batch, uptown_batch = batches
+    assert default_batch["customers/_15551234567/total_calls"] == {".sv": {"increment": 2}}
+    assert "customers/_15551234567/created_at" not in default_batch
+    assert default_batch["customers/_15559876543/total_calls"] == {".sv": {"increment": 1}}
+    assert "customers/_15559876543/created_at" in default_batch
+    assert uptown_batch["customers/_15551234567/total_calls"] == {".sv": {"increment": 1}}
+    assert service.flush() == 0
+
+
+def test_history_index_and_bounded_prompt(monkeypatch):
+    """Test per-caller history entries, status updates and the prompt budget."""
+    service = CustomerService(cache_size=10)
+    asked = datetime(2026, 3, 1, 10, 30)
+    request = HelpRequest(
+        customer_phone="+1 555 123 4567",
+        question="Do you stock Olaplex?",
+        created_at=asked
+    )
+    request.attached_customers["_15559876543"] = AttachedCustomer(
+        customer_phone="+15559876543",
+        question="Olaplex available?",
+        attached_at=asked + timedelta(minutes=5)
+    )
+    
+    entries = service.history_entry_updates(request)
+    own = f"customer_requests/_15551234567/20260301103000000000_{request.request_id}"
+    other = f"customer_requests/_15559876543/20260301103500000000_{request.request_id}"
+    assert set(entries) == {own, other}
+    assert entries[other]["question"] == "Olaplex available?"
+    assert list(service.history_entry_updates(request, "+15559876543")) == [other]
+    
+    request.status = RequestStatus.RESOLVED.value
+    request.supervisor_answer = "Yes, the full range."
+    updates = service.history_status_updates(request)
+    assert updates[f"{own}/status"] == "resolved"
+    assert updates[f"{other}/answer"] == "Yes, the full range."
+    
+    queries = []
+    stored = {
+        "20260201090000000000_a": {"question": "Old?", "status": "timeout", "created_at": "2026-02-01T09:00:00"},
+        "20260301103000000000_b": {"question": "Olaplex?", "status": "resolved",
+                                   "answer": "Yes.", "created_at": "2026-03-01T10:30:00"},
+    }
+    monkeypatch.setattr(
+        firebase_client, "get_customer_requests",
+        lambda phone, limit: queries.append((phone, limit)) or stored
+    )
+    history = service.get_history("+1 555 123 4567")
+    assert [item["question"] for item in history] == ["Olaplex?", "Old?"]
+    service.get_history("+15551234567")
+    assert len(queries) == 1
+    
+    prompt = get_customer_history_prompt(history, max_chars=800)
+    assert '"Olaplex?" -> answered: "Yes."' in prompt and "Old?" in prompt
+    short = get_customer_history_prompt(history, max_chars=120)
+    assert "Olaplex?" in short and "Old?" not in short
+    assert get_customer_history_prompt([]) == ""
\ No newline at end of file
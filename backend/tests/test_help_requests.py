@@ -2,8 +2,14 @@
 Unit tests for help request service.
 """
 import pytest
-from src.models.help_request import HelpRequestCreate, RequestStatus
+from datetime import datetime, timedelta
+import orjson
+from src.models.help_request import HelpRequest, HelpRequestCreate, RequestStatus
+from src.database.firebase_client import firebase_client
 from src.services.help_request_service import help_request_service
+from src.services.question_index import PendingQuestionIndex
+from src.services.priority_index import PendingPriorityIndex
+from src.utils.serialization import dump_models
 
 
 def test_create_help_request():
@@ -26,4 +32,136 @@ def test_get_pending_requests():
     """Test retrieving pending requests."""
     pending = help_request_service.get_all_requests(RequestStatus.PENDING)
     
-    assert isinstance(pending, list)
\ No newline at end of file
+    assert isinstance(pending, list)
+
+
+def test_pending_index_matches_rephrased_question():
+    """Test that rephrasings of a pending question are detected."""
+    index = PendingQuestionIndex(threshold=0.75)
+    index.add("req-1", "Do you do eyelash extensions?", datetime.utcnow())
+    index.add("req-2", "Is there parking nearby?", datetime.utcnow())
+    
+    matches = index.find_matches("do you offer eyelash extensions", window_seconds=600)
+    
+    assert [request_id for _, request_id in matches] == ["req-1"]
+    assert index.find_matches("How much is a facial?", window_seconds=600) == []
+
+
+def test_pending_index_tells_question_kinds_apart():
+    """Test that questions differing in question word or negation don't match."""
+    index = PendingQuestionIndex(threshold=0.75)
+    index.add("req-1", "Do you have parking?", datetime.utcnow())
+    index.add("req-2", "Do you do eyelash extensions?", datetime.utcnow())
+    index.add("req-3", "Is parking free?", datetime.utcnow())
+    
+    assert index.find_matches("Where is parking?", window_seconds=600) == []
+    assert index.find_matches("How much are eyelash extensions?", window_seconds=600) == []
+    assert index.find_matches("Isn't parking free?", window_seconds=600) == []
+    assert [r for _, r in index.find_matches("Is parking free", window_seconds=600)] == ["req-3"]
+
+
+def test_attached_customers_keyed_by_normalized_phone(monkeypatch):
+    """Test that one caller dialing in differently is attached once, under a valid key."""
+    batches = []
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda updates: batches.append(updates) or True)
+    request = HelpRequest(
+        customer_phone="+15550000000",
+        question="Do you have parking?",
+        timeout_at=datetime.utcnow() + timedelta(minutes=30)
+    )
+    
+    def attach(phone):
+        data = HelpRequestCreate(customer_phone=phone, question="Do you have parking?")
+        return help_request_service._attach_customer(request, data)
+    
+    attach("+1 (555) 123.4567")
+    attach("+1-555-123-4567")
+    attach("+1 555 000 0000")
+    
+    assert list(request.attached_customers) == ["_15551234567"]
+    assert len(batches) == 1
+
+
+def test_add_customer_phone_fills_in_or_attaches(monkeypatch):
+    """Test that a number given later reaches the request the caller escalated."""
+    batches = []
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda updates: batches.append(updates) or True)
+    
+    def pending(phone):
+        return HelpRequest(
+            customer_phone=phone,
+            question="Do you have parking?",
+            timeout_at=datetime.utcnow() + timedelta(minutes=30)
+        )
+    
+    anonymous = pending("unknown")
+    monkeypatch.setattr(help_request_service, "get_request", lambda request_id: anonymous)
+    updated = help_request_service.add_customer_phone(anonymous.request_id, "+15551234567", "Parking?")
+    assert updated.customer_phone == "+15551234567"
+    assert batches[-1][f"help_requests/{anonymous.request_id}/customer_phone"] == "+15551234567"
+    
+    # Attached to another caller's request: attached under the new number
+    other = pending("+15550000000")
+    monkeypatch.setattr(help_request_service, "get_request", lambda request_id: other)
+    updated = help_request_service.add_customer_phone(other.request_id, "+15551234567", "Parking?")
+    assert updated.customer_phone == "+15550000000"
+    assert list(updated.attached_customers) == ["_15551234567"]
+
+
+def test_pending_index_ignores_old_requests():
+    """Test that requests outside the window are not matched."""
+    index = PendingQuestionIndex(threshold=0.75)
+    index.add("req-1", "Do you do eyelash extensions?", datetime.utcnow() - timedelta(hours=2))
+    
+    assert index.find_matches("eyelash extensions?", window_seconds=600) == []
+
+
+def test_batch_serialization_matches_per_row():
+    """Test that bulk loading and dumping agree with the per-row path."""
+    rows = [
+        HelpRequest(
+            customer_phone=f"+1555000000{i}",
+            question=f"Question {i}",
+            timeout_at=datetime.utcnow() + timedelta(minutes=30)
+        ).to_dict()
+        for i in range(3)
+    ]
+    rows = [orjson.loads(orjson.dumps(row)) for row in rows]
+    original = [dict(row) for row in rows]
+    
+    single = [HelpRequest.from_dict(row) for row in rows]
+    batch = HelpRequest.from_dict_batch(rows)
+    
+    assert rows == original
+    assert batch == single
+    assert orjson.loads(orjson.dumps(dump_models(HelpRequest, batch))) == rows
+
+
+def test_priority_index_orders_by_effective_deadline():
+    """Test deadline ordering, customer and urgency boosts, and removals."""
+    now = datetime.utcnow()
+    
+    def pending(minutes_left, **fields):
+        return HelpRequest(
+            customer_phone="+15550000000",
+            question="Question",
+            timeout_at=now + timedelta(minutes=minutes_left),
+            **fields
+        )
+    
+    soon = pending(5)
+    later = pending(42)
+    regular = pending(25, customer_value=30)  # Bonus capped at 15 minutes
+    urgent = pending(45, urgent=True)
+    
+    index = PendingPriorityIndex()
+    for request in (later, soon, regular, urgent):
+        index.add(request)
+    
+    order = [request.request_id for _, request in index.top(10)]
+    assert order == [soon.request_id, regular.request_id, urgent.request_id, later.request_id]
+    
+    index.remove(soon.request_id)
+    index.add(later.model_copy(update={'urgent': True}))  # Re-prioritized
+    assert [r.request_id for _, r in index.top(2)] == [regular.request_id, later.request_id]
+    assert len(index) == 3
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Unit tests for Idempotency-Key replays.
+"""
+import asyncio
+import pytest
+import orjson
+from src.services.idempotency import IdempotencyStore, REPLAY_HEADER
+from src.utils.exceptions import IdempotencyKeyReusedError, ValidationError
+from src.utils.tenant import tenant_scope
+
+
+def test_replays_skip_the_handler():
+    """Test that retries and concurrent duplicates run the handler once."""
+    store = IdempotencyStore(ttl=60, max_entries=10)
+    calls = []
+    
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"request_id": f"req-{len(calls)}"}
+    
+    async def scenario():
+        payload = {"question": "Do you do braids?"}
+        first, second = await asyncio.gather(
+            store.run("key-1", "create", payload, handler, status_code=201),
+            store.run("key-1", "create", payload, handler, status_code=201),
+        )
+        replay = await store.run("key-1", "create", payload, handler, status_code=201)
+        
+        assert orjson.loads(first.body) == orjson.loads(second.body) == {"request_id": "req-1"}
+        assert replay.status_code == 201
+        assert replay.headers[REPLAY_HEADER] == "true"
+        assert orjson.loads(replay.body) == {"request_id": "req-1"}
+        
+        # Same key, other tenant or endpoint: separate
+        with tenant_scope("uptown"):
+            await store.run("key-1", "create", payload, handler)
+        await store.run("key-1", "resolve:req-1", payload, handler)
+        assert len(calls) == 3
+        
+        with pytest.raises(IdempotencyKeyReusedError):
+            await store.run("key-1", "create", {"question": "Other?"}, handler)
+        with pytest.raises(ValidationError):
+            await store.run("", "create", payload, handler)
+        
+        # No key: always runs
+        await store.run(None, "create", payload, handler)
+        assert len(calls) == 4
+    
+    asyncio.run(scenario())
+
+
+def test_failures_are_not_stored_and_entries_are_bounded():
+    """Test that a failed request can be retried and old keys are evicted."""
+    store = IdempotencyStore(ttl=60, max_entries=2)
+    attempts = []
+    
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("Database error")
+        return {"ok": True}
+    
+    async def ok():
+        return {"ok": True}
+    
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await store.run("retry", "create", {}, flaky)
+        response = await store.run("retry", "create", {}, flaky)
+        assert REPLAY_HEADER not in response.headers
+        assert len(attempts) == 2
+        
+        for key in ("a", "b", "c"):
+            await store.run(key, "create", {}, ok)
+        assert len(store) == 2
+        assert store.get("default:create:retry") is None
+    
+    asyncio.run(scenario())
\ No newline at end of file
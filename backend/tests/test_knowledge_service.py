@@ -2,8 +2,10 @@
 Unit tests for knowledge service.
 """
 import pytest
-from src.models.knowledge_base import KnowledgeCreate
+from datetime import datetime, timedelta
+from src.models.knowledge_base import KnowledgeCreate, KnowledgeEntry
 from src.services.knowledge_service import knowledge_service
+from src.services.knowledge_compaction import KnowledgeCompactor
 
 
 def test_add_knowledge_entry():
@@ -27,4 +29,141 @@ def test_search_knowledge():
     results = knowledge_service.search_knowledge("hours", limit=5)
     
     assert isinstance(results, list)
-    assert len(results) <= 5
\ No newline at end of file
+    assert len(results) <= 5
+
+
+def test_compaction_merges_duplicate_questions():
+    """Test that near-duplicate entries fold into the newest answer."""
+    now = datetime.utcnow()
+    old = KnowledgeEntry(
+        question="Do you have parking?", answer="Street parking only",
+        times_used=4, created_at=now - timedelta(days=30), updated_at=now - timedelta(days=30),
+        last_used_at=now + timedelta(minutes=1)  # Used recently, answered long ago
+    )
+    new = KnowledgeEntry(
+        question="Is there parking?", answer="Free lot behind the salon",
+        times_used=2, created_at=now, updated_at=now
+    )
+    other = KnowledgeEntry(question="Do you do facials?", answer="Yes")
+    
+    compactor = KnowledgeCompactor(threshold=0.85)
+    clusters = compactor.find_clusters([old, new, other])
+    
+    assert len(clusters) == 1
+    
+    merged, batch = compactor.merge_cluster(clusters[0])
+    
+    assert merged.entry_id == new.entry_id
+    assert merged.answer == "Free lot behind the salon"
+    assert merged.times_used == 6
+    assert batch[f"knowledge_base/{old.entry_id}"] is None
+    assert batch[f"knowledge_redirects/{old.entry_id}"] == new.entry_id
+
+
+def test_usage_is_counted_write_behind(monkeypatch):
+    """Test that uses are queued per tenant and written together later."""
+    from src.services.knowledge_service import KnowledgeService
+    from src.utils.tenant import get_tenant_id, tenant_scope
+    
+    written = []
+    service = KnowledgeService(usage_flush_interval=60)
+    monkeypatch.setattr(
+        service, "increment_usage",
+        lambda entry_id, amount=1: written.append((get_tenant_id(), entry_id, amount)) or True
+    )
+    
+    service.record_usage("entry-1")
+    service.record_usage("entry-1")
+    with tenant_scope("downtown"):
+        service.record_usage("entry-1")
+    assert written == []
+    
+    assert service.flush_usage() == 2
+    assert sorted(written) == [("default", "entry-1", 2), ("downtown", "entry-1", 1)]
+    assert service.flush_usage() == 0
+
+
+def test_similar_questions_are_kept_apart_until_reviewed(monkeypatch):
+    """Test that a near-match neither overwrites an answer nor is merged unreviewed."""
+    from src.database.firebase_client import firebase_client
+    from src.services.tenant_registry import tenant_registry
+    
+    walk_ins = KnowledgeEntry(question="Do you accept walk-ins?", answer="Yes, anytime")
+    sunday = KnowledgeEntry(question="Do you accept walk-ins on Sunday?", answer="No, appointments only")
+    entries = [walk_ins, sunday]
+    batches = []
+    monkeypatch.setattr(knowledge_service, "get_all_knowledge", lambda: entries)
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda batch: batches.append(batch) or True)
+    tenant_registry.clear()
+    
+    assert knowledge_service.find_matching_entry("Do you accept walk-ins on Sunday?") is sunday
+    assert knowledge_service.find_matching_entry("do you accept walk ins") is walk_ins
+    assert knowledge_service.find_matching_entry("Do you accept walk-ins on Sundays?") is sunday
+    
+    compactor = KnowledgeCompactor(threshold=0.75)
+    report = compactor.compact()
+    assert report["clusters"] == [] and batches == []
+    assert report["review"] == [{
+        "entry_ids": [walk_ins.entry_id, sunday.entry_id],
+        "questions": [walk_ins.question, sunday.question]
+    }]
+    
+    report = compactor.compact(merge_similar=True)
+    assert len(report["clusters"]) == 1 and len(batches) == 1
+    tenant_registry.clear()
+
+def test_bulk_import_batches_dedups_and_resumes(tmp_path, monkeypatch):
+    """Test chunked import, duplicate handling, validation and checkpoint resume."""
+    import io
+    from src.database.firebase_client import firebase_client
+    from src.services import knowledge_bulk
+    from src.services.knowledge_bulk import KnowledgeImporter, decode_lines, read_rows
+    
+    stored = [KnowledgeEntry(question="Do you have parking?", answer="Street only").to_dict()]
+    batches = []
+    monkeypatch.setattr(firebase_client, "get_all_knowledge", lambda: [dict(r) for r in stored])
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda batch: batches.append(batch) or True)
+    monkeypatch.setattr(knowledge_bulk.ai_service, "extract_keywords", lambda text: ["auto"])
+    
+    jsonl = "\n".join([
+        '{"question": "Is there parking?", "answer": "Free lot behind the salon"}',
+        '{"question": "Do you sell gift cards?", "answer": "Yes", "keywords": ["gift"]}',
+        'not json',
+        '{"question": "do you sell gift cards", "answer": "Yes, any amount"}',
+        '{"question": "Can I bring my dog?", "answer": ""}',
+        '{"question": "Do you do eyelash extensions?", "answer": "Yes, from $80"}',
+    ])
+    importer = KnowledgeImporter(chunk_size=2, concurrency=2)
+    
+    preview = importer.import_rows(read_rows(io.StringIO(jsonl), "jsonl"), dry_run=True)
+    assert batches == []
+    assert (preview["created"], preview["updated"], preview["invalid"]) == (2, 2, 2)
+    assert [e["line"] for e in preview["errors"]] == [3, 5]
+    
+    # Interrupted after the first chunk (lines 1-2) was committed
+    gift_cards = KnowledgeEntry(question="Do you sell gift cards?", answer="Yes", keywords=["gift"])
+    stored.append(gift_cards.to_dict())
+    checkpoint = tmp_path / "import.ckpt"
+    checkpoint.write_text('{"line": 2}')
+    report = importer.import_rows(
+        read_rows(io.StringIO(jsonl), "jsonl"), checkpoint_path=str(checkpoint)
+    )
+    
+    assert report["skipped"] == 2
+    assert (report["created"], report["updated"]) == (1, 1)
+    assert report["enriched"] == 1
+    assert len(batches) == 1
+    batch = batches[0]
+    assert batch[f"knowledge_base/{gift_cards.entry_id}/answer"] == "Yes, any amount"
+    written = [v for v in batch.values() if isinstance(v, dict)]
+    assert [e["question"] for e in written] == ["Do you do eyelash extensions?"]
+    assert written[0]["keywords"] == ["auto"] and written[0]["source"] == "import"
+    assert not checkpoint.exists()
+    
+    # A streamed body: BOM, a character split across chunks, CRLF and no final newline
+    body = '\ufeffquestion,answer,keywords\r\nOpen late?,"Until 8, caf\u00e9 too",hours; late'.encode()
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    csv_rows = list(read_rows(decode_lines(chunks), "csv"))
+    assert csv_rows == [
+        (2, {"question": "Open late?", "answer": "Until 8, caf\u00e9 too", "keywords": ["hours", "late"]})
+    ]
\ No newline at end of file
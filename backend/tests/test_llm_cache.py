@@ -0,0 +1,56 @@
+"""
+Unit tests for the LLM response cache.
+"""
+import pytest
+from src.services.llm_cache import LLMCache
+
+
+def test_put_get_and_lru_eviction(tmp_path):
+    """Test hits, misses and size-bounded eviction of the oldest entries."""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), mode="readwrite", max_bytes=100)
+    
+    assert cache.get("a") is None
+    cache.put("a", "model", "x" * 40)
+    cache.put("b", "model", "y" * 40)
+    assert cache.get("a") == "x" * 40  # a is now more recent than b
+    
+    cache.put("c", "model", "z" * 40)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 40
+    assert cache.get("c") == "z" * 40
+    assert cache.size_bytes() <= 100
+    assert cache.stats["evictions"] == 1
+    
+    # Size is recomputed when the file is reopened
+    cache.close()
+    reopened = LLMCache(str(tmp_path / "cache.sqlite3"), mode="replay", max_bytes=100)
+    assert reopened.size_bytes() == cache.size_bytes()
+
+
+def test_record_then_replay_without_network(tmp_path, monkeypatch):
+    """Test a recorded run replays offline through AIService."""
+    from src.services import ai_service as ai_module
+    from tests.test_ai_service import FakeResponse
+    
+    path = str(tmp_path / "cache.sqlite3")
+    messages = [{"role": "user", "content": "When do you open?"}]
+    
+    service = ai_module.AIService()
+    service.cache = LLMCache(path, mode="record")
+    monkeypatch.setattr(
+        ai_module.requests, "post",
+        lambda url, headers, data, timeout: FakeResponse("We open at 9 AM.", tokens=10)
+    )
+    assert service.generate_response(messages) == "We open at 9 AM."
+    service.cache.close()
+    
+    def no_network(*args, **kwargs):
+        raise AssertionError("API called during replay")
+    
+    monkeypatch.setattr(ai_module.requests, "post", no_network)
+    service.cache = LLMCache(path, mode="replay")
+    
+    assert service.generate_response(messages) == "We open at 9 AM."
+    assert service.generate_response(messages, temperature=0.1) is None
+    assert service.get_stats()["cache"]["hits"] == 1
\ No newline at end of file
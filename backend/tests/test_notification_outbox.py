@@ -0,0 +1,106 @@
+"""
+Unit tests for notification outbox delivery.
+"""
+import time
+import pytest
+from src.models.help_request import HelpRequest
+from src.utils.tenant import tenant_scope
+from src.services.notification_service import notification_service, FakeTransport
+from src.services.notification_outbox import (
+    notification_outbox, NotificationDeliveryPool
+)
+
+
+@pytest.fixture
+def fake_transport():
+    """Swap in the in-memory transport for the duration of a test."""
+    original = notification_service.transport
+    transport = FakeTransport()
+    notification_service.transport = transport
+    yield transport
+    notification_service.transport = original
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_delivery_retries_with_backoff(fake_transport):
+    """Test that failed sends are retried until they succeed."""
+    fake_transport.fail_times = 2
+    pool = NotificationDeliveryPool(
+        workers=2, backoff_base=0.01, max_attempts=5, poll_interval=None,
+        digest_window=0
+    )
+    pool.start()
+    
+    help_request = HelpRequest(customer_phone="+1234567890", question="Do you have parking?")
+    pool.submit(notification_outbox.supervisor_job(help_request))
+    
+    assert _wait_for(lambda: len(fake_transport.sent) == 1)
+    pool.stop()
+    
+    assert fake_transport.attempts == 3
+    assert pool.stats['retried'] == 2
+
+
+def test_duplicate_jobs_delivered_once(fake_transport):
+    """Test that jobs sharing an idempotency key only go out once."""
+    pool = NotificationDeliveryPool(workers=2, poll_interval=None)
+    pool.start()
+    
+    help_request = HelpRequest(
+        customer_phone="+1234567890",
+        question="Do you have parking?",
+        supervisor_answer="Yes, free parking"
+    )
+    pool.submit(notification_outbox.customer_job(help_request))
+    pool.submit(notification_outbox.customer_job(help_request))
+    
+    assert _wait_for(lambda: pool.stats['sent'] + pool.stats['duplicates'] == 2)
+    pool.stop()
+    
+    assert len(fake_transport.sent) == 1
+
+
+def test_supervisor_notifications_coalesced_into_digest(fake_transport):
+    """Test that a burst of escalations becomes one digest, urgent ones excepted."""
+    pool = NotificationDeliveryPool(workers=2, poll_interval=None, digest_window=0.2)
+    pool.start()
+    
+    for i in range(3):
+        help_request = HelpRequest(customer_phone="+1234567890", question=f"Question {i}?")
+        pool.submit(notification_outbox.supervisor_job(help_request))
+    urgent = HelpRequest(customer_phone="+1234567890", question="Urgent?", urgent=True)
+    pool.submit(notification_outbox.supervisor_job(urgent))
+    
+    assert _wait_for(lambda: len(fake_transport.sent) == 2)
+    pool.stop()
+    
+    assert pool.digest.stats['digests'] == 1
+    assert pool.digest.stats['coalesced'] == 3
+
+
+def test_digests_never_mix_tenants(fake_transport):
+    """Test that each salon's supervisors get a digest of their own requests only."""
+    pool = NotificationDeliveryPool(workers=2, poll_interval=None, digest_window=0.2)
+    pool.start()
+    
+    for tenant_id in ("default", "downtown"):
+        with tenant_scope(tenant_id):
+            for i in range(2):
+                help_request = HelpRequest(customer_phone="+1234567890", question=f"{tenant_id} {i}?")
+                pool.submit(notification_outbox.supervisor_job(help_request))
+    
+    assert _wait_for(lambda: len(fake_transport.sent) == 2)
+    pool.stop()
+    
+    for digest in fake_transport.sent:
+        other = "downtown" if digest.tenant_id == "default" else "default"
+        assert digest.tenant_id in digest.message and other not in digest.message
+    assert sorted(d.tenant_id for d in fake_transport.sent) == ["default", "downtown"]
\ No newline at end of file
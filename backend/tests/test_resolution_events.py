@@ -0,0 +1,196 @@
+"""
+Tests for live resolution events and the agent's escalation follow-up.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+from src.agents import salon_agent
+from src.agents.prompts import (
+    get_escalation_message, get_live_answer_message, get_phone_noted_message, get_reassurance_message
+)
+from src.agents.salon_agent import SalonAgent, phone_in_message
+from src.agents.turns import TurnRunner
+from src.config.settings import settings
+from src.database.firebase_client import firebase_client
+from src.models.help_request import RequestStatus
+from src.services.resolution_events import ResolutionEvents
+from src.utils.tenant import tenant_scope
+
+
+def test_publish_reaches_subscribers_from_any_thread():
+    """Test that a resolution published on another thread wakes its subscribers only."""
+    events = ResolutionEvents(listen=False)
+    
+    async def scenario():
+        subscription = events.subscribe("req-1")
+        with tenant_scope("downtown"):
+            elsewhere = events.subscribe("req-1")
+        
+        assert await subscription.wait(0.01) is None
+        thread = threading.Thread(
+            target=events.publish, args=("req-1", RequestStatus.RESOLVED, "Yes, free parking.")
+        )
+        thread.start()
+        resolution = await subscription.wait(1.0)
+        thread.join()
+        
+        assert resolution.status == RequestStatus.RESOLVED
+        assert resolution.answer == "Yes, free parking."
+        assert await elsewhere.wait(0.01) is None
+        
+        subscription.close()
+        elsewhere.close()
+        assert events.publish("req-1", RequestStatus.TIMEOUT) == 0
+    
+    asyncio.run(scenario())
+
+
+def test_listener_publishes_once_request_is_final(monkeypatch):
+    """Test that Firebase change events publish the stored answer once resolved."""
+    events = ResolutionEvents(listen=False)
+    stored = {'status': 'pending'}
+    monkeypatch.setattr(firebase_client, "get_help_request", lambda request_id: stored)
+    
+    async def scenario():
+        subscription = events.subscribe("req-1")
+        events._on_change("default", "req-1", SimpleNamespace(path="/", data=dict(stored)))
+        events._on_change("default", "req-1", SimpleNamespace(path="/lease_expires_at", data=1.0))
+        assert await subscription.wait(0.01) is None
+        
+        stored.update(status='resolved', supervisor_answer="Until 8pm on Fridays.")
+        events._on_change("default", "req-1", SimpleNamespace(path="/status", data="resolved"))
+        resolution = await subscription.wait(1.0)
+        assert resolution.answer == "Until 8pm on Fridays."
+        subscription.close()
+    
+    asyncio.run(scenario())
+
+
+def test_agent_reassures_then_gives_answer_live(monkeypatch):
+    """Test that a waiting caller is reassured, then hears the answer without polling."""
+    events = ResolutionEvents(listen=False)
+    monkeypatch.setattr(salon_agent, "resolution_events", events)
+    monkeypatch.setattr(settings, "escalation_reassure_after", [0.02])
+    monkeypatch.setattr(settings, "escalation_live_wait", 5.0)
+    spoken = []
+    
+    async def scenario():
+        async def speak(text):
+            spoken.append(text)
+        
+        agent = SalonAgent()
+        agent.session_data["room"] = {
+            'conversation_history': [],
+            'turns': TurnRunner(),
+            'speak': speak,
+            'escalations': set(),
+            'awaiting_phone': []
+        }
+        subscription = events.subscribe("req-1")
+        follow_up = asyncio.create_task(agent._await_supervisor(subscription, "room"))
+        
+        await asyncio.sleep(0.05)
+        assert spoken == [get_reassurance_message()]
+        events.publish("req-1", RequestStatus.RESOLVED, "Yes, we have free parking.")
+        await asyncio.wait_for(follow_up, 1.0)
+        
+        # Done with the request: nobody is subscribed any more
+        assert events.publish("req-1", RequestStatus.RESOLVED, "again") == 0
+    
+    asyncio.run(scenario())
+    
+    assert spoken == [
+        get_reassurance_message(),
+        get_live_answer_message("Yes, we have free parking.")
+    ]
+
+def test_superseded_escalation_still_follows_up(monkeypatch):
+    """Test that cancelling the turn mid-escalation still creates and follows up the request."""
+    events = ResolutionEvents(listen=False)
+    monkeypatch.setattr(salon_agent, "resolution_events", events)
+    monkeypatch.setattr(settings, "escalation_reassure_after", [])
+    monkeypatch.setattr(settings, "escalation_live_wait", 5.0)
+    created = threading.Event()
+    release = threading.Event()
+    
+    def create_request(request_data):
+        created.set()
+        release.wait(1.0)
+        return SimpleNamespace(request_id="req-1")
+    
+    monkeypatch.setattr(salon_agent.help_request_service, "create_request", create_request)
+    spoken = []
+    
+    async def scenario():
+        async def speak(text):
+            spoken.append(text)
+        
+        agent = SalonAgent()
+        agent.session_data["room"] = {
+            'conversation_history': [],
+            'turns': TurnRunner(),
+            'speak': speak,
+            'escalations': set(),
+            'awaiting_phone': []
+        }
+        turn = asyncio.create_task(agent._escalate_to_supervisor("Is there parking?", "room"))
+        await asyncio.to_thread(created.wait, 1.0)
+        turn.cancel()
+        release.set()
+        
+        escalations = agent.session_data["room"]['escalations']
+        for _ in range(100):
+            if escalations:
+                break
+            await asyncio.sleep(0.01)
+        assert turn.cancelled()
+        assert len(escalations) == 1
+        
+        events.publish("req-1", RequestStatus.RESOLVED, "Yes, free parking.")
+        await asyncio.wait_for(asyncio.gather(*escalations), 1.0)
+    
+    asyncio.run(scenario())
+    
+    assert spoken == [get_live_answer_message("Yes, free parking.")]
+
+
+def test_escalation_without_phone_asks_for_one(monkeypatch):
+    """Test that a caller with no known number is asked for one, which reaches their request."""
+    events = ResolutionEvents(listen=False)
+    monkeypatch.setattr(salon_agent, "resolution_events", events)
+    monkeypatch.setattr(
+        salon_agent.help_request_service, "create_request",
+        lambda request_data: SimpleNamespace(request_id="req-1")
+    )
+    added = []
+    monkeypatch.setattr(
+        salon_agent.help_request_service, "add_customer_phone",
+        lambda request_id, phone, question: added.append((request_id, phone, question))
+    )
+    
+    assert phone_in_message("sure, it's (555) 123-4567 thanks") == "5551234567"
+    assert phone_in_message("two haircuts at 3 for 45 dollars") is None
+    assert get_escalation_message(has_phone=False) != get_escalation_message()
+    
+    async def scenario():
+        agent = SalonAgent()
+        agent.session_data["room"] = {
+            'customer_phone': None,
+            'conversation_history': [],
+            'turns': TurnRunner(),
+            'speak': None,
+            'escalations': set(),
+            'awaiting_phone': []
+        }
+        reply = await agent._escalate_to_supervisor("Is there parking?", "room")
+        assert reply == get_escalation_message(has_phone=False)
+        
+        assert await agent._respond("+1 555 123 4567", "room") == get_phone_noted_message()
+        assert agent.session_data["room"]['customer_phone'] == "+15551234567"
+        assert agent.session_data["room"]['awaiting_phone'] == []
+        for task in agent.session_data["room"]['escalations']:
+            task.cancel()
+    
+    asyncio.run(scenario())
+    
+    assert added == [("req-1", "+15551234567", "Is there parking?")]
\ No newline at end of file
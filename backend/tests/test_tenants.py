@@ -0,0 +1,80 @@
+"""
+Tests for multi-tenant routing, storage paths and per-tenant caches.
+"""
+import pytest
+from src.database.firebase_client import firebase_client
+from src.models.knowledge_base import KnowledgeEntry
+from src.services.tenant_registry import TenantRegistry
+from src.utils.tenant import (
+    DEFAULT_TENANT, get_tenant_id, tenant_scope, tenant_path, tenant_from_room
+)
+
+
+def test_room_routing_and_scoped_paths(monkeypatch):
+    """Test tenant ids from room names and tenant-prefixed database writes."""
+    assert tenant_from_room("downtown__call-8f2c") == "downtown"
+    assert tenant_from_room("call-8f2c") == DEFAULT_TENANT
+    assert tenant_from_room("../etc__call") == DEFAULT_TENANT
+    
+    written = []
+    
+    class FakeDb:
+        def update(self, updates):
+            written.append(updates)
+    
+    monkeypatch.setattr(firebase_client, "db", FakeDb())
+    
+    with tenant_scope("uptown"):
+        assert get_tenant_id() == "uptown"
+        assert tenant_path("notification_outbox/j1") == "notification_outbox/j1"
+        firebase_client.commit_batch({"help_requests/r1/status": "resolved", "notification_outbox/j1": {}})
+    assert get_tenant_id() == DEFAULT_TENANT
+    firebase_client.commit_batch({"help_requests/r2/status": "resolved"})
+    
+    bump = {".sv": {"increment": 1}}
+    assert written == [
+        {
+            "tenants/uptown/help_requests/r1/status": "resolved",
+            "notification_outbox/j1": {},
+            "tenants/uptown/collection_versions/help_requests": bump,
+        },
+        {"help_requests/r2/status": "resolved", "collection_versions/help_requests": bump},
+    ]
+
+
+def test_registry_isolates_tenants_and_evicts_cold_ones(monkeypatch):
+    """Test per-tenant knowledge indexes, answer caches and LRU eviction."""
+    monkeypatch.setattr(firebase_client, "get_tenant_profile", lambda tenant_id: {"salon_name": tenant_id.title()})
+    registry = TenantRegistry(max_tenants=2, max_bytes=10 ** 9)
+    loads = []
+    
+    def loader_for(tenant_id):
+        def load():
+            loads.append(tenant_id)
+            return [KnowledgeEntry(question=f"Parking at {tenant_id}?", answer="Yes")]
+        return load
+    
+    with tenant_scope("uptown"):
+        uptown = registry.get()
+        assert uptown.salon_name == "Uptown"
+        assert "Uptown" in uptown.system_prompt
+        uptown.knowledge_index(loader_for("uptown"))
+        uptown.knowledge_index(loader_for("uptown"))
+        uptown.put_answer("parking", "cached answer", 20)
+    
+    assert registry.get("midtown").get_answer("parking") is None
+    assert uptown.get_answer("parking") == "cached answer"
+    assert loads == ["uptown"]
+    
+    # Changing the knowledge base drops the answers built on it
+    uptown.invalidate_knowledge()
+    assert uptown.get_answer("parking") is None
+    
+    registry.get("downtown")
+    assert registry.loaded() == ["midtown", "downtown"]
+    assert registry.stats["evictions"] == 1
+    
+    # Memory quota: loading a big index pushes out the coldest tenant
+    registry.max_bytes = 1
+    registry.get("downtown").knowledge_index(loader_for("downtown"))
+    assert registry.loaded() == ["downtown"]
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Tests for the voice pipeline with offline engines.
+"""
+import asyncio
+import numpy as np
+from livekit import rtc
+from livekit.agents import stt, tts
+from src.agents.voice_pipeline import EnergyVAD, VoiceLatencyStats, VoicePipeline
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 160  # 10 ms
+
+
+def _frame(amplitude: int) -> rtc.AudioFrame:
+    data = np.full(FRAME_SAMPLES, amplitude, dtype=np.int16).tobytes()
+    return rtc.AudioFrame(data, SAMPLE_RATE, 1, FRAME_SAMPLES)
+
+
+class ScriptedSTT(stt.STT):
+    """
+    Hears each stretch of loud audio as the next transcript: an interim
+    result while speaking, the final one at the first quiet frame.
+    """
+    
+    def __init__(self, *transcripts: str):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.transcripts = list(transcripts)
+    
+    async def recognize(self, buffer, *, language=None):
+        raise NotImplementedError
+    
+    def stream(self, *, language=None):
+        return ScriptedSpeechStream(self.transcripts)
+
+
+class ScriptedSpeechStream(stt.SpeechStream):
+    def __init__(self, transcripts):
+        self.transcripts = iter(transcripts)
+        super().__init__()
+    
+    async def _main_task(self):
+        transcript = None
+        async for frame in self._input_ch:
+            if isinstance(frame, self._FlushSentinel):
+                continue
+            loud = max(frame.data) > 1000
+            if loud and transcript is None:
+                transcript = next(self.transcripts)
+                self._send(stt.SpeechEventType.INTERIM_TRANSCRIPT, transcript.split()[0])
+            elif not loud and transcript is not None:
+                self._send(stt.SpeechEventType.FINAL_TRANSCRIPT, transcript)
+                transcript = None
+    
+    def _send(self, event_type, text):
+        self._event_ch.send_nowait(stt.SpeechEvent(
+            type=event_type, alternatives=[stt.SpeechData(language="en", text=text)]
+        ))
+
+
+class ToneTTS(tts.TTS):
+    """One frame of audio per word."""
+    
+    def __init__(self):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False), sample_rate=SAMPLE_RATE, num_channels=1
+        )
+        self.requests = []
+    
+    def synthesize(self, text):
+        self.requests.append(text)
+        return ToneStream(text)
+
+
+class ToneStream(tts.ChunkedStream):
+    def __init__(self, text):
+        self.text = text
+        super().__init__()
+    
+    async def _main_task(self):
+        for word in self.text.split():
+            self._event_ch.send_nowait(tts.SynthesizedAudio("req", "seg", _frame(500), word))
+
+
+class Playout:
+    def __init__(self):
+        self.frames = []
+    
+    async def capture_frame(self, frame):
+        self.frames.append(frame)
+
+
+def test_utterance_is_endpointed_answered_and_measured():
+    """Test speech -> one final utterance -> sentence-by-sentence reply, with latency."""
+    utterances = []
+    engine = ToneTTS()
+    playout = Playout()
+    latency = VoiceLatencyStats(window=10)
+    
+    async def scenario():
+        async def on_utterance(text):
+            utterances.append(text)
+            await pipeline.say("Yes, we do balayage. It starts at one hundred fifty dollars.")
+        
+        pipeline = VoicePipeline(
+            ScriptedSTT("do you offer balayage"),
+            EnergyVAD(threshold_db=-40, min_speech=0.05, min_silence=0.2),
+            engine,
+            on_utterance,
+            playout=playout,
+            endpoint_delay=0.05,
+            latency=latency
+        )
+        for amplitude in [8000] * 30 + [0] * 40:  # 0.3 s of speech, 0.4 s of silence
+            pipeline.push_frame(_frame(amplitude))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if latency.get_stats()['turns'] and len(playout.frames) == 11:
+                break
+        assert pipeline.interim == ""
+        await pipeline.aclose()
+    
+    asyncio.run(scenario())
+    
+    assert utterances == ["do you offer balayage"]
+    assert engine.requests == ["Yes, we do balayage.", "It starts at one hundred fifty dollars."]
+    assert len(playout.frames) == 11
+    stats = latency.get_stats()
+    assert stats['turns'] == 1
+    assert stats['endpointing']['p50_ms'] >= 50
+    assert stats['total']['p50_ms'] >= stats['first_audio']['p50_ms']
+
+
+def test_barge_in_stops_playback_and_newer_utterance_supersedes():
+    """Test that talking over the agent stops it and a new utterance cancels the old turn."""
+    engine = ToneTTS()
+    cancelled = []
+    answered = []
+    
+    class SlowPlayout(Playout):
+        async def capture_frame(self, frame):
+            await asyncio.sleep(0.01)
+            await super().capture_frame(frame)
+    
+    async def scenario():
+        async def on_utterance(text):
+            try:
+                await asyncio.sleep(0.5 if text == "first" else 0)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+            answered.append(text)
+        
+        slow = SlowPlayout()
+        pipeline = VoicePipeline(
+            ScriptedSTT("first", "second"),
+            EnergyVAD(threshold_db=-40, min_speech=0.05, min_silence=0.2),
+            engine, on_utterance, playout=slow, endpoint_delay=0.01
+        )
+        
+        # Barge-in: the caller starts talking during a long reply
+        speaking = asyncio.create_task(pipeline.say(" ".join(["word"] * 50)))
+        await asyncio.sleep(0.05)
+        for amplitude in [8000] * 10 + [0] * 20:
+            pipeline.push_frame(_frame(amplitude))
+        assert await speaking is False
+        assert 0 < len(slow.frames) < 50
+        assert pipeline.barge_ins == 1
+        
+        # Newer input: "first" is still being answered when "second" is said
+        await asyncio.sleep(0.05)
+        for amplitude in [8000] * 10 + [0] * 20:
+            pipeline.push_frame(_frame(amplitude))
+        await asyncio.sleep(0.05)
+        assert pipeline.turns.stats == {'started': 2, 'superseded': 1}
+        await pipeline.aclose()
+    
+    asyncio.run(scenario())
+    
+    assert cancelled == ["first"]
+    assert answered == ["second"]
\ No newline at end of file
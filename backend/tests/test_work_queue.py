@@ -0,0 +1,192 @@
+"""
+Tests for supervisor assignment, claiming and resolution races.
+"""
+import threading
+from datetime import datetime, timedelta
+import pytest
+from src.database.firebase_client import firebase_client
+from src.models.help_request import HelpRequest, HelpRequestResolve, RequestStatus
+from src.models.supervisor import Supervisor
+from src.services.help_request_service import help_request_service
+from src.services.knowledge_service import knowledge_service
+from src.services.notification_outbox import notification_delivery_pool
+from src.services.analytics_rollups import analytics_rollups
+from src.services.tenant_registry import tenant_registry
+from src.services.work_queue import WorkQueue, ClaimOutcome, work_queue
+from src.utils.exceptions import RequestClaimedError
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory help requests and supervisors behind the Firebase client."""
+    data = {'help_requests': {}, 'supervisors': {}}
+    lock = threading.Lock()
+    
+    def run_transaction(path, update_fn):
+        _, request_id = path.split('/')
+        with lock:
+            current = data['help_requests'].get(request_id)
+            new = update_fn(dict(current) if current else None)
+            if new is not None:
+                data['help_requests'][request_id] = new
+        return True
+    
+    def get_all_help_requests(status=None):
+        return [
+            dict(row) for row in data['help_requests'].values()
+            if status is None or row['status'] == status
+        ]
+    
+    def get_supervisors():
+        return [dict(row, supervisor_id=key) for key, row in data['supervisors'].items()]
+    
+    def save_supervisor(supervisor_id, row):
+        data['supervisors'][supervisor_id] = row
+        return True
+    
+    monkeypatch.setattr(firebase_client, "run_transaction", run_transaction)
+    monkeypatch.setattr(firebase_client, "get_all_help_requests", get_all_help_requests)
+    monkeypatch.setattr(firebase_client, "get_supervisors", get_supervisors)
+    monkeypatch.setattr(firebase_client, "save_supervisor", save_supervisor)
+    tenant_registry.clear()
+    yield data
+    tenant_registry.clear()
+
+
+def _pending(store, category=None, assigned_to=None):
+    request = HelpRequest(
+        customer_phone="+15550001111",
+        question="Do you stock Olaplex?",
+        category=category,
+        assigned_to=assigned_to
+    )
+    store['help_requests'][request.request_id] = request.to_dict()
+    return request
+
+
+def test_least_loaded_routing_and_leases(store):
+    """Test skill routing, least-loaded assignment and lease takeover."""
+    queue = WorkQueue(lease_seconds=60)
+    queue.save_supervisor(Supervisor(supervisor_id="ana", skills=["services"], capacity=2))
+    queue.save_supervisor(Supervisor(supervisor_id="ben", capacity=2))
+    queue.save_supervisor(Supervisor(supervisor_id="cy", skills=["pricing"], active=False))
+    _pending(store, assigned_to="ben")
+    
+    assert queue.choose_assignee("services") == "ana"  # ben already has one
+    assert queue.choose_assignee("pricing") == "ben"  # cy is off shift
+    
+    request = _pending(store, category="services")
+    assert queue.assign(request) == "ana"
+    
+    outcome, _ = queue.claim(request.request_id, "ana")
+    assert outcome == ClaimOutcome.OK
+    outcome, data = queue.claim(request.request_id, "ben")
+    assert outcome == ClaimOutcome.HELD and data['claimed_by'] == "ana"
+    
+    # Lease runs out: anyone may take it over
+    store['help_requests'][request.request_id]['lease_expires_at'] = (
+        datetime.utcnow() - timedelta(seconds=1)
+    ).isoformat()
+    outcome, data = queue.claim(request.request_id, "ben")
+    assert outcome == ClaimOutcome.OK and data['assigned_to'] == "ben"
+    
+    metrics = queue.get_metrics()
+    assert metrics['depth'] == 2
+    assert metrics['supervisors']['ben']['claimed'] == 1
+    assert metrics['stats']['conflicts'] == 1
+
+
+def test_concurrent_resolves_have_one_winner(store, monkeypatch):
+    """Test that two supervisors resolving at once cannot both succeed."""
+    request = _pending(store)
+    monkeypatch.setattr(firebase_client, "get_help_request", lambda rid: dict(store['help_requests'][rid]))
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda updates: True)
+    monkeypatch.setattr(notification_delivery_pool, "dispatch", lambda job: None)
+    monkeypatch.setattr(analytics_rollups, "record_resolution", lambda r: True)
+    monkeypatch.setattr(knowledge_service, "add_from_help_request", lambda r: None)
+    
+    barrier = threading.Barrier(2)
+    results = {}
+    
+    def resolve(supervisor_id):
+        barrier.wait()
+        results[supervisor_id] = help_request_service.resolve_request(
+            request.request_id,
+            HelpRequestResolve(supervisor_answer=f"Answer from {supervisor_id}", supervisor_id=supervisor_id)
+        )
+    
+    threads = [threading.Thread(target=resolve, args=(s,)) for s in ("ana", "ben")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stored = store['help_requests'][request.request_id]
+    assert stored['status'] == RequestStatus.RESOLVED.value
+    # Both see the single stored resolution
+    assert {r.supervisor_answer for r in results.values()} == {stored['supervisor_answer']}
+    
+    # A live claim by someone else blocks resolving
+    other = _pending(store)
+    work_queue.claim(other.request_id, "ana")
+    with pytest.raises(RequestClaimedError):
+        help_request_service.resolve_request(
+            other.request_id,
+            HelpRequestResolve(supervisor_answer="Yes", supervisor_id="ben")
+        )
+
+
+def test_timeout_does_not_overwrite_resolution(store, monkeypatch):
+    """Test that marking a timeout is a compare-and-set on pending status."""
+    monkeypatch.setattr(firebase_client, "commit_batch", lambda updates: True)
+    monkeypatch.setattr(analytics_rollups, "record_timeout", lambda at: True)
+    
+    resolved = _pending(store)
+    store['help_requests'][resolved.request_id]['status'] = RequestStatus.RESOLVED.value
+    assert help_request_service.mark_timeout(resolved.request_id) is False
+    assert store['help_requests'][resolved.request_id]['status'] == RequestStatus.RESOLVED.value
+    
+    pending = _pending(store)
+    assert help_request_service.mark_timeout(pending.request_id) is True
+    assert store['help_requests'][pending.request_id]['status'] == RequestStatus.TIMEOUT.value
+
+def test_notifications_missed_by_resolve_are_queued_later(store, monkeypatch):
+    """Test that a failed notification write leaves the request flagged, then recovered."""
+    request = _pending(store)
+    monkeypatch.setattr(firebase_client, "get_help_request", lambda rid: dict(store['help_requests'][rid]))
+    monkeypatch.setattr(firebase_client, "get_notification_pending_requests", lambda: [
+        dict(row) for row in store['help_requests'].values() if row.get('notification_pending')
+    ])
+    monkeypatch.setattr(analytics_rollups, "record_resolution", lambda r: True)
+    monkeypatch.setattr(knowledge_service, "add_from_help_request", lambda r: None)
+    dispatched = []
+    monkeypatch.setattr(notification_delivery_pool, "dispatch", dispatched.append)
+    
+    def commit_batch(updates):
+        if write_fails:
+            return False
+        for path, value in updates.items():
+            parts = path.split('/')
+            if parts[0] == 'help_requests' and len(parts) == 3:
+                store['help_requests'][parts[1]][parts[2]] = value
+        return True
+    
+    monkeypatch.setattr(firebase_client, "commit_batch", commit_batch)
+    
+    write_fails = True
+    resolved = help_request_service.resolve_request(
+        request.request_id,
+        HelpRequestResolve(supervisor_answer="Yes, we stock it", supervisor_id="ana")
+    )
+    stored = store['help_requests'][request.request_id]
+    assert resolved.status == RequestStatus.RESOLVED and dispatched == []
+    assert stored['status'] == RequestStatus.RESOLVED.value and stored['notification_pending'] is True
+    
+    # Too recent: the resolving process may still be writing the batch
+    write_fails = False
+    assert help_request_service.stage_pending_notifications() == 0
+    
+    assert help_request_service.stage_pending_notifications(grace_seconds=0) == 1
+    assert [job.recipient for job in dispatched] == [request.customer_phone]
+    assert stored['notification_pending'] is False
+    assert help_request_service.stage_pending_notifications(grace_seconds=0) == 0
\ No newline at end of file